@@ -0,0 +1,100 @@
+"""
+Decode-latency benchmark for the inference service's upload preprocessing.
+
+Times the old path (full decode, RGB convert, then resize) against
+inference/preprocess.py (JPEG draft decode, one resize into the model
+input) for every image under images/, for the classifier input and the
+inpainter input, and prints the mean absolute difference between the two
+outputs so the speedup can be weighed against the change in pixels:
+
+    python -m benchmarks.decode
+    python -m benchmarks.decode --repeat 50 --scale 4000 --out decode.json
+
+--scale re-encodes each sample as a JPEG with that long edge first, to stand
+in for phone photos; the samples in images/ are mostly small PNGs, which
+draft decoding does not speed up.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import statistics
+import time
+import numpy as np
+from PIL import Image
+from inference.preprocess import CLASSIFIER_SIZE, classifier_input, decode, inpaint_image
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "images")
+
+def old_classifier(data):
+    """The full-size image Ultralytics got before, shrunk the way its classify transforms would."""
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    w, h = image.size
+    side = min(w, h)
+    box = ((w - side) / 2, (h - side) / 2, (w + side) / 2, (h + side) / 2)
+    return np.asarray(image.resize((CLASSIFIER_SIZE, CLASSIFIER_SIZE), Image.BILINEAR, box=box))[:, :, ::-1]
+
+def new_classifier(data):
+    return classifier_input(decode(data, "RGB", (CLASSIFIER_SIZE, CLASSIFIER_SIZE)))
+
+def old_inpaint(data):
+    return Image.open(io.BytesIO(data)).convert("RGB").resize((512, 512))
+
+def new_inpaint(data):
+    return inpaint_image(decode(data, "RGB"))
+
+def load_samples(scale):
+    samples = {}
+    for path in sorted(glob.glob(os.path.join(IMAGE_DIR, "**", "*.*"), recursive=True)):
+        with open(path, "rb") as f:
+            data = f.read()
+        if scale:
+            image = Image.open(io.BytesIO(data)).convert("RGB")
+            ratio = scale / max(image.size)
+            buf = io.BytesIO()
+            image.resize((round(image.width * ratio), round(image.height * ratio))).save(buf, format="JPEG", quality=90)
+            data = buf.getvalue()
+        samples[os.path.relpath(path, IMAGE_DIR)] = data
+    return samples
+
+def time_ms(fn, data, repeat):
+    fn(data)
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        runs.append((time.perf_counter() - started) * 1000)
+    return statistics.median(runs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per image and path (median is reported)")
+    parser.add_argument("--scale", type=int, default=0, help="re-encode samples as JPEGs with this long edge, px")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    stages = {"classifier": (old_classifier, new_classifier), "inpaint": (old_inpaint, new_inpaint)}
+    results = {}
+    print(f"{'image':<44}{'stage':<12}{'old ms':>9}{'new ms':>9}{'speedup':>9}{'mean |diff|':>13}")
+    for name, data in load_samples(args.scale).items():
+        size = Image.open(io.BytesIO(data)).size
+        for stage, (old, new) in stages.items():
+            old_ms, new_ms = time_ms(old, data, args.repeat), time_ms(new, data, args.repeat)
+            diff = float(np.abs(np.asarray(old(data), dtype=float) - np.asarray(new(data), dtype=float)).mean())
+            results.setdefault(name, {"size": size})[stage] = {
+                "old_ms": round(old_ms, 2), "new_ms": round(new_ms, 2), "mean_abs_diff": round(diff, 2)
+            }
+            print(f"{name[:43]:<44}{stage:<12}{old_ms:>9.2f}{new_ms:>9.2f}{old_ms / new_ms:>8.1f}x{diff:>13.2f}")
+
+    for stage in stages:
+        old_total = sum(r[stage]["old_ms"] for r in results.values())
+        new_total = sum(r[stage]["new_ms"] for r in results.values())
+        print(f"{'total':<44}{stage:<12}{old_total:>9.2f}{new_total:>9.2f}{old_total / new_total:>8.1f}x")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"repeat": args.repeat, "scale": args.scale, "images": results}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
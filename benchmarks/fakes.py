@@ -0,0 +1,229 @@
+"""
+Local stand-ins for everything the web app talks to, so it can be benchmarked
+without docker-compose: ts-model-api and inference services with configurable
+latency, an in-memory KeyDB (fakeredis) and stub Gemini/OpenAI clients.
+"""
+import base64
+import io
+import random
+import threading
+import time
+from types import SimpleNamespace
+from flask import Flask, jsonify, request
+from waitress import create_server
+
+def _sleep(latency, jitter):
+    if latency > 0:
+        time.sleep(latency * random.uniform(1 - jitter, 1 + jitter))
+
+def _server_timing(started):
+    return f"model;dur={(time.perf_counter() - started) * 1000:.1f}"
+
+HISTORY = [3000.0 + (i * 37) % 900 for i in range(113)]
+METRICS = {"rmse": 412.7, "mae": 318.2, "theils_u": 0.61}
+
+def fake_ts_model_api(latency=0.05, jitter=0.2):
+    """Same routes and payload shapes as bladeacer/automo-ts."""
+    app = Flask("fake_ts_model_api")
+
+    @app.route("/forecast")
+    def forecast():
+        started = time.perf_counter()
+        _sleep(latency, jitter)
+        steps = request.args.get("steps", default=12, type=int)
+        body = jsonify({
+            "forecast": [
+                {"month": f"{2025 + (5 + i) // 12}-{(5 + i) % 12 + 1:02d}", "forecast": 4000.0 + i,
+                 "lower_ci": 3500.0 + i, "upper_ci": 4500.0 + i}
+                for i in range(steps)
+            ],
+            "model_info": {"order": [1, 1, 1], "seasonal_order": [1, 1, 1, 12]}
+        })
+        body.headers["Server-Timing"] = _server_timing(started)
+        return body
+
+    @app.route("/history")
+    def history():
+        _sleep(latency, jitter)
+        rows = [{"month": f"{2016 + i // 12}-{i % 12 + 1:02d}", "actual": value} for i, value in enumerate(HISTORY)]
+        return jsonify({"history": rows, "count": len(rows)})
+
+    @app.route("/metrics")
+    def metrics():
+        _sleep(latency, jitter)
+        return jsonify({"metrics": METRICS})
+
+    @app.route("/health")
+    def health():
+        return jsonify({"status": "ready"})
+
+    return app
+
+def fake_sarima_export(ar=0.5, sigma2=150.0 ** 2, metrics=METRICS):
+    """
+    Export for server.utils.sarima_engine of a SARIMA(1,0,0)(0,1,0,12) on the
+    fake history, built by hand so benchmarks (and tests/test_sarima_engine.py)
+    need no statsmodels. The state is the last 13 observations; the transition
+    applies (1 - ar B)(1 - B^12).
+    """
+    import numpy as np
+    k = 13
+    transition = np.zeros((k, k))
+    transition[0, 0], transition[0, 11], transition[0, 12] = ar, 1.0, -ar
+    transition[1:, :-1] = np.eye(k - 1)
+    selection = np.zeros((k, 1))
+    selection[0, 0] = 1.0
+    last = np.array(HISTORY[::-1][:k])
+    return {
+        "format": 1,
+        "order": [1, 0, 0],
+        "seasonal_order": [0, 1, 0, 12],
+        "start": "2016-01",
+        "endog": HISTORY,
+        "design": selection.T.tolist(),
+        "obs_intercept": [0.0],
+        "obs_cov": [[0.0]],
+        "transition": transition.tolist(),
+        "state_intercept": [0.0] * k,
+        "selection": selection.tolist(),
+        "state_cov": [[sigma2]],
+        "predicted_state": (transition @ last).tolist(),
+        "predicted_state_cov": (selection @ selection.T * sigma2).tolist(),
+        "metrics": metrics
+    }
+
+def fake_inference_api(latency=0.1, inpaint_latency=1.0, jitter=0.2):
+    """Same routes and payload shapes as inference/app.py, minus the models."""
+    app = Flask("fake_inference_api")
+    png = base64.b64encode(_solid_png()).decode("utf-8")
+
+    prediction = {"result": [{"name": "dent", "score": 0.91}, {"name": "scratch", "score": 0.06}, {"name": "clean", "score": 0.03}]}
+
+    @app.route("/predictImage", methods=["POST"])
+    def predict_image():
+        started = time.perf_counter()
+        request.files["file"].read()
+        _sleep(latency, jitter)
+        body = jsonify(prediction)
+        body.headers["Server-Timing"] = _server_timing(started)
+        return body
+
+    @app.route("/inpaint", methods=["POST"])
+    def inpaint():
+        started = time.perf_counter()
+        request.files["image"].read()
+        request.files["mask"].read()
+        _sleep(inpaint_latency, jitter)
+        body = jsonify({"image": png})
+        body.headers["Server-Timing"] = _server_timing(started)
+        return body
+
+    @app.route("/pipeline", methods=["POST"])
+    def pipeline():
+        # "dent" always calls for inpainting
+        started = time.perf_counter()
+        request.files["image"].read()
+        request.files["mask"].read()
+        _sleep(latency, jitter)
+        classified = time.perf_counter()
+        _sleep(inpaint_latency, jitter)
+        timings = {"classify": round((classified - started) * 1000, 1),
+                   "inpaint": round((time.perf_counter() - classified) * 1000, 1)}
+        body = jsonify({"prediction": prediction, "inpaint": {"image": png}, "inpaint_skipped": None,
+                        "inpaint_error": None, "timings_ms": timings})
+        body.headers["Server-Timing"] = ", ".join(f"{name};dur={ms}" for name, ms in timings.items())
+        return body
+
+    @app.route("/health")
+    def health():
+        return jsonify({"status": "online", "device": "cpu", "vram_gb": 0, "inpainter_loaded": True, "model_version": "fake",
+                        "models": {"classifier": "ready", "inpainter": "ready"}})
+
+    @app.route("/ready")
+    def ready():
+        return jsonify({"ready": True, "models": {"classifier": {"state": "ready"}, "inpainter": {"state": "ready"}}})
+
+    return app
+
+def _solid_png():
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new("RGB", (512, 512), "grey").save(buf, format="PNG")
+    return buf.getvalue()
+
+def serve_in_thread(app, port, threads=64):
+    """Starts a Waitress server for `app` on a daemon thread; returns the server."""
+    server = create_server(app, host="127.0.0.1", port=port, threads=threads)
+    threading.Thread(target=server.run, daemon=True, name=f"fake-{app.name}").start()
+    return server
+
+# --- LLM clients ---
+
+class StubGemini:
+    """Drop-in for google.genai.Client: streams `chunks` pieces of text over `latency` seconds."""
+    latency = 0.5
+    chunks = 20
+
+    def __init__(self, api_key=None, **kwargs):
+        self.models = SimpleNamespace(generate_content_stream=self._stream)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content_stream=self._astream))
+
+    def _stream(self, model=None, contents=None, config=None):
+        for i in range(self.chunks):
+            time.sleep(self.latency / self.chunks)
+            yield SimpleNamespace(text=f"Paragraph {i} of the benchmark report. ")
+
+    async def _astream(self, model=None, contents=None, config=None):
+        import asyncio
+
+        async def chunks():
+            for i in range(self.chunks):
+                await asyncio.sleep(self.latency / self.chunks)
+                yield SimpleNamespace(text=f"Paragraph {i} of the benchmark report. ")
+        return chunks()
+
+class StubOpenAI:
+    """Drop-in for openai.OpenAI: chat completions answer after `latency` seconds."""
+    latency = 0.02
+
+    def __init__(self, api_key=None, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        time.sleep(self.latency)
+        content = "CRITICAL: Stock below target\nSteady demand\nLead time manageable\nReorder now"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+# --- KeyDB ---
+
+def install_fake_keydb():
+    """
+    Points redis.Redis.from_url (and the asyncio client) at one shared
+    in-memory fakeredis server. Must run before server.app is imported.
+    """
+    import fakeredis
+    import redis
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+
+    def from_url(url, **kwargs):
+        kwargs.pop("max_connections", None)
+        return fakeredis.FakeRedis(server=server, **kwargs)
+
+    def async_from_url(url, **kwargs):
+        kwargs.pop("max_connections", None)
+        return fakeredis.FakeAsyncRedis(server=server, **kwargs)
+
+    redis.Redis.from_url = staticmethod(from_url)
+    redis.asyncio.Redis.from_url = staticmethod(async_from_url)
+    return server
+
+def install_stub_llms(gemini_latency, openai_latency):
+    import openai
+    from google import genai
+
+    StubGemini.latency = gemini_latency
+    StubOpenAI.latency = openai_latency
+    genai.Client = StubGemini
+    openai.OpenAI = StubOpenAI
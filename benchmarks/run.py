@@ -0,0 +1,338 @@
+"""
+Offline load test for the web app.
+
+Runs server.app in this process (Waitress, or Hypercorn with --server async)
+against the stand-ins in benchmarks/fakes.py, drives each route at a fixed
+concurrency and writes throughput, latency percentiles and memory to JSON:
+
+    python -m benchmarks.run --requests 200 --concurrency 16 --out bench.json
+    python -m benchmarks.run --only forecast_hit,login --upstream-latency 200
+    python -m benchmarks.run --only forecast_miss,history --sarima-engine
+    python -m benchmarks.run --compare before.json after.json
+
+The load generator shares the process, so RSS figures include it; compare
+runs with the same settings rather than reading them as absolutes.
+"""
+import argparse
+import datetime
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import jwt
+import requests
+from benchmarks import fakes
+
+SAMPLE_MARKDOWN = "# Forecast Analysis\n\n" + "\n\n".join(
+    f"## Section {i}\n\nRegistrations are expected to {'rise' if i % 2 else 'ease'} over the period.\n\n"
+    "| Month | Forecast |\n|---|---|\n| Jan | 4000 |\n| Feb | 4100 |" for i in range(8)
+)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+def jpeg(seed=None, size=96):
+    """Solid image for cache hits, random noise (so a new phash) when seeded."""
+    from PIL import Image
+    if seed is None:
+        img = Image.new("RGB", (size, size), "red")
+    else:
+        rng = random.Random(seed)
+        img = Image.frombytes("RGB", (size, size), bytes(rng.getrandbits(8) for _ in range(size * size * 3)))
+    buf = io.BytesIO()
+    img.save(buf, "jpeg")
+    return buf.getvalue()
+
+def inventory_csv(seed, rows):
+    rng = random.Random(seed)
+    lines = ["SupersedeNo,Description,Qty,total_units_sold"]
+    lines += [f"BP{seed}-{i},Part {i},{rng.randint(0, 200)},{rng.randint(0, 400)}" for i in range(rows)]
+    return "\n".join(lines).encode()
+
+class Context:
+    """What request builders need: auth headers, fixtures and a source of unique ids."""
+
+    def __init__(self, user, user_token, admin_token, csv_rows):
+        self.user = user
+        self.user_auth = {"Authorization": f"Bearer {user_token}"}
+        self.admin_auth = {"Authorization": f"Bearer {admin_token}"}
+        self.csv_rows = csv_rows
+        self.hit_image = jpeg()
+        self._ids = itertools.count(1)
+
+    def unique(self):
+        return next(self._ids)
+
+# name -> builder(ctx) returning (method, path, requests kwargs)
+SCENARIOS = {
+    "health": lambda c: ("GET", "/health", {}),
+    "metrics_scrape": lambda c: ("GET", "/metrics", {}),
+    "login": lambda c: ("POST", "/login", {"json": {"username": c.user["username"], "password": c.user["password"]}}),
+    "update_user": lambda c: ("PUT", "/update-user", {"headers": c.user_auth, "json": {
+        "currentUsername": c.user["name"], "fullName": c.user["name"], "email": c.user["email"]}}),
+    "forecast_hit": lambda c: ("GET", "/ts-model/forecast?steps=12", {"headers": c.user_auth}),
+    "forecast_miss": lambda c: ("GET", f"/ts-model/forecast?steps={100 + c.unique()}", {"headers": c.user_auth}),
+    "history": lambda c: ("GET", "/ts-model/history", {"headers": c.user_auth}),
+    "metrics": lambda c: ("GET", "/ts-model/metrics", {"headers": c.user_auth}),
+    "report_stream": lambda c: ("GET", "/ts-model/report-stream?refresh=true", {"headers": c.user_auth}),
+    "generate_pdf": lambda c: ("POST", "/ts-model/generate-pdf", {"headers": c.user_auth, "json": {"markdown": SAMPLE_MARKDOWN}}),
+    "predict_image_hit": lambda c: ("POST", "/obj-det/predictImage", {"headers": c.user_auth,
+        "files": {"file": ("hit.jpg", c.hit_image, "image/jpeg")}}),
+    "predict_image_miss": lambda c: ("POST", "/obj-det/predictImage", {"headers": c.user_auth,
+        "files": {"file": ("miss.jpg", jpeg(c.unique()), "image/jpeg")}}),
+    "inpaint_hit": lambda c: ("POST", "/obj-det/inpaint", {"headers": c.user_auth,
+        "files": {"image": ("hit.jpg", c.hit_image, "image/jpeg"), "mask": ("mask.jpg", c.hit_image, "image/jpeg")}}),
+    "pipeline_hit": lambda c: ("POST", "/obj-det/pipeline", {"headers": c.user_auth,
+        "files": {"image": ("hit.jpg", c.hit_image, "image/jpeg"), "mask": ("mask.jpg", c.hit_image, "image/jpeg")}}),
+    "pipeline_miss": lambda c: ("POST", "/obj-det/pipeline", {"headers": c.user_auth,
+        "files": {"image": ("miss.jpg", jpeg(c.unique()), "image/jpeg"), "mask": ("mask.jpg", c.hit_image, "image/jpeg")}}),
+    "predict_reorder_miss": lambda c: ("POST", "/order-model/predict-reorder", {"headers": c.user_auth,
+        "files": {"file": ("inventory.csv", inventory_csv(c.unique(), c.csv_rows), "text/csv")}}),
+    "reorder_scenarios_miss": lambda c: ("POST", "/order-model/scenarios", {"headers": c.user_auth,
+        "files": {"file": ("inventory.csv", inventory_csv(c.unique(), c.csv_rows * 10), "text/csv")},
+        "data": {"safety_stock": "5,10,20", "target_days": "30,60", "lead_time": "7,14,21"}}),
+}
+
+# Cache hits need one request first to populate KeyDB
+PRIMED = ("forecast_hit", "history", "predict_image_hit", "inpaint_hit", "pipeline_hit")
+
+def run_scenario(base_url, ctx, name, total, concurrency, warmup, timeout):
+    build = SCENARIOS[name]
+    local = threading.local()
+
+    def send():
+        method, path, kwargs = build(ctx)
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            r = local.session.request(method, base_url + path, timeout=timeout, **kwargs)
+            r.content
+            status = r.status_code
+        except requests.RequestException:
+            status = "error"
+        return status, time.perf_counter() - started
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda _: send(), range(warmup)))
+        rss_before = rss_mb()
+        wall = time.perf_counter()
+        results = list(pool.map(lambda _: send(), range(total)))
+        wall = time.perf_counter() - wall
+
+    latencies = sorted(t * 1000 for _, t in results)
+    statuses = Counter(str(s) for s, _ in results)
+    ok = sum(n for s, n in statuses.items() if s.isdigit() and int(s) < 400)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "ok": ok,
+        "errors": total - ok,
+        "status_counts": dict(statuses),
+        "throughput_rps": round(total / wall, 2),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2),
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2)
+        },
+        "rss_mb": {"before": round(rss_before, 1), "after": round(rss_mb(), 1), "peak": round(peak_rss_mb(), 1)}
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def serve_async(app, port):
+    """server.asgi.run without signal handlers, which only work on the main thread."""
+    import asyncio
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    from server.asgi import create_app
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=app.config["SERVER_THREADS"]))
+    loop.run_until_complete(serve(create_app(app), config, shutdown_trigger=lambda: asyncio.Future()))
+
+def start_stack(args):
+    """Fakes first in the environment, then the app, then the servers. Returns the app's base URL."""
+    ts_port, inf_port, web_port = free_port(), free_port(), free_port()
+    os.environ.update({
+        "MODEL_API_URL": f"http://127.0.0.1:{ts_port}",
+        "INFERENCE_API_URL": f"http://127.0.0.1:{inf_port}",
+        "KEYDB_URL": "redis://fake:6379/0",
+        "GEMINI_API_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        "USERS_DB_PATH": os.path.join(tempfile.mkdtemp(prefix="automo-bench-"), "users.db"),
+        "SERVER_THREADS": str(args.server_threads),
+        # Scenarios decide what is cached, not the warm-up thread
+        "WARMUP_ENABLED": "false",
+        # Measure the routes, not the login throttle
+        "AUTH_IP_BURST": "1000000000",
+        "AUTH_USER_BURST": "1000000000",
+        # ... nor the per-user quotas (still checked, so their cost is in the numbers)
+        "QUOTA_USER_BURST": "1000000000",
+        "QUOTA_INFERENCE_BURST": "1000000000",
+        "QUOTA_GEMINI_BURST": "1000000000",
+        "QUOTA_OPENAI_BURST": "1000000000",
+    })
+    if args.sarima_engine:
+        params_path = os.path.join(tempfile.mkdtemp(prefix="automo-bench-"), "sarima_params.json")
+        with open(params_path, "w") as f:
+            json.dump(fakes.fake_sarima_export(), f)
+        os.environ["SARIMA_PARAMS_PATH"] = params_path
+    fakes.install_fake_keydb()
+    fakes.install_stub_llms(args.gemini_latency / 1000, args.openai_latency / 1000)
+
+    from server.app import app
+    # Queue depth warnings are expected at fixed concurrency
+    logging.getLogger("waitress.queue").setLevel(logging.ERROR)
+    # Fork the hashing pool before any server threads exist
+    app.hash_pool.start()
+
+    jitter = args.jitter
+    fakes.serve_in_thread(fakes.fake_ts_model_api(args.upstream_latency / 1000, jitter), ts_port)
+    fakes.serve_in_thread(fakes.fake_inference_api(args.inference_latency / 1000, args.inpaint_latency / 1000, jitter), inf_port)
+
+    if args.server == "async":
+        threading.Thread(target=serve_async, args=(app, web_port), daemon=True, name="web").start()
+    else:
+        fakes.serve_in_thread(app, web_port, threads=args.server_threads)
+
+    base_url = f"http://127.0.0.1:{web_port}"
+    for _ in range(100):
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).ok:
+                return app, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("web app did not come up")
+
+def make_context(app, base_url, csv_rows):
+    user = {"username": "bench_user", "password": "bench-password", "email": "bench@test.com", "name": "Bench User"}
+    requests.post(f"{base_url}/register", json=user, timeout=30)
+    token = requests.post(f"{base_url}/login", json=user, timeout=30).json()["access_token"]
+    admin = jwt.encode({
+        "sub": "internal_proxy",
+        "iat": datetime.datetime.now(datetime.timezone.utc),
+        "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=6)
+    }, app.config["SECRET_KEY"], algorithm="HS256")
+    return Context(user, token, admin, csv_rows)
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)["scenarios"]
+    with open(new_path) as f:
+        new = json.load(f)["scenarios"]
+
+    def change(a, b):
+        return f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+
+    print(f"{'scenario':<24}{'rps':>22}{'p50 ms':>24}{'p95 ms':>24}{'p99 ms':>24}")
+    for name in [n for n in old if n in new]:
+        o, n = old[name], new[name]
+        cols = [f"{o['throughput_rps']:.0f}->{n['throughput_rps']:.0f} {change(o['throughput_rps'], n['throughput_rps'])}"]
+        for p in ("p50", "p95", "p99"):
+            a, b = o["latency_ms"][p], n["latency_ms"][p]
+            cols.append(f"{a:.1f}->{b:.1f} {change(a, b)}")
+        print(f"{name:<24}" + "".join(f"{c:>24}" for c in cols))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    parser.add_argument("--only", help="comma-separated scenario names (default: all)")
+    parser.add_argument("--server", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--server-threads", type=int, default=8)
+    parser.add_argument("--sarima-engine", action="store_true",
+                        help="answer /ts-model forecast, history and metrics in-process instead of from the fake API")
+    parser.add_argument("--upstream-latency", type=float, default=50, help="fake ts-model-api latency, ms")
+    parser.add_argument("--inference-latency", type=float, default=100, help="fake /predictImage latency, ms")
+    parser.add_argument("--inpaint-latency", type=float, default=1000, help="fake /inpaint latency, ms")
+    parser.add_argument("--gemini-latency", type=float, default=500, help="stub Gemini stream duration, ms")
+    parser.add_argument("--openai-latency", type=float, default=20, help="stub OpenAI call latency, ms")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+/- fraction applied to fake latencies")
+    parser.add_argument("--csv-rows", type=int, default=20, help="parts per reorder upload (scenarios get 10x)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print the change between two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    app, base_url = start_stack(args)
+    ctx = make_context(app, base_url, args.csv_rows)
+    for name in PRIMED:
+        if name in names:
+            method, path, kwargs = SCENARIOS[name](ctx)
+            requests.request(method, base_url + path, timeout=args.timeout, **kwargs)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "only")}
+        },
+        "scenarios": {}
+    }
+    for name in names:
+        result = run_scenario(base_url, ctx, name, args.requests, args.concurrency, args.warmup, args.timeout)
+        report["scenarios"][name] = result
+        lat = result["latency_ms"]
+        print(f"{name:<24} {result['throughput_rps']:>8.1f} rps  p50 {lat['p50']:>8.1f}  p95 {lat['p95']:>8.1f}  "
+              f"p99 {lat['p99']:>8.1f} ms  errors {result['errors']:>4}  rss {result['rss_mb']['after']:.0f} MB", flush=True)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+    app.hash_pool.shutdown()
+
+if __name__ == "__main__":
+    main()
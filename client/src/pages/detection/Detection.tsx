@@ -51,7 +51,8 @@ export default function Detection() {
     } catch (e: any) {
       notifications.show({
         title: 'Detection Error',
-        message: 'An unexpected error occurred during analysis.',
+        // Over quota: the server says when to retry
+        message: e?.response?.status === 429 ? e.response.data.error : 'An unexpected error occurred during analysis.',
         color: 'red',
       });
     } finally {
@@ -60,6 +61,7 @@ export default function Detection() {
   };
 
   const handleInpaint = async () => {
+    if (form.validateField('imageFile').hasError) return;
     // Check mask specifically for the repair step
     if (!form.values.maskFile) {
       form.setFieldError('maskFile', 'Please upload a mask image to repair');
@@ -68,11 +70,26 @@ export default function Detection() {
 
     setLoading(true);
     try {
-      const data = await DetectionService.inPaint(
-        form.values.imageFile!, 
-        form.values.maskFile
-      );
-      setRepairedImage(`data:image/png;base64,${data.image}`);
+      // Not identified yet: classify and repair from a single upload
+      if (predictions.length === 0) {
+        const data = await DetectionService.runPipeline(form.values.imageFile!, form.values.maskFile);
+        setPredictions(data.prediction.result);
+        if (!data.inpaint) {
+          notifications.show({
+            title: 'No Repair Applied',
+            message: data.inpaint_skipped ?? data.inpaint_error ?? 'The damage was not repaired.',
+            color: data.inpaint_error ? 'red' : 'blue',
+          });
+          return;
+        }
+        setRepairedImage(`data:image/png;base64,${data.inpaint.image}`);
+      } else {
+        const data = await DetectionService.inPaint(
+          form.values.imageFile!, 
+          form.values.maskFile
+        );
+        setRepairedImage(`data:image/png;base64,${data.image}`);
+      }
       
       notifications.show({
         title: 'Repair Complete',
@@ -83,7 +100,7 @@ export default function Detection() {
     } catch (e: any) {
       notifications.show({
         title: 'Repair Error',
-        message: 'Failed to process the repair request.',
+        message: e?.response?.status === 429 ? e.response.data.error : 'Failed to process the repair request.',
         color: 'red',
       });
     } finally {
@@ -201,7 +218,7 @@ export default function Detection() {
               size="md"
               leftSection={<IconUpload size={16} />}
               {...form.getInputProps('maskFile')}
-              disabled={predictions.length === 0}
+              disabled={!form.values.imageFile}
             />
             <Button 
               color="grape"
@@ -211,7 +228,7 @@ export default function Detection() {
               leftSection={<IconWand size={16} />}
               onClick={handleInpaint}
               loading={loading && !!form.values.maskFile}
-              disabled={predictions.length === 0}
+              disabled={!form.values.imageFile}
             >
               Repair Damage
             </Button>
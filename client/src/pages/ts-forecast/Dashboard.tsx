@@ -21,10 +21,16 @@ import { useRef } from "react";
 import * as htmlToImage from 'html-to-image';
 import { Link } from "react-router-dom";
 
+// History points drawn on the chart; the server downsamples longer ranges
+const CHART_POINTS = 240;
+
 export default function Dashboard() {
     // --- Data State ---
     const [forecastData, setForecastData] = useState<ForecastItem[]>([]);
     const [historyData, setHistoryData] = useState<any[]>([]);
+    // Every history row, for the table and CSV; only fetched when the chart's copy was downsampled
+    const [fullHistory, setFullHistory] = useState<any[] | null>(null);
+    const [historySampled, setHistorySampled] = useState<boolean>(false);
     const [metrics, setMetrics] = useState<any>(null);
     const [loading, setLoading] = useState<boolean>(true);
     const [error, setError] = useState<string | null>(null);
@@ -49,7 +55,8 @@ export default function Dashboard() {
         // Branch 1: Data Export (CSV)
         if (type === 'csv') {
             try {
-                ForecastService.downloadCSV(chartData, tableColumns);
+                const history = historySampled ? await loadFullHistory() : historyData;
+                ForecastService.downloadCSV(showHistory ? [...history, ...forecastData] : forecastData, tableColumns);
                 notifications.show({
                     title: 'Export Successful',
                     message: 'Data matches your current table view.',
@@ -103,17 +110,15 @@ export default function Dashboard() {
     useEffect(() => {
         const fetchAndPrewarm = async () => {
             try {
-                const [metricsRes, historyRes, initialForecast] = await Promise.all([
-                    ForecastService.getMetrics(),
-                    ForecastService.getHistory(),
-                    ForecastService.getForecast(12)
-                ]);
-                setMetrics(metricsRes);
-                setHistoryData(historyRes.history);
-                setForecastData(initialForecast.forecast);
-
-                // Silent pre-warm
-                [24, 48].forEach(s => ForecastService.getForecast(s).catch(() => {}));
+                // One round trip; 24 and 48 are fetched too so the server cache is warm for the slider
+                const bundle = await ForecastService.getDashboard([12, 24, 48], { max_points: CHART_POINTS });
+                if (bundle.metrics) setMetrics(bundle.metrics);
+                if (bundle.history) {
+                    setHistoryData(bundle.history.history);
+                    setHistorySampled(bundle.history.downsampled_from !== undefined);
+                }
+                if (bundle.forecasts["12"]) setForecastData(bundle.forecasts["12"].forecast);
+                if (Object.keys(bundle.errors).length) console.warn("Partial dashboard load", bundle.errors);
             } catch (err) {
                 console.error("Initial load failed", err);
             }
@@ -138,11 +143,28 @@ export default function Dashboard() {
         fetchForecast();
     }, [debouncedSteps]);
 
+    const loadFullHistory = async () => {
+        if (fullHistory) return fullHistory;
+        const response = await ForecastService.getHistory();
+        setFullHistory(response.history);
+        return response.history;
+    };
+
+    useEffect(() => {
+        if (view === 'table' && historySampled) {
+            loadFullHistory().catch(() => {});
+        }
+    }, [view, historySampled]);
+
     // Memoized Chart Logic
     const chartData = useMemo(() => 
                               showHistory ? [...historyData, ...forecastData] : forecastData, 
     [historyData, forecastData, showHistory]);
 
+    const tableData = useMemo(() => 
+                              showHistory ? [...(fullHistory ?? historyData), ...forecastData] : forecastData, 
+    [fullHistory, historyData, forecastData, showHistory]);
+
     const chartSeries = useMemo(() => {
         const series = [
             { name: 'actual', color: 'teal.6', label: 'Historical' },
@@ -291,7 +313,7 @@ export default function Dashboard() {
                                     <Text size="sm" c="dimmed">
                                         {view === 'chart' 
                                             ? `Predicted path for the next ${debouncedSteps} months` 
-                                            : `Fuzzy search and sort through ${chartData.length} records`}
+                                            : `Fuzzy search and sort through ${tableData.length} records`}
                                     </Text>
                                 </Box>
 
@@ -367,7 +389,7 @@ export default function Dashboard() {
                                     />
                                 ) : (
                                     <DataTable 
-                                        data={chartData} 
+                                        data={tableData} 
                                         columns={tableColumns}
                                     />
                                 )}
@@ -13,14 +13,25 @@ export interface InpaintResponse {
   image: string; // base64 string
 }
 
+export interface PipelineResponse {
+  prediction: PredictResponse;
+  // null when the damage class does not call for a repair, or the repair failed
+  inpaint: InpaintResponse | null;
+  inpaint_skipped: string | null;
+  inpaint_error: string | null;
+  cached: string[];
+  timings_ms: Record<string, number>;
+}
+
 export const DetectionService = {
   async checkHealth(): Promise<boolean> {
     try {
-      const res = await ApiService.fetchData<null, { status: string }>({
+      const res = await ApiService.fetchData<null, { status: string; models?: Record<string, string> }>({
         url: '/obj-det/health',
         method: 'GET',
       });
-      return res.data.status === 'online';
+      // Online but still loading the classifier is not usable yet
+      return res.data.status === 'online' && (res.data.models?.classifier ?? 'ready') === 'ready';
     } catch {
       return false;
     }
@@ -38,6 +49,21 @@ export const DetectionService = {
     return res.data;
   },
 
+  // Classify and, when the damage warrants it, repair: one upload of the image and mask
+  async runPipeline(image: File, mask: File): Promise<PipelineResponse> {
+    const formData = new FormData();
+    formData.append("image", image);
+    formData.append("mask", mask);
+
+    const res = await ApiService.fetchData<FormData, PipelineResponse>({
+      url: '/obj-det/pipeline',
+      method: 'POST',
+      data: formData,
+      headers: { 'Content-Type': 'multipart/form-data' }
+    });
+    return res.data;
+  },
+
   async inPaint(image: File, mask: File): Promise<InpaintResponse> {
     const formData = new FormData();
     formData.append("image", image);
@@ -20,6 +20,23 @@ export interface ForecastResponse {
 export interface HistoryResponse {
     history: HistoryItem[];
     count: number;
+    // Rows in the requested range when max_points dropped some
+    downsampled_from?: number;
+}
+
+// Month range (YYYY-MM, inclusive) and point cap; the server downsamples with LTTB
+export interface SeriesWindow {
+    start?: string;
+    end?: string;
+    max_points?: number;
+}
+
+export interface DashboardResponse {
+    history: HistoryResponse | null;
+    metrics: any | null;
+    forecasts: Record<string, ForecastResponse | null>;
+    errors: Record<string, string>;
+    stale: string[];
 }
 
 export interface StreamOptions {
@@ -28,19 +45,30 @@ export interface StreamOptions {
 }
 
 export const ForecastService = {
-    async getForecast(steps: number = 12): Promise<ForecastResponse> {
+    async getForecast(steps: number = 12, window: SeriesWindow = {}): Promise<ForecastResponse> {
         const res = await ApiService.fetchData<null, ForecastResponse>({
             url: '/ts-model/forecast',
             method: 'GET',
-            params: { steps }
+            params: { steps, ...window }
         });
         return res.data;
     },
     
-    async getHistory(): Promise<HistoryResponse> {
+    async getHistory(window: SeriesWindow = {}): Promise<HistoryResponse> {
         const res = await ApiService.fetchData<null, HistoryResponse>({
             url: '/ts-model/history',
-            method: 'GET'
+            method: 'GET',
+            params: window
+        });
+        return res.data;
+    },
+
+    // History, metrics and several forecast horizons in one request; failed parts are null
+    async getDashboard(steps: number[] = [12], window: SeriesWindow = {}): Promise<DashboardResponse> {
+        const res = await ApiService.fetchData<null, DashboardResponse>({
+            url: '/ts-model/dashboard',
+            method: 'GET',
+            params: { steps: steps.join(','), ...window }
         });
         return res.data;
     },
@@ -1,17 +1,95 @@
 import io
 import base64
+import cProfile
+import hashlib
+import json
 import os
-from flask import Flask, jsonify, request
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+import jwt
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 from ultralytics import YOLO
-from PIL import Image, ImageFilter
+from PIL import Image
+import numpy as np
 import torch
 from diffusers import StableDiffusionInpaintPipeline
-from waitress import serve
+from waitress import create_server
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+from preprocess import CLASSIFIER_SIZE, INPAINT_SIZE, classifier_input, decode, inpaint_image, inpaint_mask
 
 app = Flask(__name__)
 CORS(app)
 
+# -------------------------
+# Metrics (Prometheus, served on /metrics)
+# -------------------------
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+
+REQUEST_LATENCY = Histogram("inference_http_request_duration_seconds", "Request latency by route", ["route", "status"], buckets=LATENCY_BUCKETS)
+IN_FLIGHT = Gauge("inference_http_requests_in_flight", "Requests currently being handled", ["route"])
+REQUEST_SIZE = Histogram("inference_http_request_size_bytes", "Upload size by route", ["route"], buckets=SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram("inference_http_response_size_bytes", "Response size by route", ["route"], buckets=SIZE_BUCKETS)
+MODEL_LATENCY = Histogram("inference_model_duration_seconds", "Time inside the model call", ["model"], buckets=LATENCY_BUCKETS)
+BATCH_SIZE = Histogram("inference_batch_size", "Images per model call", ["model"], buckets=(1, 2, 4, 8, 16, 32))
+LOAD_TIME = Gauge("inference_model_load_seconds", "Time taken to load each model or pipeline", ["model"])
+STARTUP_PHASE = Gauge("inference_startup_phase_seconds", "Time spent in each startup phase", ["component", "phase"])
+
+# -------------------------
+# Request tracing: X-Request-ID from the web app, Server-Timing spans back to it
+# -------------------------
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 5000))
+
+@contextmanager
+def span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.spans[name] = g.spans.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+@app.before_request
+def start_timer():
+    g.route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.spans = {}
+    g.started = time.perf_counter()
+    IN_FLIGHT.labels(g.route).inc()
+
+@app.after_request
+def record_response(response):
+    elapsed = time.perf_counter() - g.started
+    REQUEST_LATENCY.labels(g.route, str(response.status_code)).observe(elapsed)
+    if request.content_length:
+        REQUEST_SIZE.labels(g.route).observe(request.content_length)
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(g.route).observe(response.content_length)
+
+    timing = [f"{name};dur={ms:.1f}" for name, ms in g.spans.items()]
+    timing.append(f"total;dur={elapsed * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(timing)
+    response.headers["X-Request-ID"] = g.request_id
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        print("Slow request " + json.dumps({
+            "request_id": g.request_id,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(elapsed * 1000, 1),
+            "spans_ms": {name: round(ms, 1) for name, ms in g.spans.items()}
+        }))
+    return response
+
+@app.teardown_request
+def stop_timer(exc):
+    if "route" in g:
+        IN_FLIGHT.labels(g.route).dec()
+
 # -------------------------
 # Hardware Detection & Logging
 # -------------------------
@@ -36,78 +114,340 @@ print("="*50 + "\n")
 PROMPT = "a realistic, clean, undamaged car surface, smooth paint, factory condition"
 NEGATIVE_PROMPT = "scratches, dents, holes, cracks, damage, deformation, broken parts, unrealistic, warped, blurry, artifacts"
 
+# /pipeline only inpaints when the top class is bodywork the prompt can restore;
+# glass, lamps and tyres are replaced rather than repainted
+INPAINT_CLASSES = {name.strip() for name in os.getenv("INPAINT_CLASSES", "crack,dent,scratch").split(",") if name.strip()}
+INPAINT_MIN_SCORE = float(os.getenv("INPAINT_MIN_SCORE", 0.5))
+
+# -------------------------
+# Staged startup: Waitress binds first, then a background thread loads the
+# classifier and the inpainter in turn, each optionally warmed up with one
+# inference. Routes answer 503 until their model is ready; /ready reports
+# each model and the time spent in each phase.
+# -------------------------
+WARMUP_MODELS = {name.strip() for name in os.getenv("WARMUP_MODELS", "classifier,inpainter").split(",") if name.strip()}
+WARMUP_INPAINT_STEPS = int(os.getenv("WARMUP_INPAINT_STEPS", 2))
+RETRY_AFTER_SECONDS = 5
+
+def process_age():
+    """Seconds since this process started, so the imports above count as a startup phase (Linux only)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class ModelSlot:
+    """Load state of one model: pending, loading, warming, ready or failed, with per-phase timings."""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = "pending"
+        self.model = None
+        self.error = None
+        self.phases = {}
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - started, 3)
+            STARTUP_PHASE.labels(self.name, name).set(self.phases[name])
+
+    def start(self, load, warmup):
+        try:
+            self.state = "loading"
+            with self.phase("load"):
+                model = load()
+            LOAD_TIME.labels(self.name).set(self.phases["load"])
+        except Exception as e:
+            self.state, self.error = "failed", str(e)
+            print(f"Loading {self.name} failed: {e}")
+            return
+        self.model = model
+        if self.name in WARMUP_MODELS:
+            self.state = "warming"
+            try:
+                with self.phase("warmup"):
+                    warmup(model)
+            except Exception as e:
+                # A failed warm-up only means the first request pays for it
+                self.error = f"warm-up failed: {e}"
+                print(f"Warming up {self.name} failed: {e}")
+        self.state = "ready"
+        print(f"{self.name} ready: {self.phases}")
+
+    def status(self):
+        return {"state": self.state, "phases_s": dict(self.phases), "error": self.error}
+
+MODELS = {"classifier": ModelSlot("classifier"), "inpainter": ModelSlot("inpainter")}
+SERVICE_PHASES = {}
+
+def service_phase(name, seconds):
+    if seconds is not None:
+        SERVICE_PHASES[name] = round(seconds, 3)
+        STARTUP_PHASE.labels("service", name).set(seconds)
+
+service_phase("imports", process_age())
+
+def not_ready(name):
+    """503 with Retry-After while a model is still loading (or failed to)."""
+    slot = MODELS[name]
+    response = jsonify({"error": f"{name} is {slot.state}", "retry_after": RETRY_AFTER_SECONDS})
+    response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+    return response, 503
+
 # -------------------------
 # Classification Model (CPU/OpenVINO)
 # -------------------------
 MODEL_PATH = "models/best_int8_openvino_model"
-clf_model = YOLO(MODEL_PATH, task="classify")
-print(f"YOLO Classification: Loaded {MODEL_PATH}")
+
+def load_classifier():
+    model = YOLO(MODEL_PATH, task="classify")
+    print(f"YOLO Classification: Loaded {MODEL_PATH}")
+    return model
+
+def warm_classifier(model):
+    # First predict compiles the OpenVINO graph
+    model.predict(np.zeros((CLASSIFIER_SIZE, CLASSIFIER_SIZE, 3), dtype=np.uint8), device="cpu", verbose=False)
+
+INPAINT_MODEL_ID = "runwayml/stable-diffusion-inpainting"
+
+def model_version():
+    """Digest of the classifier files and the inpainter id; the web app keys its cache on it."""
+    digest = hashlib.md5(INPAINT_MODEL_ID.encode())
+    for root, dirs, files in sorted(os.walk(MODEL_PATH)):
+        dirs.sort()
+        for name in sorted(files):
+            with open(os.path.join(root, name), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+MODEL_VERSION = os.getenv("MODEL_VERSION") or model_version()
 print(f"   Inference Device: CPU (OpenVINO optimized)")
 
 # -------------------------
-# Inpainting Pipeline (Lazy Loading)
+# Inpainting Pipeline (loaded in the background after the classifier)
 # -------------------------
-pipe = None
+def load_inpainter():
+    print("\nLoading Stable Diffusion Inpainting Pipeline...")
+    print(f"   Target Device: {DEVICE.upper()}")
 
-def get_inpaint_pipe():
-    global pipe
-    if pipe is None:
-        print("\nLoading Stable Diffusion Inpainting Pipeline...")
-        print(f"   Target Device: {DEVICE.upper()}")
-        
-        pipe = StableDiffusionInpaintPipeline.from_pretrained(
-            "runwayml/stable-diffusion-inpainting",
-            torch_dtype=T_DTYPE,
-            variant="fp16" if DEVICE == "cuda" else None,
-            use_safetensors=True
-        )
+    pipe = StableDiffusionInpaintPipeline.from_pretrained(
+        INPAINT_MODEL_ID,
+        torch_dtype=T_DTYPE,
+        variant="fp16" if DEVICE == "cuda" else None,
+        use_safetensors=True
+    )
+    
+    if DEVICE == "cuda":
+        pipe.vae.enable_slicing() 
         
-        if DEVICE == "cuda":
-            pipe.vae.enable_slicing() 
-            
-            if vram_gb < 3.0:
-                print("   Warning: Very Low VRAM (<3GB). Enabling Sequential CPU Offload.")
-                pipe.enable_sequential_cpu_offload()
-            else:
-                print("   System specs sufficient (3GB+). Enabling Model GPU-Accelerated Pipeline.")
-                pipe.enable_model_cpu_offload()
-                pipe.enable_attention_slicing()
+        if vram_gb < 3.0:
+            print("   Warning: Very Low VRAM (<3GB). Enabling Sequential CPU Offload.")
+            pipe.enable_sequential_cpu_offload()
         else:
-            pipe.to("cpu")
-            print("   Warning: Running Inpainter on CPU.")
-            
-        print(f"Inpainting pipeline ready on {DEVICE.upper()}.\n")
+            print("   System specs sufficient (3GB+). Enabling Model GPU-Accelerated Pipeline.")
+            pipe.enable_model_cpu_offload()
+            pipe.enable_attention_slicing()
+    else:
+        pipe.to("cpu")
+        print("   Warning: Running Inpainter on CPU.")
+
+    print(f"Inpainting pipeline ready on {DEVICE.upper()}.\n")
     return pipe
 
+def warm_inpainter(pipe):
+    # A couple of denoising steps load the weights onto the device and pick the kernels
+    blank = Image.new("RGB", (INPAINT_SIZE, INPAINT_SIZE))
+    with torch.inference_mode():
+        pipe(prompt=PROMPT, image=blank, mask_image=blank, num_inference_steps=WARMUP_INPAINT_STEPS)
+
+def load_models():
+    """Classifier first, so classification is served while the much larger inpainter loads."""
+    MODELS["classifier"].start(load_classifier, warm_classifier)
+    MODELS["inpainter"].start(load_inpainter, warm_inpainter)
+
 # -------------------------
 # API Routes
 # -------------------------
 
 @app.route("/health", methods=["GET"])
 def health():
+    # Liveness: up as soon as Waitress listens; see /ready for the models
     return jsonify({
         "status": "online", 
         "device": DEVICE,
         "vram_gb": round(vram_gb, 2),
-        "inpainter_loaded": pipe is not None
+        "inpainter_loaded": MODELS["inpainter"].ready,
+        "models": {name: slot.state for name, slot in MODELS.items()},
+        "model_version": MODEL_VERSION
     }), 200
 
+@app.route("/ready", methods=["GET"])
+@app.route("/ready/<name>", methods=["GET"])
+def ready(name="classifier"):
+    """200 once `name` (default: the classifier, enough to serve traffic) is ready, else 503. Reports every model."""
+    if name not in MODELS:
+        return jsonify({"error": f"Unknown model {name}"}), 404
+    return jsonify({
+        "ready": MODELS[name].ready,
+        "models": {model: slot.status() for model, slot in MODELS.items()},
+        "service_phases_s": SERVICE_PHASES
+    }), 200 if MODELS[name].ready else 503
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+# -------------------------
+# Profiling (internal_proxy token only), same API as the web app's /debug/profile
+# -------------------------
+SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 10)) / 1000
+IDLE_FILES = {"threading.py", "selectors.py", "queue.py", "socket.py", "ssl.py", "wasyncore.py"}
+sampling = threading.Lock()
+request_profiling = threading.Lock()
+
+def is_internal_proxy(token):
+    try:
+        return jwt.decode(token or "", SECRET_KEY, algorithms=["HS256"]).get("sub") == "internal_proxy"
+    except jwt.PyJWTError:
+        return False
+
+def sample_stacks(seconds, include_idle):
+    """Counts collapsed Python stacks of every other thread. Native torch/OpenVINO threads are not visible."""
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    counts = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (not include_idle and os.path.basename(frame.f_code.co_filename) in IDLE_FILES):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_qualname}")
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(PROFILE_INTERVAL)
+    return counts
+
+@app.route("/debug/profile", methods=["GET"])
+def debug_profile():
+    if not is_internal_proxy(request.headers.get("Authorization", "").removeprefix("Bearer ")):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    seconds = min(max(request.args.get("seconds", default=10, type=float), 0.1), PROFILE_MAX_SECONDS)
+    if not sampling.acquire(blocking=False):
+        return jsonify({"error": "A profile is already running"}), 409
+    try:
+        counts = sample_stacks(seconds, request.args.get("idle", "false").lower() == "true")
+    finally:
+        sampling.release()
+
+    if request.args.get("format") == "speedscope":
+        index, samples = {}, []
+        for stack in counts:
+            samples.append([index.setdefault(f, len(index)) for f in stack.split(";")])
+        frames = [{"name": f} for f in index]
+        return jsonify({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled", "name": f"inference pid {os.getpid()}, {seconds:g}s", "unit": "none",
+                "startValue": 0, "endValue": sum(counts.values()),
+                "samples": samples, "weights": list(counts.values())
+            }]
+        })
+    return Response("".join(f"{stack} {n}\n" for stack, n in counts.most_common()), mimetype="text/plain")
+
+@app.before_request
+def start_request_profile():
+    # X-Profile: <internal_proxy token> runs this request under cProfile; the report goes to the log
+    if is_internal_proxy(request.headers.get("X-Profile")) and request_profiling.acquire(blocking=False):
+        g.profile = cProfile.Profile()
+        g.profile.enable()
+
+@app.teardown_request
+def stop_request_profile(exc):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.disable()
+        request_profiling.release()
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).strip_dirs().sort_stats("cumulative").print_stats(60)
+        print(f"Profile for request {g.request_id}:\n{out.getvalue()}")
+
+def classify(pixels):
+    """Top 3 classes and scores for a classifier_input array."""
+    BATCH_SIZE.labels("classifier").observe(1)
+    with MODEL_LATENCY.labels("classifier").time():
+        results = MODELS["classifier"].model.predict(pixels, device="cpu")
+    r = results[0]
+    response = []
+    if r.probs is not None:
+        for idx, score in zip(r.probs.top5[:3], r.probs.top5conf.tolist()[:3]):
+            response.append({
+                "name": r.names[idx],
+                "score": float(score)
+            })
+    return response
+
+def run_inpaint(inpainter, img, msk):
+    print(f"Starting Inpaint Inference on {DEVICE.upper()}...")
+    generator = torch.Generator(device=DEVICE).manual_seed(42)
+
+    BATCH_SIZE.labels("inpainter").observe(1)
+    with torch.inference_mode(), MODEL_LATENCY.labels("inpainter").time():
+        return inpainter(
+            prompt=PROMPT,
+            negative_prompt=NEGATIVE_PROMPT,
+            image=img,
+            mask_image=msk,
+            num_inference_steps=30,
+            guidance_scale=7.5,
+            strength=0.9,
+            generator=generator
+        ).images[0]
+
+def encode_png(image):
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+def inpaint_skip_reason(prediction):
+    """Why the top class does not call for inpainting, or None when it does."""
+    if not prediction:
+        return "no classification"
+    top = prediction[0]
+    if top["name"] not in INPAINT_CLASSES:
+        return f"{top['name']} is not repaired by inpainting"
+    if top["score"] < INPAINT_MIN_SCORE:
+        return f"{top['name']} scored {top['score']:.2f}, below {INPAINT_MIN_SCORE}"
+    return None
+
 @app.route("/predictImage", methods=["POST"])
 def predictImage():
     if "file" not in request.files:
         return jsonify({"error": "No file provided"}), 400
+    if not MODELS["classifier"].ready:
+        return not_ready("classifier")
     try:
-        image_bytes = request.files["file"].read()
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        results = clf_model.predict(image, device="cpu")
-        r = results[0]
-        response = []
-        if r.probs is not None:
-            for idx, score in zip(r.probs.top5[:3], r.probs.top5conf.tolist()[:3]):
-                response.append({
-                    "name": r.names[idx],
-                    "score": float(score)
-                })
+        with span("decode"):
+            image = decode(request.files["file"].read(), "RGB", (CLASSIFIER_SIZE, CLASSIFIER_SIZE))
+            pixels = classifier_input(image)
+        with span("model"):
+            response = classify(pixels)
         return jsonify({"result": response})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -119,42 +459,91 @@ def inpaint():
 
     if not image_file or not mask_file:
         return jsonify({"error": "Image and mask required"}), 400
+    if not MODELS["inpainter"].ready:
+        return not_ready("inpainter")
 
     try:
-        inpainter = get_inpaint_pipe()
+        inpainter = MODELS["inpainter"].model
         
         if DEVICE == "cuda":
             torch.cuda.empty_cache()
 
-        img = Image.open(io.BytesIO(image_file.read())).convert("RGB").resize((512, 512))
-        msk = Image.open(io.BytesIO(mask_file.read())).convert("RGB").resize((512, 512))
-        msk = msk.filter(ImageFilter.GaussianBlur(radius=2))
-
-        print(f"Starting Inpaint Inference on {DEVICE.upper()}...")
-        generator = torch.Generator(device=DEVICE).manual_seed(42)
-
-        with torch.inference_mode():
-            result = inpainter(
-                prompt=PROMPT,
-                negative_prompt=NEGATIVE_PROMPT,
-                image=img,
-                mask_image=msk,
-                num_inference_steps=30,
-                guidance_scale=7.5,
-                strength=0.9,
-                generator=generator
-            ).images[0]
-
-        buf = io.BytesIO()
-        result.save(buf, format="PNG")
+        with span("decode"):
+            img = inpaint_image(decode(image_file.read(), "RGB"))
+            msk = inpaint_mask(decode(mask_file.read(), "L"))
+
+        with span("model"):
+            result = run_inpaint(inpainter, img, msk)
+
+        with span("encode"):
+            encoded = encode_png(result)
         print("Inpaint Complete.")
         
-        return jsonify({"image": base64.b64encode(buf.getvalue()).decode("utf-8")})
+        return jsonify({"image": encoded})
     except Exception as e:
         print(f"Inpaint Error: {str(e)}")
         return jsonify({"error": f"Inpainting failed: {str(e)}"}), 500
 
+@app.route("/pipeline", methods=["POST"])
+def pipeline():
+    """
+    Classify, then inpaint when the top class calls for it, from one upload
+    decoded once. `prediction` and `inpaint` have the /predictImage and
+    /inpaint response shapes; `inpaint` is null with the reason in
+    `inpaint_skipped` or `inpaint_error`. `timings_ms` has each stage.
+    """
+    image_file = request.files.get("image")
+    mask_file = request.files.get("mask")
+
+    if not image_file or not mask_file:
+        return jsonify({"error": "Image and mask required"}), 400
+    if not MODELS["classifier"].ready:
+        return not_ready("classifier")
+
+    try:
+        with span("decode"):
+            # Decoded once at the inpainter's size; the classifier input comes from the same image
+            image = decode(image_file.read(), "RGB")
+            pixels = classifier_input(image)
+        with span("classify"):
+            prediction = classify(pixels)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    body = {
+        "prediction": {"result": prediction},
+        "inpaint": None,
+        "inpaint_skipped": inpaint_skip_reason(prediction),
+        "inpaint_error": None
+    }
+    if body["inpaint_skipped"] is None and not MODELS["inpainter"].ready:
+        # The classification still stands; the caller can retry the repair
+        body["inpaint_error"] = f"inpainter is {MODELS['inpainter'].state}"
+    elif body["inpaint_skipped"] is None:
+        try:
+            inpainter = MODELS["inpainter"].model
+            if DEVICE == "cuda":
+                torch.cuda.empty_cache()
+            with span("prepare"):
+                img = inpaint_image(image)
+                msk = inpaint_mask(decode(mask_file.read(), "L"))
+            with span("inpaint"):
+                result = run_inpaint(inpainter, img, msk)
+            with span("encode"):
+                body["inpaint"] = {"image": encode_png(result)}
+            print("Inpaint Complete.")
+        except Exception as e:
+            # The classification still stands
+            print(f"Inpaint Error: {str(e)}")
+            body["inpaint_error"] = f"Inpainting failed: {str(e)}"
+
+    body["timings_ms"] = {name: round(ms, 1) for name, ms in g.spans.items()}
+    return jsonify(body)
+
 if __name__ == "__main__":
     print("Starting Inference Service with Waitress on port 5001...")
-    get_inpaint_pipe()
-    serve(app, host="0.0.0.0", port=5001, threads=4)
+    # Several threads, so one request's decode overlaps another's model call
+    server = create_server(app, host="0.0.0.0", port=5001, threads=int(os.getenv("INFERENCE_THREADS", 4)))
+    service_phase("listening", process_age())
+    threading.Thread(target=load_models, name="model-loader", daemon=True).start()
+    server.run()
@@ -0,0 +1,59 @@
+"""
+Upload decoding for the models, kept free of torch so the decode benchmark
+can import it.
+
+JPEGs are decoded with Image.draft, which has libjpeg scale the DCT by 1/2,
+1/4 or 1/8 to the smallest size that still covers the model's input, so a
+4000x3000 phone photo is never decoded or converted at full size. Other
+formats decode in full. Each model input then comes from one resize.
+
+Decoding and resizing release the GIL, so with several Waitress threads one
+request decodes while another is inside a model call.
+"""
+import io
+import threading
+import numpy as np
+from PIL import Image, ImageFilter
+
+CLASSIFIER_SIZE = 224
+INPAINT_SIZE = 512
+MASK_FEATHER = 2
+
+_buffers = threading.local()
+
+def decode(data, mode="RGB", size=(INPAINT_SIZE, INPAINT_SIZE)):
+    """Decodes upload bytes in `mode`, at reduced resolution for JPEGs but never below `size`."""
+    image = Image.open(io.BytesIO(data))
+    # No-op for formats other than JPEG
+    image.draft(mode, size)
+    return image if image.mode == mode else image.convert(mode)
+
+def _buffer(name, shape):
+    """A uint8 array kept per thread, so a Waitress worker reuses one per input."""
+    buf = getattr(_buffers, name, None)
+    if buf is None or buf.shape != shape:
+        buf = np.empty(shape, dtype=np.uint8)
+        setattr(_buffers, name, buf)
+    return buf
+
+def classifier_input(image, size=CLASSIFIER_SIZE):
+    """
+    The classifier's input from a decoded RGB image: the centred square
+    scaled to size x size in one resize, as Ultralytics' classify transforms
+    would, written as BGR (how Ultralytics reads arrays) into this thread's
+    buffer. The buffer is overwritten by the thread's next call.
+    """
+    w, h = image.size
+    side = min(w, h)
+    box = ((w - side) / 2, (h - side) / 2, (w + side) / 2, (h + side) / 2)
+    small = image.resize((size, size), Image.BILINEAR, box=box)
+    buf = _buffer("classifier", (size, size, 3))
+    np.copyto(buf, np.asarray(small)[:, :, ::-1])
+    return buf
+
+def inpaint_image(image, size=INPAINT_SIZE):
+    return image.resize((size, size))
+
+def inpaint_mask(mask, size=INPAINT_SIZE):
+    """Mask from a decoded greyscale image: size x size with the edge feathered."""
+    return mask.resize((size, size)).filter(ImageFilter.GaussianBlur(radius=MASK_FEATHER))
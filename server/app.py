@@ -3,16 +3,27 @@ import sys
 import datetime
 import jwt
 import redis
+import requests
 from functools import wraps
 from pathlib import Path
-from flask import Flask, request, jsonify, g
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, Response, request, jsonify, g
 from waitress import serve
 from dotenv import load_dotenv
 from flask_cors import CORS
-from server.extensions import db
+from sqlalchemy import insert
+from server.extensions import db, enable_sqlite_pragmas
 from server.models.user import User
 from server.utils.auth import token_required
+from server.utils.cache import build_cache_key
+from server.utils.cache_namespaces import PATH_NAMESPACES, build_namespaces
+from server.utils.sarima_engine import load_engine
+from server.utils.http_cache import READ_LUA
+from server.utils.user_cache import UserCache
+from server.utils.hashing import HashingPool, HashPoolBusy
+from server.utils.rate_limit import FairQuota, TokenBucket
+from server.utils.resilience import build_upstreams
+from server.utils.warmup import Warmer
+from server.utils import metrics, profiler, tracing
 
 # Pathing
 project_root = Path(__file__).resolve().parent.parent
@@ -21,13 +32,15 @@ load_dotenv(project_root / ".env")
 
 app = Flask(__name__)
 
-# Cors configuration
+# Cors configuration (kept in config so the async app can apply the same policy)
+app.config['CORS_ORIGINS'] = ["http://localhost:5111", "http://127.0.0.1:5111", "http://localhost:8081", "http://127.0.0.1:8081", "http://127.0.0.1:5001", "http://localhost:5001"]
+app.config['CORS_EXPOSE_HEADERS'] = ["Content-Type", "Authorization", "Content-Disposition", "Server-Timing", "X-Request-ID", "ETag", "Retry-After"]
 CORS(app, resources={
     r"/*": {
-        "origins": ["http://localhost:5111", "http://127.0.0.1:5111", "http://localhost:8081", "http://127.0.0.1:8081", "http://127.0.0.1:5001", "http://localhost:5001"],
+        "origins": app.config['CORS_ORIGINS'],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With"],
-        "expose_headers": ["Content-Type", "Authorization", "Content-Disposition"]
+        "allow_headers": ["Content-Type", "Authorization", "Accept", "X-Requested-With", "If-None-Match"],
+        "expose_headers": app.config['CORS_EXPOSE_HEADERS']
     }
 })
 
@@ -41,15 +54,110 @@ app.config['KEYDB_URL'] = os.getenv("KEYDB_URL", "redis://cache-db:6379/0")
 app.config['GEMINI_API_KEY'] = os.getenv('GEMINI_API_KEY')
 app.config['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
 
-db_path = Path(__file__).parent / "users.db"
+# In-process user/token cache used by token_required
+app.config['USER_CACHE_TTL'] = int(os.getenv("USER_CACHE_TTL", 60))
+app.config['USER_CACHE_SIZE'] = int(os.getenv("USER_CACHE_SIZE", 1024))
+
+# Upper bound on accounts per /bulk-register call
+app.config['BULK_USER_LIMIT'] = int(os.getenv("BULK_USER_LIMIT", 5000))
+
+# Password hashing runs off the request threads on a bounded process pool
+app.config['HASH_POOL_WORKERS'] = int(os.getenv("HASH_POOL_WORKERS", 2))
+app.config['HASH_POOL_MAX_QUEUE'] = int(os.getenv("HASH_POOL_MAX_QUEUE", 16))
+app.config['HASH_TIMEOUT'] = float(os.getenv("HASH_TIMEOUT", 10))
+# Hash jobs admitted at once; each admitted login/register holds a request thread while it waits,
+# so this stays below SERVER_THREADS (default: half of them)
+app.config['HASH_POOL_MAX_ADMITTED'] = int(os.getenv("HASH_POOL_MAX_ADMITTED", 0))
+
+# Login/register token buckets: burst size and refill per minute
+app.config['AUTH_USER_BURST'] = int(os.getenv("AUTH_USER_BURST", 5))
+app.config['AUTH_USER_PER_MIN'] = float(os.getenv("AUTH_USER_PER_MIN", 5))
+app.config['AUTH_IP_BURST'] = int(os.getenv("AUTH_IP_BURST", 20))
+app.config['AUTH_IP_PER_MIN'] = float(os.getenv("AUTH_IP_PER_MIN", 30))
+
+# Per-user quotas for the expensive routes, in cost units: each user's bucket (burst, refill per minute),
+# the budget per upstream that users queue for in turn when it runs short, and what each route costs
+# (reorder is per CSV row). QUOTA_QUEUE_GRACE is how long a queued user keeps their place past their retry time
+app.config['QUOTA_ENABLED'] = os.getenv("QUOTA_ENABLED", "true").lower() == "true"
+app.config['QUOTA_USER_BURST'] = float(os.getenv("QUOTA_USER_BURST", 200))
+app.config['QUOTA_USER_PER_MIN'] = float(os.getenv("QUOTA_USER_PER_MIN", 100))
+app.config['QUOTA_POOLS'] = {
+    pool: (float(os.getenv(f"QUOTA_{pool.upper()}_BURST", burst)), float(os.getenv(f"QUOTA_{pool.upper()}_PER_MIN", per_min)))
+    for pool, burst, per_min in (('inference', 400, 600), ('gemini', 200, 200), ('openai', 1000, 1000))
+}
+app.config['QUOTA_COSTS'] = {
+    route: float(os.getenv(f"QUOTA_COST_{route.upper()}", cost))
+    for route, cost in (('predict', 1), ('inpaint', 20), ('pipeline', 20), ('report', 50), ('reorder', 1))
+}
+app.config['QUOTA_QUEUE_GRACE'] = float(os.getenv("QUOTA_QUEUE_GRACE", 5))
+# Users with the most cost per pool to export on /metrics
+app.config['QUOTA_METRICS_USERS'] = int(os.getenv("QUOTA_METRICS_USERS", 50))
+
+# Per-upstream bulkheads (max concurrent calls) and circuit breakers
+app.config['BULKHEAD_SARIMA'] = int(os.getenv("BULKHEAD_SARIMA", 16))
+app.config['BULKHEAD_INFERENCE'] = int(os.getenv("BULKHEAD_INFERENCE", 4))
+app.config['BULKHEAD_GEMINI'] = int(os.getenv("BULKHEAD_GEMINI", 4))
+app.config['BULKHEAD_OPENAI'] = int(os.getenv("BULKHEAD_OPENAI", 8))
+app.config['BREAKER_FAILURE_THRESHOLD'] = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+app.config['BREAKER_RESET_SECONDS'] = float(os.getenv("BREAKER_RESET_SECONDS", 30))
+
+# Reorder model is loaded lazily; set to true to pay the load at startup instead
+app.config['REORDER_MODEL_WARMUP'] = os.getenv("REORDER_MODEL_WARMUP", "false").lower() == "true"
+
+# Serving: "threaded" (Waitress), "async" (Hypercorn, proxy routes run as coroutines)
+# or "prefork" (Gunicorn, one preloaded worker process per available CPU)
+app.config['SERVER_MODE'] = os.getenv("SERVER_MODE", "threaded").lower()
+app.config['ASYNC_MAX_CONNECTIONS'] = int(os.getenv("ASYNC_MAX_CONNECTIONS", 1000))
+
+# Requests slower than this are logged with their Server-Timing breakdown
+app.config['SLOW_REQUEST_MS'] = float(os.getenv("SLOW_REQUEST_MS", 2000))
+
+# /debug/profile: longest sampling window, sampling interval, and how long X-Profile reports are kept
+app.config['PROFILE_MAX_SECONDS'] = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+app.config['PROFILE_INTERVAL_MS'] = float(os.getenv("PROFILE_INTERVAL_MS", 10))
+app.config['PROFILE_TTL'] = int(os.getenv("PROFILE_TTL", 3600))
+
+# Cache warm-up: how often to check (seconds, +/- jitter fraction), how close to expiry an entry
+# is refreshed, and which forecast horizons to keep warm. WARMUP_REPORT=false skips the Gemini report and PDF
+app.config['WARMUP_ENABLED'] = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+app.config['WARMUP_INTERVAL'] = float(os.getenv("WARMUP_INTERVAL", 60))
+app.config['WARMUP_JITTER'] = float(os.getenv("WARMUP_JITTER", 0.2))
+app.config['WARMUP_REFRESH_AHEAD'] = int(os.getenv("WARMUP_REFRESH_AHEAD", 600))
+app.config['WARMUP_FORECAST_STEPS'] = [int(s) for s in os.getenv("WARMUP_FORECAST_STEPS", "12,24,48").split(",") if s.strip()]
+app.config['WARMUP_REPORT'] = os.getenv("WARMUP_REPORT", "true").lower() == "true"
+
+# Cached responses are keyed on the upstream model version, re-checked this often (seconds).
+# SARIMA_MODEL_VERSION pins it when the ts-model API reports none
+app.config['CACHE_NAMESPACE_POLL'] = float(os.getenv("CACHE_NAMESPACE_POLL", 60))
+app.config['SARIMA_MODEL_VERSION'] = os.getenv("SARIMA_MODEL_VERSION")
+
+# Embedded SARIMA engine: an export made with `python -m server.utils.sarima_engine`, and the ts-model
+# routes (forecast, history, metrics) to answer from it instead of the ts-model API
+app.config['SARIMA_PARAMS_PATH'] = os.getenv("SARIMA_PARAMS_PATH")
+app.config['SARIMA_LOCAL_ROUTES'] = {r.strip() for r in os.getenv("SARIMA_LOCAL_ROUTES", "forecast,history,metrics").split(",") if r.strip()}
+
+# Waitress request threads; the SQLite connection pool is sized to match
+app.config['SERVER_THREADS'] = int(os.getenv("SERVER_THREADS", 8))
+
+# USERS_DB_PATH lets tests and benchmarks use a throwaway database
+db_path = Path(os.getenv("USERS_DB_PATH", Path(__file__).parent / "users.db"))
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': app.config['SERVER_THREADS'],
+    'max_overflow': 2,
+    'connect_args': {'check_same_thread': False, 'timeout': 5}
+}
 os.environ["ULTRALYTICS_NO_AUTOUPDATE"] = "1"
 
 db.init_app(app)
 
 with app.app_context():
+    enable_sqlite_pragmas(db.engine)
     db.create_all()
+    # create_all skips tables that already exist, so add indexes to older users.db files
+    for index in User.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
 
 # KeyDB cache
 cache = redis.Redis.from_url(
@@ -58,19 +166,92 @@ cache = redis.Redis.from_url(
 )
 app.cache = cache
 
+# Same KeyDB without response decoding: cached JSON is served as the stored bytes (see utils/http_cache.py)
+app.cache_raw = redis.Redis.from_url(app.config['KEYDB_URL'])
+app.cached_json_script = app.cache_raw.register_script(READ_LUA)
+
+app.user_cache = UserCache(
+    maxsize=app.config['USER_CACHE_SIZE'],
+    ttl=app.config['USER_CACHE_TTL']
+)
+
+def init_process_resources():
+    """
+    Sockets and threads that must belong to a single process. Runs at import,
+    and again in every forked worker (see server/gunicorn_conf.py) so workers
+    never share KeyDB, HTTP or SQLite connections with the master.
+    """
+    app.cache.connection_pool.reset()
+    app.cache_raw.connection_pool.reset()
+
+    # Keep-alive pool for upstream calls, one connection per request thread.
+    # Forwards X-Request-ID so upstream logs line up with ours
+    app.http = tracing.TracedSession()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=app.config['SERVER_THREADS'])
+    app.http.mount("http://", adapter)
+    app.http.mount("https://", adapter)
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    app.user_cache.start_listener(app.cache)
+
+app.init_process_resources = init_process_resources
+init_process_resources()
+
+app.upstreams = build_upstreams(app.config)
+
+app.hash_pool = HashingPool(
+    workers=app.config['HASH_POOL_WORKERS'],
+    max_queue=app.config['HASH_POOL_MAX_QUEUE'],
+    timeout=app.config['HASH_TIMEOUT'],
+    max_admitted=max(1, min(
+        app.config['HASH_POOL_MAX_ADMITTED'] or app.config['SERVER_THREADS'] // 2,
+        app.config['SERVER_THREADS'] - 1
+    ))
+)
+
+# Per-route latency, in-flight and payload size for every request; served on /metrics
+metrics.init_app(app)
+# X-Request-ID, Server-Timing and the slow-request log
+tracing.init_app(app)
+# cProfile for single requests sent with an X-Profile header (see /debug/profile)
+profiler.init_app(app)
+
+auth_user_bucket = TokenBucket(cache, "ratelimit:auth:user", app.config['AUTH_USER_BURST'], app.config['AUTH_USER_PER_MIN'])
+auth_ip_bucket = TokenBucket(cache, "ratelimit:auth:ip", app.config['AUTH_IP_BURST'], app.config['AUTH_IP_PER_MIN'])
+
+# Checked by the expensive routes through utils/quota.py; None turns quotas off
+app.quota = FairQuota(
+    cache, "quota", app.config['QUOTA_USER_BURST'], app.config['QUOTA_USER_PER_MIN'],
+    app.config['QUOTA_POOLS'], app.config['QUOTA_QUEUE_GRACE']
+) if app.config['QUOTA_ENABLED'] else None
+
+def auth_rate_limited(username):
+    """Returns a 429 response if this username or client IP is out of login/register attempts."""
+    for bucket, identity in ((auth_ip_bucket, request.remote_addr), (auth_user_bucket, username)):
+        allowed, retry_after = bucket.consume(identity)
+        if not allowed:
+            resp = jsonify({'error': 'Too many attempts, please try again later'})
+            resp.headers['Retry-After'] = str(retry_after)
+            return resp, 429
+    return None
+
+def hash_pool_busy():
+    resp = jsonify({'error': 'Authentication service busy, please retry'})
+    resp.headers['Retry-After'] = '1'
+    return resp, 503
+
 # Global cache key helper
-def generate_cache_key(prefix="view", *args):
+def generate_cache_key(prefix="view", *args, path=None):
     """
-    Constructs a unique cache key.
+    Constructs a unique cache key, led by the namespace version for the path.
     Usage: generate_cache_key("forecast", steps)
-    Result: "view:/ts-model/forecast:12"
+    Result: "sarima@<model>.<gen>:forecast:/ts-model/forecast:12"
+    Pass `path` for another view's key, e.g. the report from the PDF route.
     """
-    key_parts = [prefix, request.path]
-    
-    for arg in args:
-        key_parts.append(str(arg))
-        
-    return ":".join(key_parts)
+    path = path or request.path
+    return app.cache_namespaces.qualify_path(path, build_cache_key(prefix, path, *args))
 
 app.generate_cache_key = generate_cache_key
 
@@ -79,10 +260,35 @@ def cache_health():
     try:
         # ping() returns True if KeyDB is alive
         status = app.cache.ping()
-        return jsonify({'cache_status': 'connected' if status else 'down'}), 200
+        return jsonify({
+            'cache_status': 'connected' if status else 'down',
+            'namespaces': app.cache_namespaces.versions
+        }), 200
     except Exception as e:
         return jsonify({'cache_status': 'error', 'message': str(e)}), 500
 
+@app.route('/cache/invalidate/<namespace>', methods=['POST'])
+@token_required
+def invalidate_cache(namespace):
+    """Drops one namespace's cached responses (sarima, inference, reorder). Internal proxy only."""
+    if g.token_sub != 'internal_proxy':
+        return jsonify({"error": "Unauthorized"}), 403
+    if namespace not in PATH_NAMESPACES.values():
+        return jsonify({"error": f"Unknown namespace {namespace}"}), 404
+    generation = app.cache_namespaces.invalidate(namespace)
+    return jsonify({"namespace": namespace, "generation": generation, "versions": app.cache_namespaces.versions}), 200
+
+@app.route('/health/hashing', methods=['GET'])
+def hashing_health():
+    """Hash pool occupancy, rejections and queue wait percentiles"""
+    return jsonify(app.hash_pool.stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint: route, cache, upstream and hash pool metrics"""
+    body, content_type = metrics.render(app)
+    return Response(body, content_type=content_type)
+
 def generate_token():
     """Generates a token for this server to talk to the Model API."""
     return jwt.encode({
@@ -94,11 +300,20 @@ def generate_token():
 # Attach to app object so Blueprints can access via current_app
 app.generate_token = generate_token
 
+app.sarima_engine = load_engine(app.config['SARIMA_PARAMS_PATH'])
+
+# Namespace versions for cache keys; the sync thread is started per serving process
+app.cache_namespaces = build_namespaces(app)
+
 # --- ROUTES ---
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for Makefile/Tests"""
-    return jsonify({'status': 'alive'}), 200
+    return jsonify({
+        'status': 'alive',
+        'upstreams': {name: upstream.snapshot() for name, upstream in app.upstreams.items()},
+        'warmup': app.warmer.status()
+    }), 200
 
 @app.route('/login', methods=['POST'])
 def login():
@@ -106,9 +321,19 @@ def login():
     if not data or not data.get('username') or not data.get('password'):
         return jsonify({'error': 'Missing username or password'}), 400
 
+    limited = auth_rate_limited(data.get('username'))
+    if limited:
+        return limited
+
     user = User.query.filter_by(username=data.get('username')).first()
-    
-    if user and check_password_hash(user.password, data.get('password')):
+
+    try:
+        with tracing.span('hash'):
+            valid = user is not None and app.hash_pool.check_password(user.password, data.get('password'))
+    except HashPoolBusy:
+        return hash_pool_busy()
+
+    if valid:
         token = jwt.encode({
             'sub': user.username,
             'iat': datetime.datetime.now(datetime.timezone.utc),
@@ -134,10 +359,18 @@ def register():
     if not all(k in data for k in ('username', 'email', 'password')):
         return jsonify({"error": "Required fields missing"}), 400
 
+    limited = auth_rate_limited(data.get('username'))
+    if limited:
+        return limited
+
     if User.query.filter_by(username=data.get('username')).first():
         return jsonify({"error": "Username already exists"}), 400
-    
-    hashed_password = generate_password_hash(data['password'], method='scrypt')
+
+    try:
+        with tracing.span('hash'):
+            hashed_password = app.hash_pool.hash_password(data['password'])
+    except HashPoolBusy:
+        return hash_pool_busy()
     
     new_user = User(
         username=data.get('username'), 
@@ -149,6 +382,73 @@ def register():
     db.session.commit()
     return jsonify({"message": "User created"}), 201
 
+# Every field /bulk-register reads from an entry; anything but a string is skipped
+USER_FIELDS = ('username', 'email', 'password', 'password_hash', 'name')
+
+@app.route('/bulk-register', methods=['POST'])
+@token_required
+def bulk_register():
+    """Provisions many accounts in one transaction. Internal proxy only."""
+    if g.token_sub != 'internal_proxy':
+        return jsonify({"error": "Unauthorized"}), 403
+
+    users = (request.get_json() or {}).get('users') or []
+    if not isinstance(users, list) or not users:
+        return jsonify({"error": "Expected a non-empty 'users' list"}), 400
+    if len(users) > app.config['BULK_USER_LIMIT']:
+        return jsonify({"error": f"At most {app.config['BULK_USER_LIMIT']} users per request"}), 400
+
+    skipped = []
+    candidates = []
+    seen_usernames, seen_emails = set(), set()
+    for u in users:
+        if not isinstance(u, dict) or not (u.get('username') and u.get('email') and (u.get('password') or u.get('password_hash'))):
+            skipped.append({'user': u.get('username') if isinstance(u, dict) else None, 'reason': 'Required fields missing'})
+        elif any(u.get(field) is not None and not isinstance(u[field], str) for field in USER_FIELDS):
+            skipped.append({'user': u['username'] if isinstance(u['username'], str) else None, 'reason': 'Fields must be strings'})
+        elif u.get('password_hash') and not str(u['password_hash']).startswith('scrypt:'):
+            skipped.append({'user': u['username'], 'reason': 'password_hash must be a scrypt hash'})
+        elif u['username'] in seen_usernames or u['email'] in seen_emails:
+            skipped.append({'user': u['username'], 'reason': 'Duplicate in request'})
+        else:
+            seen_usernames.add(u['username'])
+            seen_emails.add(u['email'])
+            candidates.append(u)
+
+    # Look up clashes in chunks, keeping under SQLite's bound-parameter limit
+    taken_usernames, taken_emails = set(), set()
+    for i in range(0, len(candidates), 500):
+        chunk = candidates[i:i + 500]
+        rows = db.session.query(User.username, User.email).filter(
+            User.username.in_([u['username'] for u in chunk]) | User.email.in_([u['email'] for u in chunk])
+        ).all()
+        taken_usernames.update(r.username for r in rows)
+        taken_emails.update(r.email for r in rows)
+
+    new_users = []
+    for u in candidates:
+        if u['username'] in taken_usernames or u['email'] in taken_emails:
+            skipped.append({'user': u['username'], 'reason': 'Username or email already exists'})
+        else:
+            new_users.append(u)
+
+    if new_users:
+        # Accounts migrated with an existing scrypt hash skip the hashing pool
+        to_hash = [u for u in new_users if not u.get('password_hash')]
+        try:
+            hashes = app.hash_pool.hash_passwords([u['password'] for u in to_hash]) if to_hash else []
+        except HashPoolBusy:
+            return hash_pool_busy()
+        for u, h in zip(to_hash, hashes):
+            u['password_hash'] = h
+
+        db.session.execute(insert(User), [
+            {'username': u['username'], 'email': u['email'], 'name': u.get('name'), 'password': u['password_hash']}
+            for u in new_users
+        ])
+        db.session.commit()
+
+    return jsonify({"created": len(new_users), "skipped": skipped}), 201
 
 # --- ROUTES ---
 
@@ -170,6 +470,7 @@ def update_user():
     if 'email' in data: user.email = data.get('email')
 
     db.session.commit()
+    app.user_cache.invalidate(user.username)
     return jsonify({"message": "Profile updated"}), 200
 
 @app.route('/delete-user', methods=['DELETE'])
@@ -190,25 +491,56 @@ def delete_user():
 
     db.session.delete(user)
     db.session.commit()
+    app.user_cache.invalidate(user.username)
     return jsonify({"message": "Account deleted"}), 200
 
 # Blueprints: Sub-routes
-from server.routes.bladeacer_sarima_ts import sarima_web_bp
+from server.routes.bladeacer_sarima_ts import sarima_web_bp, warmup_tasks
 from server.routes.ft_obj_det import obj_det_bp
 from server.routes.aaa import order_bp
+from server.routes.debug import debug_bp
 
 app.register_blueprint(sarima_web_bp, url_prefix='/ts-model')
 app.register_blueprint(obj_det_bp, url_prefix='/obj-det')
 app.register_blueprint(order_bp, url_prefix='/order-model')
+app.register_blueprint(debug_bp, url_prefix='/debug')
+
+# Started per serving process: in __main__, or per worker in gunicorn's post_fork
+app.warmer = Warmer(
+    app,
+    warmup_tasks('/ts-model', app.config['WARMUP_FORECAST_STEPS'], include_report=app.config['WARMUP_REPORT']),
+    interval=app.config['WARMUP_INTERVAL'],
+    refresh_ahead=app.config['WARMUP_REFRESH_AHEAD'],
+    jitter=app.config['WARMUP_JITTER'],
+    enabled=app.config['WARMUP_ENABLED']
+)
+
+if app.config['REORDER_MODEL_WARMUP']:
+    from server.utils.reorder_model import warm_up
+    warm_up()
 
 if __name__ == "__main__":
     host = '0.0.0.0'
     port = int(os.environ.get("PORT", 8080))
     is_dev = os.getenv("FLASK_ENV", "production").lower() == "development"
 
+    if app.config['SERVER_MODE'] != "prefork" or is_dev:
+        # Under prefork these start per worker in gunicorn's post_fork, never in the master
+        app.hash_pool.start()
+        app.cache_namespaces.start()
+        app.warmer.start()
+
     if is_dev:
         print(f"--- Running in DEVELOPMENT mode ---")
         app.run(host=host, port=port, debug=True, threaded=True)
+    elif app.config['SERVER_MODE'] == "prefork":
+        print(f"--- Running in PRODUCTION mode with Gunicorn (preloaded workers) ---")
+        from server.prefork import run
+        run(app)
+    elif app.config['SERVER_MODE'] == "async":
+        print(f"--- Running in PRODUCTION mode with Hypercorn (async proxy routes) ---")
+        from server.asgi import run
+        run(app, host, port)
     else:
         print(f"--- Running in PRODUCTION mode with Waitress ---")
-        serve(app, host=host, port=port, threads=8)
+        serve(app, host=host, port=port, threads=app.config['SERVER_THREADS'])
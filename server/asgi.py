@@ -0,0 +1,175 @@
+"""
+ASGI entry point for SERVER_MODE=async.
+
+The I/O-bound proxy routes (/ts-model/*, /obj-det/*) run as Quart coroutines
+on one event loop, backed by async KeyDB and HTTP clients, so slow upstreams
+suspend a coroutine instead of pinning a thread. Anything the async
+blueprints don't define falls through to the regular Flask app, which runs on
+Hypercorn's thread pool exactly as it does under Waitress.
+
+    hypercorn "server.asgi:create_app()" --bind 0.0.0.0:8080
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import redis.asyncio as aioredis
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, g, request
+from werkzeug.exceptions import HTTPException
+from server.utils.cache import build_cache_key
+from server.utils.http_cache import READ_LUA
+from server.utils.metrics import request_finished, request_started, route_label
+from server.utils import tracing
+
+ASYNC_PREFIXES = ('/ts-model/', '/obj-det/')
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+def create_quart_app(flask_app):
+    from server.routes.bladeacer_sarima_ts_async import sarima_async_bp
+    from server.routes.ft_obj_det_async import obj_det_async_bp
+
+    quart_app = Quart(__name__)
+    quart_app.config.from_mapping(flask_app.config)
+    quart_app.config['MAX_CONTENT_LENGTH'] = MAX_BODY_SIZE
+    quart_app.flask_app = flask_app
+    # Breakers and bulkheads are process-wide, shared with the Flask views
+    quart_app.upstreams = flask_app.upstreams
+    quart_app.sarima_engine = flask_app.sarima_engine
+
+    def generate_cache_key(prefix="view", *args, path=None):
+        path = path or request.path
+        return flask_app.cache_namespaces.qualify_path(path, build_cache_key(prefix, path, *args))
+
+    quart_app.generate_cache_key = generate_cache_key
+
+    @quart_app.before_serving
+    async def open_clients():
+        # Created inside the serving loop; redis.asyncio and httpx pools are loop-bound
+        quart_app.cache = aioredis.Redis.from_url(
+            quart_app.config['KEYDB_URL'],
+            decode_responses=True,
+            max_connections=quart_app.config['ASYNC_MAX_CONNECTIONS']
+        )
+        quart_app.cache_raw = aioredis.Redis.from_url(
+            quart_app.config['KEYDB_URL'],
+            max_connections=quart_app.config['ASYNC_MAX_CONNECTIONS']
+        )
+        quart_app.cached_json_script = quart_app.cache_raw.register_script(READ_LUA)
+        # Same quota state as the Flask views, checked over the async client
+        quart_app.quota = flask_app.quota.bind(quart_app.cache) if flask_app.quota else None
+        quart_app.http = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(max_connections=quart_app.config['ASYNC_MAX_CONNECTIONS']),
+            event_hooks={'request': [tracing.forward_request_id]}
+        )
+
+    @quart_app.after_serving
+    async def close_clients():
+        await quart_app.http.aclose()
+        await quart_app.cache.aclose()
+        await quart_app.cache_raw.aclose()
+
+    # Same route metrics as the Flask app; both record into one registry
+    @quart_app.before_request
+    async def start_timer():
+        g.metrics_route = route_label(request.url_rule)
+        g.metrics_started = request_started(g.metrics_route)
+
+    @quart_app.after_request
+    async def record_response(response):
+        g.metrics_status = response.status_code
+        g.metrics_response_bytes = response.content_length
+        return response
+
+    @quart_app.teardown_request
+    async def stop_timer(exc):
+        if 'metrics_started' in g:
+            request_finished(
+                g.metrics_route, request.method, g.get('metrics_status', 500), g.metrics_started,
+                request.content_length, g.get('metrics_response_bytes')
+            )
+
+    # Request ID, Server-Timing and slow-request log, as tracing.init_app does for Flask
+    @quart_app.before_request
+    async def start_trace():
+        g.timings = tracing.begin(request.headers.get(tracing.REQUEST_ID_HEADER))
+
+    @quart_app.after_request
+    async def timing_headers(response):
+        return tracing.add_headers(response, g.timings) if 'timings' in g else response
+
+    @quart_app.teardown_request
+    async def end_trace(exc):
+        if 'timings' in g:
+            tracing.log_if_slow(quart_app.logger, g.timings, request.method, request.path,
+                                g.get('metrics_status', 500), quart_app.config['SLOW_REQUEST_MS'])
+        tracing.current_timings.set(None)
+
+    @quart_app.after_request
+    async def add_cors_headers(response):
+        # Same policy flask_cors applies to the Flask app; preflights go to Flask
+        origin = request.headers.get('Origin')
+        if origin in quart_app.config['CORS_ORIGINS']:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Expose-Headers'] = ", ".join(quart_app.config['CORS_EXPOSE_HEADERS'])
+            response.vary.add('Origin')
+        return response
+
+    quart_app.register_blueprint(sarima_async_bp, url_prefix='/ts-model')
+    quart_app.register_blueprint(obj_det_async_bp, url_prefix='/obj-det')
+    return quart_app
+
+def never_empty(wsgi_app):
+    """
+    Hypercorn's WSGI bridge only sends response headers along with the first
+    body chunk, so empty responses (preflights, 204s) would never start. Always
+    yield at least one chunk; streamed bodies still go out chunk by chunk.
+    """
+    def app(environ, start_response):
+        body = wsgi_app(environ, start_response)
+        try:
+            yield from body
+            yield b""
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+    return app
+
+def create_app(flask_app=None):
+    """Builds the combined ASGI app. Defaults to importing server.app for the Flask side."""
+    if flask_app is None:
+        from server.app import app as flask_app
+
+    quart_app = create_quart_app(flask_app)
+    wsgi_app = AsyncioWSGIMiddleware(never_empty(flask_app), max_body_size=MAX_BODY_SIZE)
+    url_adapter = quart_app.url_map.bind("")
+
+    def handled_by_quart(scope):
+        if scope['method'] == 'OPTIONS' or not scope['path'].startswith(ASYNC_PREFIXES):
+            return False
+        try:
+            url_adapter.match(scope['path'], scope['method'])
+            return True
+        except HTTPException:
+            return False
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await quart_app(scope, receive, send)
+        elif scope['type'] == 'http' and handled_by_quart(scope):
+            await quart_app(scope, receive, send)
+        else:
+            await wsgi_app(scope, receive, send)
+
+    return app
+
+def run(flask_app, host, port):
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+
+    loop = asyncio.new_event_loop()
+    # Flask fallback views and to_thread work share this; same budget as the Waitress thread pool
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=flask_app.config['SERVER_THREADS']))
+    loop.run_until_complete(serve(create_app(flask_app), config))
@@ -0,0 +1,84 @@
+"""
+Gunicorn settings for SERVER_MODE=prefork.
+
+The app (imports, reorder model, SQLAlchemy metadata) is loaded once in the
+master and shared copy-on-write with N forked workers, so CPU-bound work
+(phash, pandas/model.predict, WeasyPrint) runs on every core instead of
+behind one GIL. Each worker then opens its own KeyDB, HTTP and SQLite pools.
+
+    gunicorn -c server/gunicorn_conf.py server.app:app
+
+Worker restart (a new set of workers is forked, then the old set finishes
+in-flight requests within graceful_timeout and exits):
+    kill -HUP <master pid>
+With preload_app the new workers fork from the master's already-loaded app,
+so HUP does not pick up code changes; restart the container for those.
+"""
+import gc
+import math
+import os
+
+# Load the model in the master so every worker shares the same pages
+os.environ.setdefault("REORDER_MODEL_WARMUP", "true")
+# Also switches server.utils.metrics to multiprocess collection
+os.environ.setdefault("SERVER_MODE", "prefork")
+
+def cpu_quota():
+    """CPUs this container may use: cgroup quota if set, else the CPU affinity mask."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if quota > 0:
+                return max(1, math.ceil(quota / period))
+        except (OSError, ValueError):
+            pass
+    return len(os.sched_getaffinity(0))
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8080)}"
+workers = int(os.getenv("WEB_WORKERS", 0)) or cpu_quota()
+worker_class = "gthread"
+threads = int(os.getenv("SERVER_THREADS", 8))
+preload_app = True
+
+# Long upstream waits (inpaint is up to 120 s) must not look like a hung worker
+timeout = 180
+graceful_timeout = 150
+keepalive = 5
+
+# Recycle workers gradually so they never all restart at once
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+
+def on_starting(server):
+    from server.utils.metrics import clear_multiprocess_dir
+    clear_multiprocess_dir()
+
+def when_ready(server):
+    # Everything allocated so far is shared with workers; keep the GC from
+    # touching (and so copying) those pages in every child
+    gc.freeze()
+    server.log.info("Preloaded app; forking %s workers x %s threads", workers, threads)
+
+def post_fork(server, worker):
+    # The preloaded Flask app, whichever module name it was imported under
+    app = worker.app.wsgi()
+    app.init_process_resources()
+    # Fork the hashing pool before gthread starts its request threads
+    app.hash_pool.start()
+    app.cache_namespaces.start()
+    app.warmer.start()
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (in-flight requests) from /metrics
+    from server.utils.metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)
@@ -4,6 +4,7 @@ class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
-    name = db.Column(db.String(100))
+    # /update-user and /delete-user look users up by display name
+    name = db.Column(db.String(100), index=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
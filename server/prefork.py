@@ -0,0 +1,23 @@
+from gunicorn.app.base import BaseApplication
+from server import gunicorn_conf
+
+class PreforkApplication(BaseApplication):
+    """Runs an already-imported Flask app under Gunicorn with the settings in gunicorn_conf."""
+
+    def __init__(self, app):
+        self.application = app
+        super().__init__()
+
+    def load_config(self):
+        for key, value in vars(gunicorn_conf).items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+def run(app):
+    # Load the reorder model before forking so workers share it copy-on-write
+    from server.utils.reorder_model import warm_up
+    warm_up()
+    PreforkApplication(app).run()
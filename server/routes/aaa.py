@@ -1,13 +1,16 @@
 from flask import Blueprint, request, jsonify, current_app
 import pandas as pd
 import numpy as np
-import pickle
 import json
 import hashlib
 import os
 from io import BytesIO
 from openai import OpenAI
 from server.utils.auth import token_required
+from server.utils.http_cache import encode_entry, serve_cached, serve_entry, store_entry
+from server.utils.quota import quota_exceeded
+from server.utils.reorder_model import get_predictor, build_features
+from server.utils.tracing import span
 
 order_bp = Blueprint('order_model', __name__)
 
@@ -16,12 +19,23 @@ TARGET_DAYS = 30
 DEFAULT_LEAD_TIME = 14
 REQUIRED_COLUMNS = {'supersedeno', 'description', 'qty'}
 
-MODEL_PATH = "server/models/auto_reorder_model.pkl"
-try:
-    with open(MODEL_PATH, "rb") as f:
-        model = pickle.load(f)
-except FileNotFoundError:
-    model = None
+# What-if scenarios: optional per-part cost column, and a cap on grid size
+UNIT_COST_COLUMN = 'unit_cost'
+DEFAULT_UNIT_COST = 1.0
+MAX_SCENARIOS = 1000
+
+def parse_inventory(file_content):
+    """Reads an uploaded inventory CSV and adds the engineered stock/demand columns."""
+    df = pd.read_csv(BytesIO(file_content))
+    df.columns = df.columns.str.lower()
+    if REQUIRED_COLUMNS - set(df.columns):
+        return df
+
+    # Mapping and Feature Engineering
+    df['stock'] = pd.to_numeric(df['qty'], errors='coerce').fillna(0)
+    df['sold'] = pd.to_numeric(df.get('total_units_sold', 0), errors='coerce').fillna(0)
+    df['avg_daily_demand'] = df['sold'] / 30
+    return df
 
 def get_genai_client():
     api_key = current_app.config.get('OPENAI_API_KEY')
@@ -66,15 +80,17 @@ Average Daily Demand: {record['avg_daily_demand']:.2f}
 Lead Time: {DEFAULT_LEAD_TIME} days
 Reorder Quantity: {record['reorder_qty']}
 """
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a supply chain expert. Follow exact line order."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.4,
-            max_tokens=100
-        )
+        # Fails fast into the fallback once OpenAI's breaker is open, instead of timing out per part
+        with current_app.upstreams['openai'].guard():
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a supply chain expert. Follow exact line order."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.4,
+                max_tokens=100
+            )
 
         lines = response.choices[0].message.content.strip().splitlines()
         cleaned = []
@@ -110,30 +126,33 @@ def predict_reorder():
         
         # Caching logic preserved from current code
         file_hash = hashlib.md5(file_content).hexdigest()
-        cache_key = f"reorder_v1_{file_hash}"
-        cached_data = current_app.cache.get(cache_key)
+        cache_key = current_app.cache_namespaces.qualify('reorder', f"reorder_v1_{file_hash}")
+        cached_data = serve_cached(cache_key)
         if cached_data:
-            return jsonify(json.loads(cached_data)), 200
+            return cached_data
 
-        df = pd.read_csv(BytesIO(file_content))
-        df.columns = df.columns.str.lower()
-        
+        with span('decode'):
+            df = parse_inventory(file_content)
         missing = REQUIRED_COLUMNS - set(df.columns)
         if missing:
             return jsonify({"error": f"Missing columns: {', '.join(missing)}"}), 400
 
-        # Mapping and Feature Engineering
-        df['stock'] = pd.to_numeric(df['qty'], errors='coerce').fillna(0)
-        df['sold'] = pd.to_numeric(df.get('total_units_sold', 0), errors='coerce').fillna(0)
-        df['avg_daily_demand'] = df['sold'] / 30
+        # One OpenAI call per row, so the quota is charged per row
+        limited = quota_exceeded('reorder', units=len(df))
+        if limited:
+            return limited
+
         df['lead_time'] = DEFAULT_LEAD_TIME
         
-        if model is None:
+        # Model is unpickled on first use, not at import time
+        predictor = get_predictor()
+        if predictor is None:
             return jsonify({"error": "Prediction model not initialized"}), 500
             
-        # Inference
-        X = df[['stock', 'avg_daily_demand', 'lead_time']]
-        df['prediction'] = model.predict(X)
+        # Inference on a contiguous float32 matrix, skipping the pandas round trip
+        X = build_features(df['stock'].to_numpy(), df['avg_daily_demand'].to_numpy(), df['lead_time'].to_numpy())
+        with span('model'):
+            df['prediction'] = predictor.predict(X)
 
         # Reorder calculation
         df['target_stock'] = (df['avg_daily_demand'] * TARGET_DAYS) + SAFETY_STOCK
@@ -156,9 +175,142 @@ def predict_reorder():
             final_results.append(res)
 
         # Cache results for 24 hours
-        current_app.cache.setex(cache_key, 86400, json.dumps(final_results))
+        entry = encode_entry(final_results)
+        store_entry(current_app.cache_raw, cache_key, 86400, entry, stale=False)
         
-        return jsonify(final_results), 200
+        return serve_entry(entry)
+
+    except Exception as e:
+        return jsonify({"error": f"Server Error: {str(e)}"}), 500
+
+def parse_grid(name, default):
+    """
+    Reads a comma-separated list of numbers from the form, e.g. safety_stock=5,10,20.
+    Raises ValueError unless every value is finite and non-negative.
+    """
+    raw = request.form.get(name) or request.args.get(name)
+    if not raw:
+        return np.array([default], dtype=float)
+    grid = np.array([float(v) for v in raw.split(',') if v.strip()], dtype=float)
+    if not np.all(np.isfinite(grid) & (grid >= 0)):
+        raise ValueError(name)
+    return grid
+
+def evaluate_scenarios(df, predictor, safety_stock, target_days, lead_time, ordering_cost=0.0):
+    """
+    Scores every part against every (safety_stock, target_days, lead_time)
+    combination in one broadcasted pass. Arrays come back shaped
+    (scenarios, parts); the model only runs once per distinct lead time.
+    """
+    ss, td, lt = (grid.ravel() for grid in np.meshgrid(safety_stock, target_days, lead_time, indexing='ij'))
+
+    stock = df['stock'].to_numpy(dtype=float)
+    demand = df['avg_daily_demand'].to_numpy(dtype=float)
+    if UNIT_COST_COLUMN in df.columns:
+        unit_cost = pd.to_numeric(df[UNIT_COST_COLUMN], errors='coerce').fillna(DEFAULT_UNIT_COST).to_numpy(dtype=float)
+    else:
+        unit_cost = np.full(len(df), DEFAULT_UNIT_COST)
+
+    # Same policy as /predict-reorder, broadcast over scenarios
+    target_stock = demand[None, :] * td[:, None] + ss[:, None]
+    reorder_qty = np.rint(np.clip(target_stock - stock[None, :], 0, None)).astype(np.int64)
+
+    # Predictions only depend on lead time, so score each distinct value once
+    unique_lt, lt_index = np.unique(lt, return_inverse=True)
+    n_parts = len(df)
+    X = build_features(
+        np.tile(stock, len(unique_lt)),
+        np.tile(demand, len(unique_lt)),
+        np.repeat(unique_lt, n_parts)
+    )
+    prediction = predictor.predict(X).reshape(len(unique_lt), n_parts)[lt_index]
+
+    ordered = reorder_qty > 0
+    total_order_cost = reorder_qty @ unit_cost + ordering_cost * ordered.sum(axis=1)
+
+    return {
+        "safety_stock": ss,
+        "target_days": td,
+        "lead_time": lt,
+        "reorder_qty": reorder_qty,
+        "prediction": prediction,
+        "total_reorder_qty": reorder_qty.sum(axis=1),
+        "parts_to_reorder": ordered.sum(axis=1),
+        "total_order_cost": total_order_cost
+    }
+
+@order_bp.route("/scenarios", methods=["POST"])
+@token_required
+def predict_scenarios():
+    if 'file' not in request.files:
+        return jsonify({"error": "No file part"}), 400
+
+    file = request.files["file"]
+    if not file.filename.lower().endswith('.csv'):
+        return jsonify({"error": "Only CSV files are allowed"}), 415
+
+    try:
+        safety_stock = parse_grid('safety_stock', SAFETY_STOCK)
+        target_days = parse_grid('target_days', TARGET_DAYS)
+        lead_time = parse_grid('lead_time', DEFAULT_LEAD_TIME)
+        ordering_cost = float(request.form.get('ordering_cost') or request.args.get('ordering_cost') or 0)
+        if not np.isfinite(ordering_cost) or ordering_cost < 0:
+            raise ValueError('ordering_cost')
+    except ValueError:
+        return jsonify({"error": "Scenario values must be comma-separated non-negative numbers"}), 400
+
+    n_scenarios = len(safety_stock) * len(target_days) * len(lead_time)
+    if n_scenarios == 0 or n_scenarios > MAX_SCENARIOS:
+        return jsonify({"error": f"Scenario grid must have between 1 and {MAX_SCENARIOS} combinations"}), 400
+
+    try:
+        file_content = file.read()
+
+        # Keyed on the upload and the grid, so re-running the same comparison is free
+        grid_key = json.dumps([safety_stock.tolist(), target_days.tolist(), lead_time.tolist(), ordering_cost])
+        file_hash = hashlib.md5(file_content).hexdigest()
+        grid_hash = hashlib.md5(grid_key.encode()).hexdigest()
+        cache_key = current_app.cache_namespaces.qualify('reorder', f"reorder_scenarios_v1_{file_hash}_{grid_hash}")
+        cached_data = serve_cached(cache_key)
+        if cached_data:
+            return cached_data
+
+        with span('decode'):
+            df = parse_inventory(file_content)
+        missing = REQUIRED_COLUMNS - set(df.columns)
+        if missing:
+            return jsonify({"error": f"Missing columns: {', '.join(missing)}"}), 400
+
+        predictor = get_predictor()
+        if predictor is None:
+            return jsonify({"error": "Prediction model not initialized"}), 500
+
+        with span('model'):
+            result = evaluate_scenarios(df, predictor, safety_stock, target_days, lead_time, ordering_cost)
+
+        # Columnar payload: one list per field, matrices are scenarios x parts
+        payload = {
+            "parts": {
+                "partno": df['supersedeno'].astype(str).tolist(),
+                "part_name": df['description'].tolist(),
+                "stock": df['stock'].tolist()
+            },
+            "scenarios": {
+                "safety_stock": result['safety_stock'].tolist(),
+                "target_days": result['target_days'].tolist(),
+                "lead_time": result['lead_time'].tolist(),
+                "total_reorder_qty": result['total_reorder_qty'].tolist(),
+                "parts_to_reorder": result['parts_to_reorder'].tolist(),
+                "total_order_cost": result['total_order_cost'].round(2).tolist()
+            },
+            "reorder_qty": result['reorder_qty'].tolist(),
+            "prediction": result['prediction'].astype(int).tolist()
+        }
+
+        entry = encode_entry(payload)
+        store_entry(current_app.cache_raw, cache_key, 86400, entry, stale=False)
+
+        return serve_entry(entry)
 
     except Exception as e:
         return jsonify({"error": f"Server Error: {str(e)}"}), 500
@@ -1,15 +1,28 @@
 import time
 import io
+import hashlib
 import markdown
 import os
-import requests
 import json
 import subprocess
-from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context, send_file
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context, send_file, url_for
 from google import genai
 from google.genai import types
 from weasyprint import HTML
 from server.utils.auth import token_required, _get_proxy_token
+from server.utils.cache import cached_get, jittered_ttl, set_tagged, stale_key
+from server.utils.downsample import select_series, series_window, window_key_parts
+from server.utils.http_cache import (
+    accepted_encodings, encode_body, encode_entry, join_json, read_bodies, serve_cached, serve_entry, store_entry
+)
+from server.utils.metrics import record_cache
+from server.utils.quota import quota_exceeded
+from server.utils.resilience import UpstreamUnavailable
+from server.utils.tracing import span
+from server.utils.warmup import WarmupTask
 
 sarima_web_bp = Blueprint('ts_model', __name__)
 DEFAULT_REPORT_CONFIG = {
@@ -48,194 +61,528 @@ Append at the very bottom:
 """
 }
 
+# Cache lifetimes; the warm-up scheduler refreshes entries before they run out
+FORECAST_TTL = 3600
+HISTORY_TTL = 86400
+METRICS_TTL = 3600
+REPORT_TTL = 86400
+PDF_TTL = 3600
+
+# /dashboard: at most this many forecast horizons per request, and threads for fetching its misses
+DASHBOARD_MAX_HORIZONS = 8
+DASHBOARD_WORKERS = 8
+_dashboard_pool = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+def report_settings(args):
+    """(system_prompt, temperature, top_p, is_default) from a request's query string."""
+    system_prompt = args.get('system_prompt') or DEFAULT_REPORT_CONFIG['system_prompt']
+    temperature = args.get('temperature', default=DEFAULT_REPORT_CONFIG['temperature'], type=float)
+    top_p = args.get('top_p', default=DEFAULT_REPORT_CONFIG['top_p'], type=float)
+    # The client echoes /report-defaults back, so compare values rather than presence
+    is_default = (
+        system_prompt.strip() == DEFAULT_REPORT_CONFIG['system_prompt'].strip()
+        and temperature == DEFAULT_REPORT_CONFIG['temperature']
+        and top_p == DEFAULT_REPORT_CONFIG['top_p']
+    )
+    return system_prompt, temperature, top_p, is_default
+
+def pdf_cache_key(md_content):
+    digest = hashlib.md5(md_content.encode('utf-8')).hexdigest()
+    return current_app.generate_cache_key("report_pdf_binary", digest, path=url_for('ts_model.generate_pdf'))
+
+def model_api_get(path, timeout=10, **kwargs):
+    """GET on the ts-model API through the sarima bulkhead and breaker."""
+    api_url = current_app.config.get('MODEL_API_URL')
+    with current_app.upstreams['sarima'].guard() as call:
+        return call.check(current_app.http.get(
+            f"{api_url}{path}",
+            headers={'Authorization': f'Bearer {_get_proxy_token()}'},
+            timeout=timeout,
+            **kwargs
+        ))
+
+def local_engine(app, route):
+    """The embedded SARIMA engine if SARIMA_LOCAL_ROUTES has it answer `route`, otherwise None."""
+    engine = app.sarima_engine
+    if engine and route in app.config['SARIMA_LOCAL_ROUTES'] and engine.serves(route):
+        return engine
+    return None
+
+def local_engine_status(app):
+    engine = app.sarima_engine
+    if not engine:
+        return None
+    routes = sorted(route for route in app.config['SARIMA_LOCAL_ROUTES'] if engine.serves(route))
+    return {'model_version': engine.model_version, 'routes': routes}
+
+def ts_model_get(route, timeout=10, check=True, **params):
+    """
+    (payload, status) for a ts-model API route, from the embedded engine when
+    it is configured for the route. With `check`, an API error status raises.
+    """
+    engine = local_engine(current_app, route)
+    if engine:
+        with span('model'):
+            return engine.get(route, **params)
+    r = model_api_get(f'/{route}', timeout=timeout, params=params or None)
+    if check:
+        r.raise_for_status()
+    return r.json(), r.status_code
+
+# refresh_* fetch from upstream and overwrite the cache. The views and the
+# dashboard call them on a miss, and the warm-up scheduler ahead of expiry.
+# Keys are built for the route's own URL, so any of these callers gets the
+# key its view reads. A `window` (see utils/downsample.py) selects a cached
+# month range / downsampled variant of the series instead.
+#
+# Everything here that takes `app` works for the Flask app and the Quart app
+# alike (see bladeacer_sarima_ts_async.py); only the I/O is written twice.
+
+def forecast_cache_key(app, steps, window=None):
+    return app.generate_cache_key(
+        "forecast", steps, *window_key_parts(window), path=app.url_for('.get_forecast')
+    )
+
+def history_cache_key(app, window=None):
+    return app.generate_cache_key("history", *window_key_parts(window), path=app.url_for('.get_history'))
+
+def metrics_cache_key(app):
+    return app.generate_cache_key("metrics", path=app.url_for('.get_metrics'))
+
+def forecast_window(steps, window):
+    """A window that only caps points at or above `steps` leaves the forecast whole, so use its key."""
+    if window and window[:2] == (None, None) and window[2] >= steps:
+        return None
+    return window
+
+def window_entry(body, window, field, value_key):
+    """The entry for a variant of a series, cut from the full payload's JSON bytes."""
+    with span('downsample'):
+        return encode_entry(select_series(json.loads(body), field, value_key, *window))
+
+def window_spec(app, route, window, **params):
+    """
+    (variant key, series field, value key, full payload's key) for a
+    windowed /forecast or /history.
+    """
+    if route == 'forecast':
+        steps = params['steps']
+        return forecast_cache_key(app, steps, window), 'forecast', 'forecast', forecast_cache_key(app, steps)
+    return history_cache_key(app, window), 'history', 'actual', history_cache_key(app)
+
+def refresh_window(route, window, refresh_base, **params):
+    """
+    (entry, status) for a variant of a series, cut from its cached full
+    payload (fetched on a miss). The variant expires with that payload.
+    """
+    cache_key, field, value_key, base_key = window_spec(current_app, route, window, **params)
+    cache_raw = current_app.cache_raw
+    body = read_bodies(cache_raw, [base_key])[0]
+    ttl = cache_raw.ttl(base_key) if body else 0
+    if ttl <= 0:
+        entry, status = refresh_base()
+        if not 200 <= status < 300:
+            return entry, status
+        body, ttl = entry['body'], cache_raw.ttl(base_key)
+
+    entry = window_entry(body, window, field, value_key)
+    # No stale copy: the base payload has one, and variants are cut from it
+    store_entry(cache_raw, cache_key, ttl, entry, stale=False)
+    return entry, 200
+
+def refresh_forecast(steps, window=None):
+    """Returns (entry, status), see utils/http_cache.py. Only successful responses are cached."""
+    if window:
+        return refresh_window('forecast', window, partial(refresh_forecast, steps), steps=steps)
+    data, status = ts_model_get('forecast', timeout=15, check=False, steps=steps)
+    entry = encode_entry(data)
+    if 200 <= status < 300:
+        # Long-lived stale copy alongside, for outages
+        store_entry(current_app.cache_raw, forecast_cache_key(current_app, steps), jittered_ttl(FORECAST_TTL), entry)
+    return entry, status
+
+def refresh_history(window=None):
+    if window:
+        return refresh_window('history', window, refresh_history)
+    data, status = ts_model_get('history')
+    entry = encode_entry(data)
+    # History is static until the next data load, so long TTL is safe
+    store_entry(current_app.cache_raw, history_cache_key(current_app), jittered_ttl(HISTORY_TTL), entry)
+    return entry, status
+
+def refresh_metrics():
+    data, status = ts_model_get('metrics')
+    entry = encode_entry(data)
+    store_entry(current_app.cache_raw, metrics_cache_key(current_app), jittered_ttl(METRICS_TTL), entry)
+    return entry, status
+
+def refresh_report():
+    """Generates the default-config report into the cache."""
+    cache_key = current_app.generate_cache_key("report")
+    for _ in generate_report(cache_key, *report_settings(request.args)):
+        pass
+    if not current_app.cache.exists(cache_key):
+        raise RuntimeError("report generation failed")
+
+def refresh_report_pdf():
+    """Renders the cached default report, so downloading it is a cache hit."""
+    md_content = current_app.cache.get(current_app.generate_cache_key("report", path=url_for('ts_model.stream_ai_report')))
+    if not md_content:
+        raise RuntimeError("no cached report to render")
+    pdf_data = render_pdf(md_content).decode('latin-1')
+    set_tagged(current_app.cache, pdf_cache_key(md_content), jittered_ttl(REPORT_TTL), pdf_data)
+    set_tagged(current_app.cache, current_app.generate_cache_key("report_pdf_binary"), jittered_ttl(REPORT_TTL), pdf_data)
+
+def warmup_tasks(url_prefix, forecast_steps, include_report=True):
+    """What the warm-up scheduler keeps fresh, in order: the PDF is rendered from the report."""
+    tasks = [WarmupTask('history', f"{url_prefix}/history", ('history',), refresh_history)]
+    for steps in forecast_steps:
+        tasks.append(WarmupTask(
+            f"forecast:{steps}", f"{url_prefix}/forecast", ('forecast', steps), partial(refresh_forecast, steps)
+        ))
+    tasks.append(WarmupTask('metrics', f"{url_prefix}/metrics", ('metrics',), refresh_metrics))
+    if include_report:
+        tasks.append(WarmupTask('report', f"{url_prefix}/report-stream", ('report',), refresh_report))
+        tasks.append(WarmupTask('report_pdf', f"{url_prefix}/generate-pdf", ('report_pdf_binary',), refresh_report_pdf))
+    return tasks
+
+def upstream_error(e):
+    """(payload, status) for an upstream failure with no stale copy to serve."""
+    return {"error": f"Upstream API failure: {str(e)}"}, 503 if isinstance(e, UpstreamUnavailable) else 502
+
+def upstream_failure(cache_key, e):
+    """Serves the last good copy while the upstream is failing, otherwise reports the error."""
+    try:
+        stale = serve_cached(cache_key, stale=True) if cache_key else None
+    except Exception:
+        stale = None
+    if stale:
+        return stale
+
+    payload, status = upstream_error(e)
+    return jsonify(payload), status
+
 @sarima_web_bp.route('/forecast', methods=['GET'])
 @token_required
 def get_forecast():
     # We call the decorator and pass the actual handler
     # The decorator returns a function, which we then call with ()
     steps = request.args.get('steps', default=12, type=int)
+    try:
+        window = series_window(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    window = forecast_window(steps, window)
 
     # Request.path gives clean url, e.g. /ts-model/forecast
-    cache_key = current_app.generate_cache_key("forecast", steps)
+    cache_key = forecast_cache_key(current_app, steps, window)
 
-    cached_response = current_app.cache.get(cache_key)
+    cached_response = serve_cached(cache_key)
     if cached_response:
-        return jsonify(json.loads(cached_response)), 200
+        return cached_response
 
     # If cache fails
-    api_url = current_app.config.get('MODEL_API_URL')
-    internal_token = _get_proxy_token()
-
     try:
-        r = requests.get(
-            f"{api_url}/forecast",
-            params={'steps': steps},
-            headers={'Authorization': f'Bearer {internal_token}'},
-            timeout=15
-        )
-
-        data = r.json()
-
-        # Save to KeyDB (1 hour expiry)
-        current_app.cache.setex(cache_key, 3600, json.dumps(data))
-
-        return jsonify(data), r.status_code
+        return serve_entry(*refresh_forecast(steps, window))
     except Exception as e:
-        return jsonify({"error": f"Upstream API failure: {str(e)}"}), 502
+        return upstream_failure(cache_key, e)
 
 @sarima_web_bp.route('/history', methods=['GET'])
 @token_required
 def get_history():
-    cache_key = current_app.generate_cache_key("history")
+    try:
+        window = series_window(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cache_key = history_cache_key(current_app, window)
 
-    cached_response = current_app.cache.get(cache_key)
+    cached_response = serve_cached(cache_key)
     if cached_response:
-        return jsonify(json.loads(cached_response)), 200
-
-    # 3. Cache Miss - Call Upstream
-    api_url = current_app.config.get('MODEL_API_URL')
-    internal_token = _get_proxy_token()
+        return cached_response
 
+    # Cache Miss - Call Upstream
     try:
-        r = requests.get(
-            f"{api_url}/history",
-            headers={'Authorization': f'Bearer {internal_token}'},
-            timeout=10
-        )
-        r.raise_for_status()
-        data = r.json()
-
-        # 4. Save to KeyDB (Set for 24 hours / 86400 seconds)
-        # History is static until the next data load, so long TTL is safe.
-        current_app.cache.setex(cache_key, 86400, json.dumps(data))
-
-        return jsonify(data), r.status_code
-
+        return serve_entry(*refresh_history(window))
     except Exception as e:
-        return jsonify({"error": f"Upstream API failure: {str(e)}"}), 502
+        return upstream_failure(cache_key, e)
 
 @sarima_web_bp.route('/metrics', methods=['GET'])
 @token_required
 def get_metrics():
-    api_url = current_app.config.get('MODEL_API_URL')
-    internal_token = _get_proxy_token()
+    cache_key = metrics_cache_key(current_app)
+
+    cached_response = serve_cached(cache_key)
+    if cached_response:
+        return cached_response
+
     try:
-        r = requests.get(
-            f"{api_url}/metrics",
-            headers={'Authorization': f'Bearer {internal_token}'},
-            timeout=10
-        )
-        return jsonify(r.json()), r.status_code
+        return serve_entry(*refresh_metrics())
     except Exception as e:
-        return jsonify({"error": str(e)}), 502
+        return upstream_failure(cache_key, e)
+
+def dashboard_steps(args):
+    """Forecast horizons from ?steps=12,48 (default 12), or None if malformed."""
+    try:
+        steps = list(dict.fromkeys(int(s) for s in args.get('steps', '12').split(',') if s.strip()))
+    except ValueError:
+        return None
+    return steps if 1 <= len(steps) <= DASHBOARD_MAX_HORIZONS else None
+
+def dashboard_request(args):
+    """(steps, window) for a /dashboard request; raises ValueError with the message for a 400."""
+    steps = dashboard_steps(args)
+    if steps is None:
+        raise ValueError(f"steps must be 1 to {DASHBOARD_MAX_HORIZONS} comma-separated integers")
+    return steps, series_window(args)
+
+def dashboard_parts(app, steps, window, refresh_history, refresh_metrics, refresh_forecast):
+    """
+    (name, cache key, refresh) for each part of a dashboard bundle; `window`
+    applies to every series. The refreshers are the calling blueprint's own.
+    """
+    parts = [
+        ('history', history_cache_key(app, window), partial(refresh_history, window)),
+        ('metrics', metrics_cache_key(app), refresh_metrics)
+    ]
+    for n in steps:
+        n_window = forecast_window(n, window)
+        parts.append((f'forecast:{n}', forecast_cache_key(app, n, n_window), partial(refresh_forecast, n, n_window)))
+    return parts
+
+def record_parts(keys, missing):
+    for i, key in enumerate(keys):
+        record_cache(key, 'miss' if i in missing else 'hit')
+
+def part_error(e):
+    return f"Upstream API failure: {str(e)}"
+
+def part_body(entry, status):
+    """A freshly fetched part's JSON bytes; an error response raises with its message."""
+    if not 200 <= status < 300:
+        raise RuntimeError(json.loads(entry['body']).get('error', f"status {status}"))
+    return entry['body']
+
+def dashboard_bundle(names, bodies, errors, stale):
+    """
+    {"history", "metrics", "forecasts": {steps: ...}, "errors": {part: message}, "stale": [part]}
+    spliced from the parts' stored JSON bytes. Failed parts are null.
+    """
+    fields, forecasts = {}, {}
+    for name, body in zip(names, bodies):
+        if name.startswith('forecast:'):
+            forecasts[name.partition(':')[2]] = body or b'null'
+        else:
+            fields[name] = body or b'null'
+    fields['forecasts'] = join_json(forecasts)
+    fields['errors'] = json.dumps(errors).encode()
+    fields['stale'] = json.dumps(stale).encode()
+    return join_json(fields)
+
+def use_stale(failed, stale_bodies, names, keys, bodies, errors, stale):
+    """Fills the `failed` parts in from their last good copies, where there are any."""
+    for i, body in zip(failed, stale_bodies):
+        if body:
+            bodies[i] = body
+            stale.append(names[i])
+            errors.pop(names[i])
+            record_cache(keys[i], 'stale')
+
+def dashboard_entry(names, bodies, errors, stale, accept_encodings):
+    # Assembled per request, so compress only into the encoding this client gets
+    bundle = dashboard_bundle(names, bodies, errors, stale)
+    return encode_body(bundle, encodings=accepted_encodings(accept_encodings)[:1])
+
+@sarima_web_bp.route('/dashboard', methods=['GET'])
+@token_required
+def get_dashboard():
+    """History, metrics and forecasts for ?steps=12,48 in one response, with whatever parts could be had."""
+    try:
+        steps, window = dashboard_request(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    names, keys, refreshes = zip(*dashboard_parts(
+        current_app, steps, window, refresh_history, refresh_metrics, refresh_forecast
+    ))
+    bodies = read_bodies(current_app.cache_raw, keys)
+    errors, stale = {}, []
+
+    # Misses go upstream in parallel, each thread in a copy of this request's context
+    futures = {
+        i: _dashboard_pool.submit(contextvars.copy_context().run, refreshes[i])
+        for i, body in enumerate(bodies) if body is None
+    }
+    record_parts(keys, futures)
+    for i, future in futures.items():
+        try:
+            bodies[i] = part_body(*future.result())
+        except Exception as e:
+            errors[names[i]] = part_error(e)
+
+    # Failed parts fall back to their last good copy
+    failed = [i for i in futures if bodies[i] is None]
+    if failed:
+        stale_bodies = read_bodies(current_app.cache_raw, [stale_key(keys[i]) for i in failed])
+        use_stale(failed, stale_bodies, names, keys, bodies, errors, stale)
+
+    if not any(bodies):
+        return jsonify({"error": "Upstream API failure", "errors": errors}), 502
+    return serve_entry(dashboard_entry(names, bodies, errors, stale, request.accept_encodings))
+
+def health_data(app, r):
+    """The /health payload, given the model API's own /health response (None if it failed)."""
+    try:
+        ready = r is not None and r.status_code == 200 and r.json().get("status") == "ready"
+    except (ValueError, AttributeError):
+        ready = False
+    return {
+        'status': 'alive',
+        'model_api': 'active' if ready else 'inactive',
+        'breakers': {name: app.upstreams[name].snapshot() for name in ('sarima', 'gemini')},
+        'local_engine': local_engine_status(app)
+    }
 
 @sarima_web_bp.route('/health', methods=['GET'])
 def health_check():
     api_url = current_app.config.get('MODEL_API_URL')
-    health_data = {'status': 'alive', 'model_api': 'inactive'}
     try:
-        r = requests.get(f"{api_url}/health", timeout=2)
-        if r.status_code == 200 and r.json().get("status") == "ready":
-            health_data['model_api'] = 'active'
-    except:
-        pass
-
-    return jsonify(health_data), 200
+        r = current_app.http.get(f"{api_url}/health", timeout=2)
+    except Exception:
+        r = None
+    return jsonify(health_data(current_app, r)), 200
 
 @token_required
 @sarima_web_bp.route('/report-defaults', methods=['GET'])
 def get_report_defaults():
     return jsonify(DEFAULT_REPORT_CONFIG), 200
 
-@token_required
 @sarima_web_bp.route('/report-stream', methods=['GET'])
+@token_required
 def stream_ai_report():
     force_refresh = request.args.get('refresh', default='false').lower() == 'true'
     cache_key = current_app.generate_cache_key("report")
+    system_prompt, temperature, top_p, is_default = report_settings(request.args)
 
-    if not force_refresh:
-        cached_report = current_app.cache.get(cache_key)
+    # Only the default-config report is cached; custom prompts always generate
+    if is_default and not force_refresh:
+        cached_report = cached_get(current_app.cache, cache_key)
         if cached_report:
             return Response(cached_report, mimetype='text/markdown')
 
-    def generate():
-        api_url = current_app.config.get('MODEL_API_URL')
-        token = _get_proxy_token()
+    limited = quota_exceeded('report')
+    if limited:
+        return limited
+
+    return Response(
+        stream_with_context(generate_report(cache_key, system_prompt, temperature, top_p, is_default)),
+        mimetype='text/markdown'
+    )
+
+# Gemini calls for /report-stream, made by generate_report here and its async twin
+REPORT_MODEL = "gemini-2.5-flash-lite"
+REPORT_ATTEMPTS = 3
+REPORT_BUSY = "\n\n[Model Busy: Please try again.]"
+
+def report_request(system_prompt, temperature, top_p, metrics, forecast_12, forecast_48):
+    """Keyword arguments for generate_content_stream."""
+    config = types.GenerateContentConfig(
+        system_instruction=system_prompt,
+        temperature=temperature,
+        top_p=top_p,
+        max_output_tokens=DEFAULT_REPORT_CONFIG['max_output_tokens']
+    )
+
+    user_input = (
+        f"Detailed Analysis Request for the following data:\n"
+        f"METRICS: {metrics}\n"
+        f"SHORT-TERM FORECAST: {forecast_12}\n"
+        f"LONG-TERM FORECAST: {forecast_48}\n"
+    )
+    return {'model': REPORT_MODEL, 'contents': user_input, 'config': config}
+
+def report_retry_delay(e, attempt):
+    """Seconds to back off before retrying a failed attempt, or None to give up."""
+    if "503" in str(e) and not isinstance(e, UpstreamUnavailable) and attempt < REPORT_ATTEMPTS - 1:
+        return 2 ** attempt
+    return None
+
+def generate_report(cache_key, system_prompt, temperature, top_p, cache_result):
+    """Streams the Gemini report as text chunks, caching the full text if `cache_result`."""
+    full_response_text = []
 
-        headers = {'Authorization': f'Bearer {token}'}
-        full_response_text = []
+    try:
+        metrics, _ = ts_model_get('metrics', check=False)
+        forecast_12, _ = ts_model_get('forecast', check=False, steps=12)
+        forecast_48, _ = ts_model_get('forecast', check=False, steps=48)
+    except Exception as e:
+        yield f"Error gathering data: {str(e)}"
+        return
 
-        system_prompt = request.args.get('system_prompt') or DEFAULT_REPORT_CONFIG['system_prompt']
-        temperature = request.args.get('temperature', 
-                                       default=DEFAULT_REPORT_CONFIG['temperature'], 
-                                       type=float)
-        top_p = request.args.get('top_p', 
-                                 default=DEFAULT_REPORT_CONFIG['top_p'], 
-                                 type=float)
+    client = genai.Client(api_key=current_app.config.get('GEMINI_API_KEY'))
+    request_args = report_request(system_prompt, temperature, top_p, metrics, forecast_12, forecast_48)
 
+    for attempt in range(REPORT_ATTEMPTS):
         try:
-            metrics = requests.get(f"{api_url}/metrics", headers=headers).json()
-            forecast_12 = requests.get(f"{api_url}/forecast", params={'steps': 12}, headers=headers).json()
-            forecast_48 = requests.get(f"{api_url}/forecast", params={'steps': 48}, headers=headers).json()
-        except Exception as e:
-            yield f"Error gathering data: {str(e)}"
-            return
-
-        client = genai.Client(api_key=current_app.config.get('GEMINI_API_KEY'))
-
-        config = types.GenerateContentConfig(
-            system_instruction=system_prompt,
-            temperature=temperature, 
-            top_p=top_p,
-            max_output_tokens=DEFAULT_REPORT_CONFIG['max_output_tokens']
-        )
-
-        user_input = (
-            f"Detailed Analysis Request for the following data:\n"
-            f"METRICS: {metrics}\n"
-            f"SHORT-TERM FORECAST: {forecast_12}\n"
-            f"LONG-TERM FORECAST: {forecast_48}\n"
-        )
-
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                full_response_text = [] 
-                response = client.models.generate_content_stream(
-                    model="gemini-2.5-flash-lite",
-                    contents=user_input,
-                    config=config
-                )
+            full_response_text = [] 
+            with current_app.upstreams['gemini'].guard():
+                response = client.models.generate_content_stream(**request_args)
 
                 for chunk in response:
                     if chunk.text:
                         full_response_text.append(chunk.text)
                         yield chunk.text
-                break 
+            break 
 
-            except Exception as e:
-                if "503" in str(e) and attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
-                else:
-                    yield f"\n\n[Model Busy: Please try again.]"
-                    return
+        except Exception as e:
+            delay = report_retry_delay(e, attempt)
+            if delay is None:
+                yield REPORT_BUSY
+                return
+            time.sleep(delay)
+
+    if full_response_text and cache_result:
+        set_tagged(current_app.cache, cache_key, jittered_ttl(REPORT_TTL), "".join(full_response_text))
+
+def render_pdf(md_content):
+    """Markdown to PDF bytes."""
+    with span('markdown'):
+        html_content = markdown.markdown(md_content, extensions=['extra', 'codehilite'])
 
-        if full_response_text:
-            current_app.cache.setex(cache_key, 86400, "".join(full_response_text))
+    styled_html = f"""
+<html>
+            <head>
+                <style>
+                    @page {{ margin: 2cm; }}
+                    body {{ font-family: "Liberation Sans", Arial, sans-serif; line-height: 1.6; color: #000; }}
+                    h1 {{ color: #000; border-bottom: 2px solid #000; padding-bottom: 10px; }}
+                    h2 {{ color: #333; margin-top: 1.5em; }}
+                    table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
+                    th, td {{ border: 1px solid #dee2e6; padding: 12px; text-align: left; }}
+                    th {{ background-color: #f8f9fa; }}
+                </style>
+            </head>
+            <body>{html_content}</body>
+        </html>
+        """
 
-    return Response(stream_with_context(generate()), mimetype='text/markdown')
+    # Generate PDF in memory
+    pdf_io = io.BytesIO()
+    with span('encode'):
+        HTML(string=styled_html).write_pdf(pdf_io)
+    return pdf_io.getvalue()
 
 @sarima_web_bp.route('/generate-pdf', methods=['POST'])
 @token_required
 def generate_pdf():
     data = request.get_json() or {}
     md_content = data.get('markdown', "Markdown content was found to be empty")
-    cache_key = current_app.generate_cache_key("report_pdf_binary")
+    # Empty markdown asks for the PDF of the current default report
+    cache_key = pdf_cache_key(md_content) if md_content else current_app.generate_cache_key("report_pdf_binary")
 
     # Attempt to serve cached PDF binary
-    cached_pdf = current_app.cache.get(cache_key)
-    if cached_pdf and not md_content:
+    cached_pdf = cached_get(current_app.cache, cache_key)
+    if cached_pdf:
         # We call this pdf_bytes here safely
         pdf_bytes = cached_pdf if isinstance(cached_pdf, bytes) else cached_pdf.encode('latin-1')
         return send_file(
@@ -249,39 +596,13 @@ def generate_pdf():
         return jsonify({"error": "No content to generate PDF"}), 400
 
     try:
-        # Convert Markdown to HTML
-        html_content = markdown.markdown(md_content, extensions=['extra', 'codehilite'])
-
-        styled_html = f"""
-<html>
-            <head>
-                <style>
-                    @page {{ margin: 2cm; }}
-                    body {{ font-family: "Liberation Sans", Arial, sans-serif; line-height: 1.6; color: #000; }}
-                    h1 {{ color: #000; border-bottom: 2px solid #000; padding-bottom: 10px; }}
-                    h2 {{ color: #333; margin-top: 1.5em; }}
-                    table {{ width: 100%; border-collapse: collapse; margin: 20px 0; }}
-                    th, td {{ border: 1px solid #dee2e6; padding: 12px; text-align: left; }}
-                    th {{ background-color: #f8f9fa; }}
-                </style>
-            </head>
-            <body>{html_content}</body>
-        </html>
-        """
-
-        # Generate PDF in memory
-        pdf_io = io.BytesIO()
-        HTML(string=styled_html).write_pdf(pdf_io)
+        pdf_data = render_pdf(md_content)
 
         # Cache the binary data
-        pdf_data = pdf_io.getvalue()
-        current_app.cache.setex(cache_key, 3600, pdf_data.decode('latin-1'))
-
-        # Return the file
-        pdf_io.seek(0)
+        set_tagged(current_app.cache, cache_key, PDF_TTL, pdf_data.decode('latin-1'))
 
         return send_file(
-            pdf_io,
+            io.BytesIO(pdf_data),
             mimetype='application/pdf',
             as_attachment=True,
             download_name="Forecast_Analysis.pdf"
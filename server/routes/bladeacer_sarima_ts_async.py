@@ -0,0 +1,255 @@
+import asyncio
+from functools import partial
+from google import genai
+from quart import Blueprint, jsonify, request, current_app, Response
+from server.utils.async_auth import token_required
+from server.routes.bladeacer_sarima_ts import (
+    FORECAST_TTL, HISTORY_TTL, METRICS_TTL, REPORT_ATTEMPTS, REPORT_BUSY, REPORT_TTL,
+    dashboard_entry, dashboard_parts, dashboard_request, forecast_cache_key, forecast_window, health_data,
+    history_cache_key, local_engine, metrics_cache_key, part_body, part_error, record_parts, report_request,
+    report_retry_delay, report_settings, upstream_error, use_stale, window_entry, window_spec
+)
+from server.utils.cache import acached_get, aset_tagged, jittered_ttl, stale_key
+from server.utils.downsample import series_window
+from server.utils.async_http_cache import serve_cached, serve_entry
+from server.utils.http_cache import aread_bodies, astore_entry, encode_entry
+from server.utils.quota import aquota_exceeded
+from server.utils.tracing import span
+
+# Async twin of sarima_web_bp, served under the same /ts-model prefix in SERVER_MODE=async.
+# Routes not defined here (report-defaults, generate-pdf) fall through to the Flask app.
+sarima_async_bp = Blueprint('ts_model_async', __name__)
+
+async def ts_model_get(app, route, timeout=10, check=True, **params):
+    """
+    (payload, status) for a ts-model API route, from the embedded engine when
+    it is configured for the route. With `check`, an API error status raises.
+    Takes the app so report generators can call it after the view returns.
+    """
+    engine = local_engine(app, route)
+    if engine:
+        with span('model'):
+            return engine.get(route, **params)
+    with app.upstreams['sarima'].guard() as call:
+        r = call.check(await app.http.get(
+            f"{app.config['MODEL_API_URL']}/{route}",
+            params=params or None,
+            headers={'Authorization': f'Bearer {app.flask_app.generate_token()}'},
+            timeout=timeout
+        ))
+    if check:
+        r.raise_for_status()
+    return r.json(), r.status_code
+
+async def refresh_window(route, window, refresh_base, **params):
+    """See bladeacer_sarima_ts.refresh_window."""
+    cache_key, field, value_key, base_key = window_spec(current_app, route, window, **params)
+    cache_raw = current_app.cache_raw
+    body = (await aread_bodies(cache_raw, [base_key]))[0]
+    ttl = await cache_raw.ttl(base_key) if body else 0
+    if ttl <= 0:
+        entry, status = await refresh_base()
+        if not 200 <= status < 300:
+            return entry, status
+        body, ttl = entry['body'], await cache_raw.ttl(base_key)
+
+    entry = window_entry(body, window, field, value_key)
+    await astore_entry(cache_raw, cache_key, ttl, entry, stale=False)
+    return entry, 200
+
+async def refresh_forecast(steps, window=None):
+    """Returns (entry, status), see utils/http_cache.py. Only successful responses are cached."""
+    if window:
+        return await refresh_window('forecast', window, partial(refresh_forecast, steps), steps=steps)
+    data, status = await ts_model_get(current_app, 'forecast', timeout=15, check=False, steps=steps)
+    entry = encode_entry(data)
+    if 200 <= status < 300:
+        await astore_entry(current_app.cache_raw, forecast_cache_key(current_app, steps), jittered_ttl(FORECAST_TTL), entry)
+    return entry, status
+
+async def refresh_history(window=None):
+    if window:
+        return await refresh_window('history', window, refresh_history)
+    data, status = await ts_model_get(current_app, 'history')
+    entry = encode_entry(data)
+    await astore_entry(current_app.cache_raw, history_cache_key(current_app), jittered_ttl(HISTORY_TTL), entry)
+    return entry, status
+
+async def refresh_metrics():
+    data, status = await ts_model_get(current_app, 'metrics')
+    entry = encode_entry(data)
+    await astore_entry(current_app.cache_raw, metrics_cache_key(current_app), jittered_ttl(METRICS_TTL), entry)
+    return entry, status
+
+async def upstream_failure(cache_key, e):
+    """Serves the last good copy while the upstream is failing, otherwise reports the error."""
+    try:
+        stale = await serve_cached(cache_key, stale=True) if cache_key else None
+    except Exception:
+        stale = None
+    if stale:
+        return stale
+
+    payload, status = upstream_error(e)
+    return jsonify(payload), status
+
+@sarima_async_bp.route('/forecast', methods=['GET'])
+@token_required
+async def get_forecast():
+    steps = request.args.get('steps', default=12, type=int)
+    try:
+        window = series_window(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    window = forecast_window(steps, window)
+    cache_key = forecast_cache_key(current_app, steps, window)
+
+    cached_response = await serve_cached(cache_key)
+    if cached_response:
+        return cached_response
+
+    try:
+        return serve_entry(*await refresh_forecast(steps, window))
+    except Exception as e:
+        return await upstream_failure(cache_key, e)
+
+@sarima_async_bp.route('/history', methods=['GET'])
+@token_required
+async def get_history():
+    try:
+        window = series_window(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cache_key = history_cache_key(current_app, window)
+
+    cached_response = await serve_cached(cache_key)
+    if cached_response:
+        return cached_response
+
+    try:
+        return serve_entry(*await refresh_history(window))
+    except Exception as e:
+        return await upstream_failure(cache_key, e)
+
+@sarima_async_bp.route('/metrics', methods=['GET'])
+@token_required
+async def get_metrics():
+    cache_key = metrics_cache_key(current_app)
+
+    cached_response = await serve_cached(cache_key)
+    if cached_response:
+        return cached_response
+
+    try:
+        return serve_entry(*await refresh_metrics())
+    except Exception as e:
+        return await upstream_failure(cache_key, e)
+
+@sarima_async_bp.route('/dashboard', methods=['GET'])
+@token_required
+async def get_dashboard():
+    """History, metrics and forecasts for ?steps=12,48 in one response, with whatever parts could be had."""
+    try:
+        steps, window = dashboard_request(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    names, keys, refreshes = zip(*dashboard_parts(
+        current_app, steps, window, refresh_history, refresh_metrics, refresh_forecast
+    ))
+    bodies = await aread_bodies(current_app.cache_raw, keys)
+    errors, stale = {}, []
+
+    async def fetch(i):
+        try:
+            return part_body(*await refreshes[i]())
+        except Exception as e:
+            errors[names[i]] = part_error(e)
+
+    # Misses go upstream concurrently
+    missing = [i for i, body in enumerate(bodies) if body is None]
+    record_parts(keys, missing)
+    for i, body in zip(missing, await asyncio.gather(*(fetch(i) for i in missing))):
+        bodies[i] = body
+
+    # Failed parts fall back to their last good copy
+    failed = [i for i in missing if bodies[i] is None]
+    if failed:
+        stale_bodies = await aread_bodies(current_app.cache_raw, [stale_key(keys[i]) for i in failed])
+        use_stale(failed, stale_bodies, names, keys, bodies, errors, stale)
+
+    if not any(bodies):
+        return jsonify({"error": "Upstream API failure", "errors": errors}), 502
+    return serve_entry(dashboard_entry(names, bodies, errors, stale, request.accept_encodings))
+
+@sarima_async_bp.route('/health', methods=['GET'])
+async def health_check():
+    api_url = current_app.config.get('MODEL_API_URL')
+    try:
+        r = await current_app.http.get(f"{api_url}/health", timeout=2)
+    except Exception:
+        r = None
+    return jsonify(health_data(current_app, r)), 200
+
+@sarima_async_bp.route('/report-stream', methods=['GET'])
+@token_required
+async def stream_ai_report():
+    force_refresh = request.args.get('refresh', default='false').lower() == 'true'
+    cache_key = current_app.generate_cache_key("report")
+    cache = current_app.cache
+    system_prompt, temperature, top_p, is_default = report_settings(request.args)
+
+    # Only the default-config report is cached; custom prompts always generate
+    if is_default and not force_refresh:
+        cached_report = await acached_get(cache, cache_key)
+        if cached_report:
+            return Response(cached_report, mimetype='text/markdown')
+
+    limited = await aquota_exceeded('report')
+    if limited:
+        return limited
+
+    # Read everything request-scoped up front; the generator runs after the view returns
+    app = current_app._get_current_object()
+    gemini_key = current_app.config.get('GEMINI_API_KEY')
+    upstreams = current_app.upstreams
+
+    async def generate():
+        full_response_text = []
+
+        try:
+            (metrics, _), (forecast_12, _), (forecast_48, _) = await asyncio.gather(
+                ts_model_get(app, 'metrics', check=False),
+                ts_model_get(app, 'forecast', check=False, steps=12),
+                ts_model_get(app, 'forecast', check=False, steps=48)
+            )
+        except Exception as e:
+            yield f"Error gathering data: {str(e)}"
+            return
+
+        client = genai.Client(api_key=gemini_key)
+        request_args = report_request(system_prompt, temperature, top_p, metrics, forecast_12, forecast_48)
+
+        for attempt in range(REPORT_ATTEMPTS):
+            try:
+                full_response_text = []
+                with upstreams['gemini'].guard():
+                    response = await client.aio.models.generate_content_stream(**request_args)
+
+                    async for chunk in response:
+                        if chunk.text:
+                            full_response_text.append(chunk.text)
+                            yield chunk.text
+                break
+
+            except Exception as e:
+                delay = report_retry_delay(e, attempt)
+                if delay is None:
+                    yield REPORT_BUSY
+                    return
+                await asyncio.sleep(delay)
+
+        if full_response_text and is_default:
+            await aset_tagged(cache, cache_key, jittered_ttl(REPORT_TTL), "".join(full_response_text))
+
+    return Response(generate(), mimetype='text/markdown')
@@ -0,0 +1,63 @@
+import os
+from flask import Blueprint, Response, current_app, g, jsonify, request
+from server.utils.auth import token_required, _get_proxy_token
+from server.utils.profiler import ProfilerBusy, collapsed, sample_stacks, speedscope
+
+# Operator endpoints, internal_proxy token only
+debug_bp = Blueprint('debug', __name__)
+
+@debug_bp.route('/profile', methods=['GET'])
+@token_required
+def sample_profile():
+    """
+    Samples every thread for ?seconds=N and returns collapsed stacks
+    (?format=speedscope for speedscope JSON). ?service=inference profiles the
+    inference service instead. In prefork mode this covers the worker that
+    took the request.
+    """
+    if g.token_sub != 'internal_proxy':
+        return jsonify({"error": "Unauthorized"}), 403
+
+    seconds = request.args.get('seconds', default=10, type=float)
+    seconds = min(max(seconds, 0.1), current_app.config['PROFILE_MAX_SECONDS'])
+
+    if request.args.get('service', 'web') == 'inference':
+        params = {k: v for k, v in request.args.items() if k != 'service'}
+        try:
+            r = current_app.http.get(
+                f"{current_app.config['INFERENCE_URL']}/debug/profile",
+                params=params,
+                headers={'Authorization': f'Bearer {_get_proxy_token()}'},
+                timeout=seconds + 10
+            )
+        except Exception as e:
+            return jsonify({"error": f"Inference service error: {str(e)}"}), 503
+        return Response(r.content, status=r.status_code, content_type=r.headers.get('Content-Type'))
+
+    try:
+        counts, samples = sample_stacks(
+            seconds,
+            interval=current_app.config['PROFILE_INTERVAL_MS'] / 1000,
+            include_idle=request.args.get('idle', 'false').lower() == 'true'
+        )
+    except ProfilerBusy:
+        return jsonify({"error": "A profile is already running"}), 409
+
+    if request.args.get('format') == 'speedscope':
+        resp = jsonify(speedscope(counts, f"automo-web-app pid {os.getpid()}, {seconds:g}s"))
+    else:
+        resp = Response(collapsed(counts), mimetype='text/plain')
+    resp.headers['X-Profile-Samples'] = str(samples)
+    return resp
+
+@debug_bp.route('/profile/<profile_id>', methods=['GET'])
+@token_required
+def request_profile(profile_id):
+    """cProfile report for a request sent with an X-Profile header, by its X-Profile-Id."""
+    if g.token_sub != 'internal_proxy':
+        return jsonify({"error": "Unauthorized"}), 403
+
+    report = current_app.cache.get(f"profile:{profile_id}")
+    if report is None:
+        return jsonify({"error": "Profile not found or expired"}), 404
+    return Response(report, mimetype='text/plain')
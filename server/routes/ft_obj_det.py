@@ -1,17 +1,52 @@
 import io
 import json
-import requests
 import imagehash
 from PIL import Image
 from flask import Blueprint, current_app, jsonify, request
 from server.utils.auth import token_required
+from server.utils.cache import stale_key
+from server.utils.http_cache import encode_body, encode_entry, join_json, read_bodies, serve_cached, serve_entry, store_entry
+from server.utils.metrics import record_cache
+from server.utils.quota import quota_exceeded
+from server.utils.resilience import UpstreamUnavailable
+from server.utils.tracing import current_spans, span
 
 obj_det_bp = Blueprint('obj_det', __name__)
 
 def get_image_hash(file_bytes):
     """Generates a perceptual hash for a given image byte stream."""
-    img = Image.open(io.BytesIO(file_bytes))
-    return str(imagehash.phash(img))
+    with span('phash'):
+        img = Image.open(io.BytesIO(file_bytes))
+        return str(imagehash.phash(img))
+
+# Everything here that takes `app` works for the Flask app and the Quart app
+# alike (see ft_obj_det_async.py); only the I/O is written twice.
+
+def predict_cache_key(app, image_hash):
+    return app.generate_cache_key(f"pred:{image_hash}", path=app.url_for('.predict_image'))
+
+def inpaint_cache_key(app, image_hash, mask_hash):
+    # Combined so a different mask for the same image results in a different cache key
+    return app.generate_cache_key(f"inpaint:{image_hash}_{mask_hash}", path=app.url_for('.inpaint'))
+
+def upload(file, data):
+    """A multipart part for the inference service, from an uploaded file already read into `data`."""
+    return (file.filename, data, file.content_type)
+
+def inference_error(label, e):
+    """(payload, status) for an inference failure with no stale copy to serve."""
+    return {"error": f"{label} service error: {str(e)}"}, 503
+
+def inference_failure(cache_key, label, e):
+    """Serves the last good result for this image while inference is failing, otherwise 503."""
+    try:
+        stale = serve_cached(cache_key, stale=True)
+    except Exception:
+        stale = None
+    if stale:
+        return stale
+    payload, status = inference_error(label, e)
+    return jsonify(payload), status
 
 @obj_det_bp.route('/predictImage', methods=["POST"])
 @token_required
@@ -24,28 +59,33 @@ def predict_image():
     
     # 1. Generate Cache Key using Image Hash
     img_hash = get_image_hash(file_data)
-    cache_key = current_app.generate_cache_key(f"pred:{img_hash}")
+    cache_key = predict_cache_key(current_app, img_hash)
 
     # 2. Check KeyDB Cache
-    cached_res = current_app.cache.get(cache_key)
+    cached_res = serve_cached(cache_key)
     if cached_res:
-        return jsonify(json.loads(cached_res)), 200
+        return cached_res
+
+    limited = quota_exceeded('predict')
+    if limited:
+        return limited
 
     inf_url = current_app.config['INFERENCE_URL']
     
     try:
         # Cache Miss - Call Inference
-        files = {'file': (file.filename, file_data, file.content_type)}
-        response = requests.post(f"{inf_url}/predictImage", files=files, timeout=30)
+        files = {'file': upload(file, file_data)}
+        with current_app.upstreams['inference'].guard() as call:
+            response = call.check(current_app.http.post(f"{inf_url}/predictImage", files=files, timeout=30))
         response.raise_for_status()
-        data = response.json()
+        entry = encode_entry(response.json())
 
-        current_app.cache.setex(cache_key, 3600, json.dumps(data))
+        store_entry(current_app.cache_raw, cache_key, 3600, entry)
 
-        return jsonify(data), 200
+        return serve_entry(entry)
     
     except Exception as e:
-        return jsonify({"error": f"Inference service error: {str(e)}"}), 503
+        return inference_failure(cache_key, "Inference", e)
 
 @obj_det_bp.route("/inpaint", methods=["POST"])
 @token_required
@@ -60,43 +100,181 @@ def inpaint():
     mask_data = mask_file.read()
 
     # Generate Combined Hash (Image + Mask)
-    # We combine them so a different mask for the same image results in a different cache key
-    combined_hash = f"{get_image_hash(image_data)}_{get_image_hash(mask_data)}"
-    cache_key = current_app.generate_cache_key(f"inpaint:{combined_hash}")
+    cache_key = inpaint_cache_key(current_app, get_image_hash(image_data), get_image_hash(mask_data))
 
     # Check Cache
-    cached_res = current_app.cache.get(cache_key)
+    cached_res = serve_cached(cache_key)
     if cached_res:
-        return jsonify(json.loads(cached_res)), 200
+        return cached_res
+
+    limited = quota_exceeded('inpaint')
+    if limited:
+        return limited
 
     inf_url = current_app.config['INFERENCE_URL']
-    print(f"DEBUG: Calling Inference at {inf_url}/inpaint")
+    current_app.logger.debug("Calling inference at %s/inpaint", inf_url)
 
     try:
         # Cache Miss
-        files = {
-            'image': (image_file.filename, image_data, image_file.content_type),
-            'mask': (mask_file.filename, mask_data, mask_file.content_type)
-        }
+        files = {'image': upload(image_file, image_data), 'mask': upload(mask_file, mask_data)}
         
-        response = requests.post(f"{inf_url}/inpaint", files=files, timeout=120)
+        with current_app.upstreams['inference'].guard() as call:
+            response = call.check(current_app.http.post(f"{inf_url}/inpaint", files=files, timeout=120))
         response.raise_for_status()
-        data = response.json()
+        entry = encode_entry(response.json())
 
         # Save to KeyDB (Inpainting is expensive, so we cache it)
-        current_app.cache.setex(cache_key, 3600, json.dumps(data))
+        store_entry(current_app.cache_raw, cache_key, 3600, entry)
 
-        return jsonify(data), 200
+        return serve_entry(entry)
 
     except Exception as e:
-        return jsonify({"error": f"Inpainting service error: {str(e)}"}), 503
+        return inference_failure(cache_key, "Inpainting", e)
+
+def pipeline_keys(app, image_hash, mask_hash):
+    """
+    The keys /predictImage and /inpaint cache this image's results under,
+    then the one /pipeline keeps a skipped inpaint's reason under. Whether
+    to inpaint depends on the prediction alone, so that key ignores the mask.
+    """
+    return (
+        predict_cache_key(app, image_hash),
+        inpaint_cache_key(app, image_hash, mask_hash),
+        app.generate_cache_key(f"inpaint-skip:{image_hash}", path=app.url_for('.pipeline'))
+    )
+
+def pipeline_entry(prediction, inpaint, cached, skipped=None, error=None):
+    """
+    The /pipeline response, spliced from the parts' JSON bytes, with this
+    request's stage timings. Not compressed: the base64 PNG barely shrinks,
+    and a hit should not pay for it.
+    """
+    return encode_body(join_json({
+        'prediction': prediction,
+        'inpaint': inpaint or b'null',
+        'inpaint_skipped': json.dumps(skipped).encode(),
+        'inpaint_error': json.dumps(error).encode(),
+        'cached': json.dumps(cached).encode(),
+        'timings_ms': json.dumps(current_spans()).encode()
+    }), encodings=())
+
+def pipeline_hit(keys, bodies):
+    """
+    The pipeline_entry arguments from the cached bodies of pipeline_keys,
+    or None unless the prediction and either the inpaint or its skip are cached.
+    """
+    for key, body in zip(keys, bodies[:2]):
+        record_cache(key, 'hit' if body else 'miss')
+    prediction, inpaint, skipped = bodies
+    if prediction and inpaint:
+        return prediction, inpaint, ['prediction', 'inpaint']
+    if prediction and skipped:
+        return prediction, None, ['prediction'], json.loads(skipped)
+    return None
+
+def skip_entry(reason):
+    return encode_body(json.dumps(reason).encode(), encodings=())
+
+def pipeline_fallback(bodies, stale_bodies, keys, e):
+    """
+    Fills the parts inference could not provide from their stale copies.
+    Returns the pipeline_entry arguments, or None without a prediction.
+    """
+    for i, body in enumerate(stale_bodies):
+        if bodies[i] is None and body:
+            bodies[i] = body
+            record_cache(keys[i], 'stale')
+    if bodies[0] is None:
+        return None
+    cached = ['prediction', 'inpaint'] if bodies[1] else ['prediction']
+    return bodies[0], bodies[1], cached, None, None if bodies[1] else f"Inpainting service error: {str(e)}"
+
+def pipeline_result(result, keys):
+    """
+    (writes, pipeline_entry arguments) for the inference service's /pipeline
+    result, each write a store_entry (key, entry, stale). Encodes the
+    inpainted image, a large body.
+    """
+    prediction = encode_entry(result['prediction'])
+    writes = [(keys[0], prediction, True)]
+    inpaint_body = None
+    if result.get('inpaint'):
+        inpainted = encode_entry(result['inpaint'])
+        writes.append((keys[1], inpainted, True))
+        inpaint_body = inpainted['body']
+    elif result.get('inpaint_skipped'):
+        # So a repeat is answered from cache instead of classifying again
+        writes.append((keys[2], skip_entry(result['inpaint_skipped']), False))
+    return writes, (prediction['body'], inpaint_body, [], result.get('inpaint_skipped'), result.get('inpaint_error'))
+
+@obj_det_bp.route('/pipeline', methods=["POST"])
+@token_required
+def pipeline():
+    """
+    /predictImage then /inpaint from one upload of the image and mask. The
+    inference service inpaints only when the damage class calls for it, and
+    both results go into those routes' caches.
+    """
+    image_file = request.files.get("image")
+    mask_file = request.files.get("mask")
+
+    if not image_file or not mask_file:
+        return jsonify({"error": "Image and mask required"}), 400
+
+    image_data = image_file.read()
+    mask_data = mask_file.read()
+
+    # One hash per upload and one round trip for both cached results
+    keys = pipeline_keys(current_app, get_image_hash(image_data), get_image_hash(mask_data))
+    bodies = read_bodies(current_app.cache_raw, keys)
+    hit = pipeline_hit(keys, bodies)
+    if hit:
+        return serve_entry(pipeline_entry(*hit))
+
+    limited = quota_exceeded('pipeline')
+    if limited:
+        return limited
+
+    inf_url = current_app.config['INFERENCE_URL']
+
+    try:
+        files = {'image': upload(image_file, image_data), 'mask': upload(mask_file, mask_data)}
+        with current_app.upstreams['inference'].guard() as call:
+            response = call.check(current_app.http.post(f"{inf_url}/pipeline", files=files, timeout=150))
+        response.raise_for_status()
+        result = response.json()
+    except Exception as e:
+        try:
+            stale_bodies = read_bodies(current_app.cache_raw, [stale_key(key) for key in keys[:2]])
+        except Exception:
+            stale_bodies = [None, None]
+        fallback = pipeline_fallback(bodies[:2], stale_bodies, keys, e)
+        if fallback is None:
+            payload, status = inference_error("Inference", e)
+            return jsonify(payload), status
+        return serve_entry(pipeline_entry(*fallback))
+
+    writes, parts = pipeline_result(result, keys)
+    for key, entry, stale in writes:
+        store_entry(current_app.cache_raw, key, 3600, entry, stale=stale)
+    return serve_entry(pipeline_entry(*parts))
+
+def health_payload(breaker, r=None, error=None):
+    """(payload, status) for /health from the inference service's own /health response, or the error getting it."""
+    if error is None:
+        try:
+            return {**r.json(), "breaker": breaker}, r.status_code
+        except Exception as e:
+            error = e
+    return {"status": "offline", "error": str(error), "breaker": breaker}, 503
 
 @obj_det_bp.route('/health', methods=['GET'])
 @token_required
 def proxy_health():
     inf_url = current_app.config['INFERENCE_URL']
+    breaker = current_app.upstreams['inference'].snapshot()
     try:
-        r = requests.get(f"{inf_url}/health", timeout=5)
-        return jsonify(r.json()), r.status_code
+        payload, status = health_payload(breaker, r=current_app.http.get(f"{inf_url}/health", timeout=5))
     except Exception as e:
-        return jsonify({"status": "offline", "error": str(e)}), 503
+        payload, status = health_payload(breaker, error=e)
+    return jsonify(payload), status
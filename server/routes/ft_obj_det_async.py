@@ -0,0 +1,173 @@
+import asyncio
+from quart import Blueprint, current_app, jsonify, request
+from server.utils.async_auth import token_required
+from server.routes.ft_obj_det import (
+    get_image_hash, health_payload, inference_error, inpaint_cache_key, pipeline_entry, pipeline_fallback,
+    pipeline_hit, pipeline_keys, pipeline_result, predict_cache_key, upload
+)
+from server.utils.async_http_cache import serve_cached, serve_entry
+from server.utils.cache import stale_key
+from server.utils.http_cache import aread_bodies, astore_entry, encode_entry
+from server.utils.quota import aquota_exceeded
+
+# Async twin of obj_det_bp, served under the same /obj-det prefix in SERVER_MODE=async
+obj_det_async_bp = Blueprint('obj_det_async', __name__)
+
+async def inference_failure(cache_key, label, e):
+    """Serves the last good result for this image while inference is failing, otherwise 503."""
+    try:
+        stale = await serve_cached(cache_key, stale=True)
+    except Exception:
+        stale = None
+    if stale:
+        return stale
+    payload, status = inference_error(label, e)
+    return jsonify(payload), status
+
+@obj_det_async_bp.route('/predictImage', methods=["POST"])
+@token_required
+async def predict_image():
+    files = await request.files
+    if 'file' not in files:
+        return jsonify({"error": "No file provided"}), 400
+
+    file = files['file']
+    file_data = file.read()
+
+    # phash is CPU work, keep it off the event loop
+    img_hash = await asyncio.to_thread(get_image_hash, file_data)
+    cache_key = predict_cache_key(current_app, img_hash)
+
+    cached_res = await serve_cached(cache_key)
+    if cached_res:
+        return cached_res
+
+    limited = await aquota_exceeded('predict')
+    if limited:
+        return limited
+
+    inf_url = current_app.config['INFERENCE_URL']
+
+    try:
+        files = {'file': upload(file, file_data)}
+        with current_app.upstreams['inference'].guard() as call:
+            response = call.check(await current_app.http.post(f"{inf_url}/predictImage", files=files, timeout=30))
+        response.raise_for_status()
+        entry = encode_entry(response.json())
+
+        await astore_entry(current_app.cache_raw, cache_key, 3600, entry)
+
+        return serve_entry(entry)
+
+    except Exception as e:
+        return await inference_failure(cache_key, "Inference", e)
+
+@obj_det_async_bp.route("/inpaint", methods=["POST"])
+@token_required
+async def inpaint():
+    files = await request.files
+    image_file = files.get("image")
+    mask_file = files.get("mask")
+
+    if not image_file or not mask_file:
+        return jsonify({"error": "Image and mask required"}), 400
+
+    image_data = image_file.read()
+    mask_data = mask_file.read()
+
+    image_hash, mask_hash = await asyncio.gather(
+        asyncio.to_thread(get_image_hash, image_data),
+        asyncio.to_thread(get_image_hash, mask_data)
+    )
+    cache_key = inpaint_cache_key(current_app, image_hash, mask_hash)
+
+    cached_res = await serve_cached(cache_key)
+    if cached_res:
+        return cached_res
+
+    limited = await aquota_exceeded('inpaint')
+    if limited:
+        return limited
+
+    inf_url = current_app.config['INFERENCE_URL']
+
+    try:
+        files = {'image': upload(image_file, image_data), 'mask': upload(mask_file, mask_data)}
+
+        # The 120 s wait is a suspended coroutine here, not a pinned thread
+        with current_app.upstreams['inference'].guard() as call:
+            response = call.check(await current_app.http.post(f"{inf_url}/inpaint", files=files, timeout=120))
+        response.raise_for_status()
+        # The inpainted image is a large body, compress it off the event loop
+        entry = await asyncio.to_thread(encode_entry, response.json())
+
+        await astore_entry(current_app.cache_raw, cache_key, 3600, entry)
+
+        return serve_entry(entry)
+
+    except Exception as e:
+        return await inference_failure(cache_key, "Inpainting", e)
+
+@obj_det_async_bp.route('/pipeline', methods=["POST"])
+@token_required
+async def pipeline():
+    """/predictImage then /inpaint from one upload; see ft_obj_det.pipeline."""
+    files = await request.files
+    image_file = files.get("image")
+    mask_file = files.get("mask")
+
+    if not image_file or not mask_file:
+        return jsonify({"error": "Image and mask required"}), 400
+
+    image_data = image_file.read()
+    mask_data = mask_file.read()
+
+    image_hash, mask_hash = await asyncio.gather(
+        asyncio.to_thread(get_image_hash, image_data),
+        asyncio.to_thread(get_image_hash, mask_data)
+    )
+    keys = pipeline_keys(current_app, image_hash, mask_hash)
+    bodies = await aread_bodies(current_app.cache_raw, keys)
+    hit = pipeline_hit(keys, bodies)
+    if hit:
+        return serve_entry(pipeline_entry(*hit))
+
+    limited = await aquota_exceeded('pipeline')
+    if limited:
+        return limited
+
+    inf_url = current_app.config['INFERENCE_URL']
+
+    try:
+        files = {'image': upload(image_file, image_data), 'mask': upload(mask_file, mask_data)}
+        with current_app.upstreams['inference'].guard() as call:
+            response = call.check(await current_app.http.post(f"{inf_url}/pipeline", files=files, timeout=150))
+        response.raise_for_status()
+        result = response.json()
+    except Exception as e:
+        try:
+            stale_bodies = await aread_bodies(current_app.cache_raw, [stale_key(key) for key in keys[:2]])
+        except Exception:
+            stale_bodies = [None, None]
+        fallback = pipeline_fallback(bodies[:2], stale_bodies, keys, e)
+        if fallback is None:
+            payload, status = inference_error("Inference", e)
+            return jsonify(payload), status
+        return serve_entry(pipeline_entry(*fallback))
+
+    # The inpainted image is a large body, compress it off the event loop
+    writes, parts = await asyncio.to_thread(pipeline_result, result, keys)
+    for key, entry, stale in writes:
+        await astore_entry(current_app.cache_raw, key, 3600, entry, stale=stale)
+    return serve_entry(pipeline_entry(*parts))
+
+@obj_det_async_bp.route('/health', methods=['GET'])
+@token_required
+async def proxy_health():
+    inf_url = current_app.config['INFERENCE_URL']
+    breaker = current_app.upstreams['inference'].snapshot()
+    try:
+        payload, status = health_payload(breaker, r=await current_app.http.get(f"{inf_url}/health", timeout=5))
+    except Exception as e:
+        payload, status = health_payload(breaker, error=e)
+    return jsonify(payload), status
@@ -0,0 +1,36 @@
+import asyncio
+from functools import wraps
+from quart import request, jsonify, g, current_app
+from server.utils.auth import bearer_token, decode_token, load_user
+from server.utils.tracing import span
+
+def token_required(f):
+    """Quart counterpart of server.utils.auth.token_required, sharing its token and user caches."""
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        token = bearer_token(request.headers.get('Authorization'))
+
+        if not token:
+            return jsonify({'error': 'Token is missing!'}), 401
+
+        flask_app = current_app.flask_app
+        try:
+            with span('auth'):
+                data = decode_token(token, flask_app)
+                g.token_sub = data.get('sub')
+                g.current_user = flask_app.user_cache.get_user(g.token_sub)
+                if g.current_user is None:
+                    # Cache miss means a SQLite read; do it on a worker thread
+                    g.current_user = await asyncio.to_thread(load_user, g.token_sub, flask_app)
+
+            if not g.current_user and g.token_sub != 'internal_proxy':
+                return jsonify({'error': 'User not found'}), 401
+
+        except Exception as e:
+            return jsonify({'error': f'Invalid token: {str(e)}'}), 401
+
+        return await f(*args, **kwargs)
+    return decorated
+
+def _get_proxy_token():
+    return current_app.flask_app.generate_token()
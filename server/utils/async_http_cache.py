@@ -0,0 +1,24 @@
+"""Quart counterparts of the view helpers in server.utils.http_cache."""
+from quart import Response, current_app, request
+from server.utils.cache import stale_key
+from server.utils.http_cache import accepted_encodings, aread_entry, etag_matches, make_response, pick
+from server.utils.metrics import record_cache
+
+async def serve_cached(cache_key, stale=False):
+    key = stale_key(cache_key) if stale else cache_key
+    entry = await aread_entry(
+        current_app.cached_json_script, key, request.headers.get('If-None-Match'),
+        accepted_encodings(request.accept_encodings)
+    )
+    if entry is None:
+        if not stale:
+            record_cache(cache_key, 'miss')
+        return None
+    record_cache(cache_key, 'stale' if stale else 'hit')
+    return make_response(Response, *entry, headers={'X-Cache-Stale': 'true'} if stale else None)
+
+def serve_entry(entry, status=200):
+    field, value = pick(entry, accepted_encodings(request.accept_encodings))
+    if status == 200 and etag_matches(request.headers.get('If-None-Match'), entry['etag']):
+        return make_response(Response, entry['etag'], field, None)
+    return make_response(Response, entry['etag'], field, value, status)
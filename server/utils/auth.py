@@ -2,22 +2,54 @@ from functools import wraps
 from flask import request, jsonify, g, current_app
 import jwt
 from server.models.user import User
+from server.utils.tracing import span
+
+def decode_token(token, app=None):
+    """Verifies a JWT once, then serves the decoded payload from memory until it expires."""
+    app = app or current_app
+    cache = app.user_cache
+    data = cache.get_token(token)
+    if data is None:
+        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+        cache.put_token(token, data)
+    return data
+
+def load_user(sub, app=None):
+    """
+    Looks up the user for a token `sub`, hitting SQLite only on a cache miss.
+    Pass the Flask app explicitly when calling from outside a Flask request (e.g. Quart views).
+    """
+    if sub is None or sub == 'internal_proxy':
+        return None
+
+    app = app or current_app._get_current_object()
+    cache = app.user_cache
+    user = cache.get_user(sub)
+    if user is None:
+        with app.app_context():
+            row = User.query.filter_by(username=sub).first()
+            if row:
+                user = cache.put_user(row)
+    return user
+
+def bearer_token(auth_header):
+    if auth_header and auth_header.startswith("Bearer "):
+        return auth_header.split(" ")[1]
+    return None
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
+        token = bearer_token(request.headers.get('Authorization'))
 
         if not token:
             return jsonify({'error': 'Token is missing!'}), 401
         
         try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            g.token_sub = data.get('sub')
-            g.current_user = User.query.filter_by(username=g.token_sub).first()
+            with span('auth'):
+                data = decode_token(token)
+                g.token_sub = data.get('sub')
+                g.current_user = load_user(g.token_sub)
             
             if not g.current_user and g.token_sub != 'internal_proxy':
                 return jsonify({'error': 'User not found'}), 401
@@ -0,0 +1,79 @@
+import random
+import time
+from server.utils.metrics import record_cache
+from server.utils.tracing import span
+
+def build_cache_key(prefix, path, *args):
+    """
+    Framework-independent half of generate_cache_key, shared by the Flask
+    and async (Quart) views so both produce identical keys.
+    """
+    key_parts = [prefix, path]
+
+    for arg in args:
+        key_parts.append(str(arg))
+
+    return ":".join(key_parts)
+
+def namespace_of(cache_key):
+    """'sarima' for 'sarima@<version>:forecast:...', None for keys outside a namespace."""
+    head = cache_key.split(':', 1)[0]
+    return head.split('@', 1)[0] if '@' in head else None
+
+def tag_key(namespace):
+    # Not "tag:": those were plain sets, left to expire
+    return f"tags:{namespace}"
+
+def cached_get(cache, cache_key):
+    """cache.get that also counts the hit or miss against the key's prefix."""
+    with span('cache'):
+        value = cache.get(cache_key)
+    record_cache(cache_key, 'hit' if value else 'miss')
+    return value
+
+async def acached_get(cache, cache_key):
+    with span('cache'):
+        value = await cache.get(cache_key)
+    record_cache(cache_key, 'hit' if value else 'miss')
+    return value
+
+# Fraction shaved off TTLs at random, so entries written together expire apart
+TTL_JITTER = 0.1
+
+def jittered_ttl(ttl):
+    return max(1, int(ttl * (1 - random.uniform(0, TTL_JITTER))))
+
+# Last known good copy of each cached upstream response, served while an
+# upstream's circuit breaker is open or its call fails
+STALE_TTL = 7 * 86400
+
+def stale_key(cache_key):
+    return f"stale:{cache_key}"
+
+def tag_keys(pipe, cache_key, ttls):
+    """
+    Adds keys ({key: ttl}) to their namespace's tag set, a ZSET scored by
+    each key's expiry. Members that have already expired are pruned on the
+    same write, so the set only holds keys that can still exist.
+    """
+    namespace = namespace_of(cache_key)
+    if namespace:
+        now = time.time()
+        pipe.zadd(tag_key(namespace), {key: now + ttl for key, ttl in ttls.items()})
+        pipe.zremrangebyscore(tag_key(namespace), '-inf', now)
+        pipe.expire(tag_key(namespace), STALE_TTL)
+
+def set_tagged(cache, cache_key, ttl, value):
+    """setex that also registers the key under its namespace's tag set."""
+    pipe = cache.pipeline(transaction=False)
+    pipe.setex(cache_key, ttl, value)
+    tag_keys(pipe, cache_key, {cache_key: ttl})
+    with span('cache'):
+        return pipe.execute()
+
+async def aset_tagged(cache, cache_key, ttl, value):
+    pipe = cache.pipeline(transaction=False)
+    pipe.setex(cache_key, ttl, value)
+    tag_keys(pipe, cache_key, {cache_key: ttl})
+    with span('cache'):
+        return await pipe.execute()
@@ -0,0 +1,212 @@
+"""
+Versioned cache namespaces with tag-based invalidation.
+
+Each cached response belongs to a namespace (sarima, inference, reorder)
+whose version leads its key:
+
+    sarima@3f2a9c81d0e4.2:forecast:/ts-model/forecast:12
+
+A version is "<model id>.<generation>". The model id comes from the upstream
+(its /health, or a digest of what it serves) or the reorder pickle's hash,
+and is re-checked every CACHE_NAMESPACE_POLL seconds. The generation is
+bumped by invalidate(). Either change moves every reader to new keys at once.
+
+Keys are also added to a tag set per namespace as they are written.
+Invalidation bumps the version and retires the tag set in one Lua script,
+then deletes the retired keys in batches, so a retrained SARIMA model clears
+its forecasts without SCAN or FLUSHALL, without touching image predictions
+and without one long script blocking KeyDB.
+
+Run `python -m server.utils.cache_namespaces <namespace>` to invalidate by hand.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from server.utils.cache import tag_key
+
+NAMESPACES_KEY = "cache:namespaces"
+
+# generate_cache_key picks the namespace from the request path
+PATH_NAMESPACES = {'/ts-model/': 'sarima', '/obj-det/': 'inference', '/order-model/': 'reorder'}
+
+_UNSAFE = re.compile(r'[^A-Za-z0-9._-]')
+
+# Bumps a namespace's generation and renames its tag set to retired_key() in one
+# step. With a model id, only does so when the id differs from the recorded one.
+# KEYS[1]: namespaces hash, KEYS[2]: the namespace's tag set.
+# ARGV[1]: namespace, ARGV[2]: model id ('' to invalidate unconditionally).
+# Returns the new generation, or nil if the model id was unchanged.
+# The retired key is not declared in KEYS, which is fine on a single KeyDB node.
+INVALIDATE_LUA = """
+if ARGV[2] ~= '' then
+    local field = ARGV[1] .. ':model'
+    if redis.call('HGET', KEYS[1], field) == ARGV[2] then
+        return nil
+    end
+    redis.call('HSET', KEYS[1], field, ARGV[2])
+end
+local generation = redis.call('HINCRBY', KEYS[1], ARGV[1] .. ':gen', 1)
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('RENAME', KEYS[2], KEYS[2] .. ':retired:' .. generation)
+end
+return generation
+"""
+
+# Tagged keys deleted per round trip once a tag set is retired
+PURGE_BATCH = 500
+
+def retired_key(namespace, generation):
+    return f"{tag_key(namespace)}:retired:{generation}"
+
+def purge_retired(redis_client, namespace, generation):
+    """
+    Deletes the keys of a retired tag set, PURGE_BATCH at a time. Readers
+    are already on the new version, so this only frees memory; if it stops
+    part way the rest expire on their own.
+    """
+    key = retired_key(namespace, generation)
+    while True:
+        members = [member for member, _ in redis_client.zpopmin(key, PURGE_BATCH)]
+        if not members:
+            return
+        redis_client.delete(*members)
+
+def invalidate(redis_client, script, namespace, model_id=''):
+    """Runs INVALIDATE_LUA and purges what it retired. Returns the new generation or None."""
+    generation = script(keys=[NAMESPACES_KEY, tag_key(namespace)], args=[namespace, model_id])
+    if generation is not None:
+        purge_retired(redis_client, namespace, generation)
+    return generation
+
+def clean_model_id(value):
+    return _UNSAFE.sub('_', str(value))[:32] if value not in (None, '') else None
+
+class CacheNamespaces:
+    """
+    Process-local view of the namespace versions in KeyDB, kept current by a
+    daemon thread: versions are re-read every `sync_interval` seconds and
+    model ids re-resolved every `poll_interval`.
+    """
+
+    def __init__(self, redis_client, resolvers, poll_interval=60, sync_interval=5, logger=None):
+        self.cache = redis_client
+        # namespace -> callable returning the current model id, or None if unknown right now
+        self.resolvers = resolvers
+        self.poll_interval = poll_interval
+        self.sync_interval = sync_interval
+        self.logger = logger
+        self.versions = {namespace: '0.0' for namespace in resolvers}
+        self._script = redis_client.register_script(INVALIDATE_LUA)
+        self._thread = None
+
+    def qualify(self, namespace, cache_key):
+        return f"{namespace}@{self.versions.get(namespace, '0.0')}:{cache_key}"
+
+    def qualify_path(self, path, cache_key):
+        """Namespaces a generate_cache_key key by its request path; other paths pass through."""
+        for prefix, namespace in PATH_NAMESPACES.items():
+            if path.startswith(prefix):
+                return self.qualify(namespace, cache_key)
+        return cache_key
+
+    def sync(self):
+        """Reads the current versions from KeyDB. Keeps the last known ones if it is unreachable."""
+        try:
+            fields = self.cache.hgetall(NAMESPACES_KEY)
+        except Exception:
+            return
+        self.versions = {
+            namespace: f"{fields.get(f'{namespace}:model', '0')}.{fields.get(f'{namespace}:gen', '0')}"
+            for namespace in self.resolvers
+        }
+
+    def invalidate(self, namespace):
+        """Drops every cached entry in `namespace` and moves it to a new generation."""
+        generation = invalidate(self.cache, self._script, namespace)
+        self.sync()
+        return generation
+
+    def check_models(self):
+        """Invalidates the namespaces whose upstream model id changed. Returns their names."""
+        changed = []
+        for namespace, resolve in self.resolvers.items():
+            try:
+                model_id = clean_model_id(resolve())
+                if model_id and invalidate(self.cache, self._script, namespace, model_id) is not None:
+                    changed.append(namespace)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning("Could not check the %s model version: %s", namespace, e)
+        if changed and self.logger:
+            self.logger.info("Model changed, cache invalidated: %s", ", ".join(changed))
+        self.sync()
+        return changed
+
+    def start(self):
+        """Starts the sync thread. Call once per serving process, after any fork."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, name="cache-namespaces", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        next_poll = 0.0
+        while True:
+            if time.monotonic() >= next_poll:
+                self.check_models()
+                next_poll = time.monotonic() + self.poll_interval
+            else:
+                self.sync()
+            time.sleep(self.sync_interval)
+
+def _health_model_id(app, base_url):
+    r = app.http.get(f"{base_url}/health", timeout=2)
+    r.raise_for_status()
+    body = r.json()
+    return body.get('model_version') or body.get('version')
+
+def build_namespaces(app):
+    """Namespaces for the sarima, inference and reorder caches, with their model id lookups."""
+    from server.utils.reorder_model import model_digest
+
+    def sarima():
+        if app.config['SARIMA_MODEL_VERSION']:
+            return app.config['SARIMA_MODEL_VERSION']
+        if app.sarima_engine and app.config['SARIMA_LOCAL_ROUTES']:
+            # Answered in-process: the export is the model
+            return app.sarima_engine.model_version
+        model_id = _health_model_id(app, app.config['MODEL_API_URL'])
+        if model_id:
+            return model_id
+        # The API does not report a version: its metrics change whenever it is retrained
+        r = app.http.get(
+            f"{app.config['MODEL_API_URL']}/metrics",
+            headers={'Authorization': f"Bearer {app.generate_token()}"},
+            timeout=5
+        )
+        r.raise_for_status()
+        return hashlib.md5(json.dumps(r.json(), sort_keys=True).encode()).hexdigest()[:12]
+
+    def inference():
+        return _health_model_id(app, app.config['INFERENCE_URL'])
+
+    namespaces = CacheNamespaces(
+        app.cache,
+        {'sarima': sarima, 'inference': inference, 'reorder': model_digest},
+        poll_interval=app.config['CACHE_NAMESPACE_POLL'],
+        logger=app.logger
+    )
+    namespaces.sync()
+    return namespaces
+
+if __name__ == "__main__":
+    import redis
+    if len(sys.argv) != 2 or sys.argv[1] not in PATH_NAMESPACES.values():
+        sys.exit(f"usage: python -m server.utils.cache_namespaces {{{','.join(PATH_NAMESPACES.values())}}}")
+    client = redis.Redis.from_url(os.getenv("KEYDB_URL", "redis://cache-db:6379/0"), decode_responses=True)
+    generation = invalidate(client, client.register_script(INVALIDATE_LUA), sys.argv[1])
+    print(f"{sys.argv[1]}: now generation {generation}")
@@ -0,0 +1,101 @@
+"""
+Month ranges and Largest-Triangle-Three-Buckets downsampling for the series
+the /ts-model routes return (history and forecast rows keyed by 'YYYY-MM').
+
+LTTB keeps the first and last points and splits the rest into equal
+buckets. From each bucket it keeps the point that forms the largest triangle
+with the point kept from the previous bucket and the mean of the next one,
+so peaks and troughs survive where striding or averaging would flatten them.
+The pick in a bucket depends on the previous pick, so buckets are visited in
+order, but the bucket means come from one cumulative sum and every candidate
+in a bucket is scored by one array expression.
+"""
+import re
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+MIN_POINTS = 3
+# Upper bound on ?max_points, so the number of cached variants stays bounded
+MAX_POINTS = 5000
+MONTH_RE = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+def series_window(args):
+    """
+    (start, end, max_points) from ?start=YYYY-MM&end=YYYY-MM&max_points=N,
+    each None when absent, or None when none is given. Raises ValueError.
+    """
+    start, end, max_points = args.get('start') or None, args.get('end') or None, args.get('max_points') or None
+    if not (start or end or max_points):
+        return None
+    for name, value in (('start', start), ('end', end)):
+        if value and not MONTH_RE.match(value):
+            raise ValueError(f"{name} must be a month as YYYY-MM")
+    if start and end and start > end:
+        raise ValueError("start must not be after end")
+    if max_points:
+        try:
+            max_points = int(max_points)
+        except ValueError:
+            max_points = 0
+        if not MIN_POINTS <= max_points <= MAX_POINTS:
+            raise ValueError(f"max_points must be between {MIN_POINTS} and {MAX_POINTS}")
+    return start, end, max_points
+
+def window_key_parts(window):
+    """Cache key arguments for a window: none for the full series."""
+    return () if window is None else tuple('' if part is None else part for part in window)
+
+def month_range(rows, start=None, end=None):
+    """The rows with start <= month <= end. Rows are in month order and labels compare as strings."""
+    months = [row['month'] for row in rows]
+    lo = bisect_left(months, start) if start else 0
+    hi = bisect_right(months, end) if end else len(rows)
+    return rows[lo:hi]
+
+def lttb_indices(y, n_out):
+    """Positions of the n_out points LTTB keeps from y, taking x as the position; all of them if y is no longer."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    if n_out < MIN_POINTS:
+        raise ValueError(f"n_out must be at least {MIN_POINTS}")
+
+    # Bucket i holds the inner points bounds[i]:bounds[i + 1]
+    bounds = np.arange(n_out - 1) * (n - 2) // (n_out - 2) + 1
+    lo, hi = bounds[:-1], bounds[1:]
+    cumsum = np.concatenate([[0.0], np.cumsum(y)])
+    # Mean point of the bucket after each one; the last bucket looks at the last point
+    next_x = np.append((lo[1:] + hi[1:] - 1) / 2, n - 1)
+    next_y = np.append((cumsum[hi[1:]] - cumsum[lo[1:]]) / (hi[1:] - lo[1:]), y[-1])
+
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        x = np.arange(lo[i], hi[i])
+        # Twice the triangle's area; the factor does not change the argmax
+        area = np.abs((a - next_x[i]) * (y[lo[i]:hi[i]] - y[a]) - (a - x) * (next_y[i] - y[a]))
+        a = lo[i] + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+def select_series(payload, field, value_key, start=None, end=None, max_points=None):
+    """
+    Copy of a history or forecast payload with payload[field] cut to the month
+    range and downsampled on row[value_key]. Rows are kept whole, so the
+    forecast's intervals stay with their points. 'downsampled_from' gives the
+    number of rows in the range when some were dropped.
+    """
+    rows = month_range(payload[field], start, end)
+    in_range = len(rows)
+    if max_points and in_range > max_points:
+        y = np.fromiter((row[value_key] for row in rows), dtype=float, count=in_range)
+        rows = [rows[i] for i in lttb_indices(y, max_points)]
+
+    selected = {**payload, field: rows}
+    if 'count' in payload:
+        selected['count'] = len(rows)
+    if len(rows) < in_range:
+        selected['downsampled_from'] = in_range
+    return selected
@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashPoolBusy(Exception):
+    """Raised when the hashing queue is full, so the route can answer 503 straight away."""
+
+# Passwords per bulk job: a few hundred ms of scrypt, so interactive hashes are never far behind
+BULK_CHUNK = 4
+
+def _hash_chunk(passwords):
+    return [generate_password_hash(password, 'scrypt') for password in passwords]
+
+def _timed_call(fn, args):
+    # Runs in the worker process; wall clock is the only clock shared with the parent
+    started = time.time()
+    return started, fn(*args)
+
+class HashingPool:
+    """
+    Runs scrypt hashing/verification on a small dedicated process pool so
+    bursts of /login or /register never occupy the Waitress request threads
+    for long. At most `workers + max_queue` jobs, and never more than
+    `max_admitted`, hold a slot at once; anything beyond that is rejected
+    immediately instead of queueing. Keep `max_admitted` below the number of
+    request threads, since every admitted caller waits on one. A slot is
+    freed when its job ends, not when its caller gives up waiting, so a job
+    still running after a timeout keeps counting against the pool.
+    """
+
+    def __init__(self, workers=2, max_queue=16, timeout=10, max_admitted=None, sample_size=1024):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_admitted = min(workers + max_queue, max_admitted or workers + max_queue)
+        self._slots = threading.BoundedSemaphore(self.max_admitted)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        self._waits = deque(maxlen=sample_size)
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Created on first use so forked server workers each get their own pool.
+        # fork (not spawn/forkserver) so children never re-import server.app as __main__
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # A pool inherited across fork belongs to the parent: its queue
+                    # threads don't exist here, so only drop the reference
+                    ctx = multiprocessing.get_context("fork")
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def start(self):
+        """Forks the pool up front, ideally before any request threads exist."""
+        self._get_executor().submit(time.time).result()
+
+    def _discard(self, executor):
+        """Drops a broken pool (a worker died) so the next job forks a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._pid = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _start(self, fn, args, wait=None):
+        """
+        Admits and submits one job. Without `wait` a full pool rejects at once;
+        with it, the caller waits up to `wait` seconds for a slot.
+        """
+        acquired = self._slots.acquire(timeout=wait) if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise HashPoolBusy()
+
+        with self._lock:
+            self.in_flight += 1
+        executor = self._get_executor()
+        submitted = time.time()
+        try:
+            future = executor.submit(_timed_call, fn, args)
+        except BrokenProcessPool:
+            self._release(None)
+            self._discard(executor)
+            raise HashPoolBusy()
+        future.add_done_callback(self._release)
+        return executor, future, submitted
+
+    def _finish(self, job):
+        executor, future, submitted = job
+        try:
+            started, result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Only a job still queued can be cancelled; a running one keeps its slot until it ends
+            future.cancel()
+            with self._lock:
+                self.rejected += 1
+            raise HashPoolBusy()
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise HashPoolBusy()
+        with self._lock:
+            self._waits.append(max(0.0, started - submitted))
+            self.completed += 1
+        return result
+
+    def _submit(self, fn, *args):
+        return self._finish(self._start(fn, args))
+
+    def hash_password(self, password):
+        return self._submit(generate_password_hash, password, 'scrypt')
+
+    def check_password(self, pwhash, password):
+        return self._submit(check_password_hash, pwhash, password)
+
+    def hash_passwords(self, passwords):
+        """
+        Hashes a batch in waves of one BULK_CHUNK per worker. Each chunk holds
+        its own admission slot, so a /login or /register arriving mid-batch
+        queues behind at most one wave instead of the whole batch.
+        """
+        chunks = [passwords[i:i + BULK_CHUNK] for i in range(0, len(passwords), BULK_CHUNK)]
+        hashes = []
+        for first in range(0, len(chunks), self.workers):
+            jobs = []
+            try:
+                for chunk in chunks[first:first + self.workers]:
+                    # Waits for a slot rather than failing the batch on a busy moment
+                    jobs.append(self._start(_hash_chunk, (chunk,), wait=self.timeout))
+                for job in jobs:
+                    hashes.extend(self._finish(job))
+            except HashPoolBusy:
+                for _, future, _ in jobs:
+                    future.cancel()
+                raise
+        return hashes
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            in_flight, completed, rejected = self.in_flight, self.completed, self.rejected
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'max_admitted': self.max_admitted,
+            'in_flight': in_flight,
+            'queued': max(0, in_flight - self.workers),
+            'completed': completed,
+            'rejected': rejected,
+            'queue_wait_ms': {'p50': pct(0.5), 'p95': pct(0.95), 'p99': pct(0.99), 'max': pct(1.0)}
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,191 @@
+"""
+Cached JSON responses served as their stored bytes.
+
+An entry is a KeyDB hash: `body` is the JSON exactly as sent, `etag` a strong
+validator (BLAKE2 of the body), and bodies over COMPRESS_MIN_BYTES also carry
+`gzip` and `br` copies, compressed once when the entry is written. Keeping
+them in one hash means every form shares the entry's TTL, tags and
+invalidation. Each form goes out with its own strong ETag, the stored one
+with the encoding appended ("<hash>-br"), since their bytes differ.
+
+A hit never parses the JSON. One Lua call answers an If-None-Match naming
+any form of the entry with just the ETag (304), and otherwise returns the
+best encoding the client accepts, so only the bytes that go on the wire
+leave KeyDB.
+
+Entries are read and written through a client with decode_responses off
+(app.cache_raw) so the bytes come back untouched.
+"""
+import gzip
+import hashlib
+import json
+import brotli
+from flask import Response, current_app, request
+from server.utils.cache import STALE_TTL, stale_key, tag_keys
+from server.utils.metrics import record_cache
+from server.utils.tracing import span
+
+COMPRESS_MIN_BYTES = 1024
+ENCODINGS = ('br', 'gzip')
+
+# KEYS[1]: entry. ARGV[1]: the If-None-Match header or ''. ARGV[2..]: fields to
+# try in order, ending with 'body'. Returns nil on a miss, {etag, field} when
+# the client's copy is current, else {etag, field, value}. The stored ETag is
+# matched without its closing quote, so any encoding's suffixed ETag matches.
+# Anything that is not a hash (e.g. an entry written before this format) is a miss.
+READ_LUA = """
+if redis.call('TYPE', KEYS[1]).ok ~= 'hash' then
+    return nil
+end
+local etag = redis.call('HGET', KEYS[1], 'etag')
+if not etag then
+    return nil
+end
+local current = ARGV[1] == '*' or (ARGV[1] ~= '' and string.find(ARGV[1], string.sub(etag, 1, -2), 1, true))
+for i = 2, #ARGV do
+    if current then
+        if redis.call('HEXISTS', KEYS[1], ARGV[i]) == 1 then
+            return {etag, ARGV[i]}
+        end
+    else
+        local value = redis.call('HGET', KEYS[1], ARGV[i])
+        if value then
+            return {etag, ARGV[i], value}
+        end
+    end
+end
+return nil
+"""
+
+def encode_entry(data):
+    """The hash fields for a JSON-serialisable payload."""
+    return encode_body(json.dumps(data).encode('utf-8'))
+
+def encode_body(body, encodings=ENCODINGS):
+    """The hash fields for JSON bytes, compressed into each of `encodings` when large enough."""
+    entry = {'body': body, 'etag': f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        with span('compress'):
+            if 'gzip' in encodings:
+                entry['gzip'] = gzip.compress(body, compresslevel=6)
+            if 'br' in encodings:
+                entry['br'] = brotli.compress(body, quality=5)
+    return entry
+
+def _store(pipe, cache_key, ttl, entry, stale):
+    ttls = {cache_key: ttl, stale_key(cache_key): STALE_TTL} if stale else {cache_key: ttl}
+    for key, key_ttl in ttls.items():
+        # Replaces the whole entry, including any plain string left by an older format
+        pipe.delete(key)
+        pipe.hset(key, mapping=entry)
+        pipe.expire(key, key_ttl)
+    tag_keys(pipe, cache_key, ttls)
+
+def store_entry(cache_raw, cache_key, ttl, entry, stale=True):
+    """Writes the entry, plus a long-lived stale copy for outages unless `stale` is False."""
+    pipe = cache_raw.pipeline(transaction=False)
+    _store(pipe, cache_key, ttl, entry, stale)
+    with span('cache'):
+        pipe.execute()
+
+async def astore_entry(cache_raw, cache_key, ttl, entry, stale=True):
+    pipe = cache_raw.pipeline(transaction=False)
+    _store(pipe, cache_key, ttl, entry, stale)
+    with span('cache'):
+        await pipe.execute()
+
+def _pipe_bodies(pipe, keys):
+    for key in keys:
+        pipe.hget(key, 'body')
+
+def read_bodies(cache_raw, keys):
+    """Stored JSON bytes for each key, None where missing, in one round trip."""
+    pipe = cache_raw.pipeline(transaction=False)
+    _pipe_bodies(pipe, keys)
+    with span('cache'):
+        results = pipe.execute(raise_on_error=False)
+    # An error is a key in an older format: treat it as missing
+    return [body if isinstance(body, bytes) else None for body in results]
+
+async def aread_bodies(cache_raw, keys):
+    pipe = cache_raw.pipeline(transaction=False)
+    _pipe_bodies(pipe, keys)
+    with span('cache'):
+        results = await pipe.execute(raise_on_error=False)
+    return [body if isinstance(body, bytes) else None for body in results]
+
+def join_json(fields):
+    """A JSON object from a dict of name -> already-encoded JSON bytes, without parsing them."""
+    return b'{' + b','.join(json.dumps(name).encode() + b':' + value for name, value in fields.items()) + b'}'
+
+def accepted_encodings(accept_encodings):
+    """Fields to try for a request's werkzeug Accept-Encoding, best first."""
+    ranked = sorted((e for e in ENCODINGS if accept_encodings[e] > 0), key=lambda e: -accept_encodings[e])
+    return ranked + ['body']
+
+def _unpack(result):
+    if not result:
+        return None
+    etag, field = result[0].decode(), result[1].decode()
+    return etag, field, result[2] if len(result) == 3 else None
+
+def read_entry(script, key, if_none_match, fields):
+    """(etag, field, value) for a hit, (etag, field, None) when If-None-Match matches, None on a miss."""
+    with span('cache'):
+        return _unpack(script(keys=[key], args=[if_none_match or '', *fields]))
+
+async def aread_entry(script, key, if_none_match, fields):
+    with span('cache'):
+        return _unpack(await script(keys=[key], args=[if_none_match or '', *fields]))
+
+def etag_matches(if_none_match, etag):
+    """READ_LUA's If-None-Match test, for an entry that was just encoded."""
+    return bool(if_none_match) and (if_none_match == '*' or etag[:-1] in if_none_match)
+
+def encoding_etag(etag, field):
+    """The stored ETag for `body`, with the encoding appended for compressed forms."""
+    return etag if field == 'body' else f'{etag[:-1]}-{field}"'
+
+def pick(entry, fields):
+    """The (field, value) to send from a freshly encoded entry."""
+    for field in fields:
+        if field in entry:
+            return field, entry[field]
+
+def make_response(response_class, etag, field, value, status=200, headers=None):
+    """Flask or Quart response for a read_entry result; value None means 304."""
+    headers = {
+        'ETag': encoding_etag(etag, field),
+        'Vary': 'Accept-Encoding',
+        # Per-user data behind a bearer token: browsers may keep it, but must revalidate
+        'Cache-Control': 'private, no-cache',
+        **(headers or {})
+    }
+    if value is None:
+        return response_class(b'', status=304, headers=headers)
+    if field != 'body':
+        headers['Content-Encoding'] = field
+    return response_class(value, status=status, headers=headers, content_type='application/json')
+
+# --- Flask views (the Quart twins are in async_http_cache) ---
+
+def serve_cached(cache_key, stale=False):
+    """The cached response (or a 304) for the current request, None on a miss."""
+    key = stale_key(cache_key) if stale else cache_key
+    entry = read_entry(
+        current_app.cached_json_script, key, request.headers.get('If-None-Match'),
+        accepted_encodings(request.accept_encodings)
+    )
+    if entry is None:
+        if not stale:
+            record_cache(cache_key, 'miss')
+        return None
+    record_cache(cache_key, 'stale' if stale else 'hit')
+    return make_response(Response, *entry, headers={'X-Cache-Stale': 'true'} if stale else None)
+
+def serve_entry(entry, status=200):
+    """Response for a freshly encoded entry, negotiated the same way as a hit."""
+    field, value = pick(entry, accepted_encodings(request.accept_encodings))
+    if status == 200 and etag_matches(request.headers.get('If-None-Match'), entry['etag']):
+        return make_response(Response, entry['etag'], field, None)
+    return make_response(Response, entry['etag'], field, value, status)
@@ -0,0 +1,193 @@
+"""
+Prometheus instrumentation shared by the Flask app and the async (Quart) twin.
+
+Under SERVER_MODE=prefork every worker writes its samples to files in
+PROMETHEUS_MULTIPROC_DIR and /metrics aggregates them, so a scrape sees the
+whole server no matter which worker answers it. The directory has to be set
+before prometheus_client is imported, hence the setup at the top of this file.
+"""
+import os
+import re
+import shutil
+import tempfile
+import time
+
+if os.getenv("SERVER_MODE", "").lower() == "prefork" and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="automo-metrics-")
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))  # 256 B .. 64 MB
+
+REQUEST_LATENCY = Histogram(
+    'automo_http_request_duration_seconds', 'Request latency by route',
+    ['route', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    'automo_http_requests_in_flight', 'Requests currently being handled',
+    ['route'], multiprocess_mode='livesum'
+)
+REQUEST_SIZE = Histogram(
+    'automo_http_request_size_bytes', 'Request body size by route', ['route'], buckets=SIZE_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    'automo_http_response_size_bytes', 'Response body size by route, when the length is known up front',
+    ['route'], buckets=SIZE_BUCKETS
+)
+CACHE_EVENTS = Counter(
+    'automo_cache_lookups_total', 'KeyDB lookups by key prefix and result (hit, miss, stale)',
+    ['prefix', 'result']
+)
+UPSTREAM_LATENCY = Histogram(
+    'automo_upstream_duration_seconds', 'Time spent inside an upstream call', ['upstream'], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_CALLS = Counter(
+    'automo_upstream_calls_total', 'Upstream calls by outcome (ok, http_5xx, error, cancelled, circuit_open, bulkhead_full)',
+    ['upstream', 'outcome']
+)
+QUOTA_DECISIONS = Counter(
+    'automo_quota_decisions_total', 'Quota checks by route and outcome (ok, user, queued, error)',
+    ['route', 'outcome']
+)
+
+_HASH_PART = re.compile(r'^[0-9a-f]{16,}$')
+_HASH_SUFFIX = re.compile(r'(_[0-9a-f]{16,})+$')
+
+def cache_prefix(cache_key):
+    """
+    Bounded label for a cache key: the prefix and request path without the
+    namespace version, arguments or content hashes.
+        sarima@<ver>:forecast:/ts-model/forecast:12       -> forecast:/ts-model/forecast
+        inference@<ver>:pred:<phash>:/obj-det/predictImage -> pred:/obj-det/predictImage
+        reorder@<ver>:reorder_v1_<md5>                   -> reorder_v1
+    """
+    parts = []
+    for part in cache_key.split(':'):
+        if '@' in part or _HASH_PART.match(part):
+            continue
+        parts.append(_HASH_SUFFIX.sub('', part))
+        if part.startswith('/'):
+            break
+    return ':'.join(parts)
+
+def record_cache(cache_key, result):
+    CACHE_EVENTS.labels(cache_prefix(cache_key), result).inc()
+
+def route_label(url_rule):
+    return url_rule.rule if url_rule is not None else 'unmatched'
+
+def request_started(route):
+    IN_FLIGHT.labels(route).inc()
+    return time.perf_counter()
+
+def request_finished(route, method, status, started, request_bytes=None, response_bytes=None):
+    IN_FLIGHT.labels(route).dec()
+    REQUEST_LATENCY.labels(route, method, str(status)).observe(time.perf_counter() - started)
+    if request_bytes:
+        REQUEST_SIZE.labels(route).observe(request_bytes)
+    if response_bytes is not None:
+        RESPONSE_SIZE.labels(route).observe(response_bytes)
+
+class StateCollector:
+    """
+    Point-in-time state read at scrape time: breakers, bulkheads and the hash
+    pool. In prefork mode these are the values of the worker that answered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def collect(self):
+        breaker = GaugeMetricFamily('automo_upstream_breaker_open', 'Circuit breaker state (0 closed, 0.5 half open, 1 open)', labels=['upstream'])
+        in_flight = GaugeMetricFamily('automo_upstream_in_flight', 'Calls currently inside the bulkhead', labels=['upstream'])
+        capacity = GaugeMetricFamily('automo_upstream_bulkhead_capacity', 'Bulkhead size', labels=['upstream'])
+        for name, upstream in self.app.upstreams.items():
+            snap = upstream.snapshot()
+            breaker.add_metric([name], {'closed': 0, 'half_open': 0.5, 'open': 1}[snap['state']])
+            in_flight.add_metric([name], snap['in_flight'])
+            capacity.add_metric([name], snap['max_concurrent'])
+        yield from (breaker, in_flight, capacity)
+
+        stats = self.app.hash_pool.stats()
+        yield GaugeMetricFamily('automo_hash_pool_in_flight', 'Hash jobs admitted', value=stats['in_flight'])
+        yield GaugeMetricFamily('automo_hash_pool_queued', 'Hash jobs waiting for a worker', value=stats['queued'])
+        yield CounterMetricFamily('automo_hash_pool_completed', 'Hash jobs finished', value=stats['completed'])
+        yield CounterMetricFamily('automo_hash_pool_rejected', 'Hash jobs turned away by admission control', value=stats['rejected'])
+        wait = GaugeMetricFamily('automo_hash_pool_queue_wait_seconds', 'Recent queue wait percentiles', labels=['quantile'])
+        for q, ms in stats['queue_wait_ms'].items():
+            wait.add_metric([q], ms / 1000)
+        yield wait
+
+        quota = getattr(self.app, 'quota', None)
+        if quota is not None:
+            yield from quota_families(quota, self.app.config['QUOTA_METRICS_USERS'])
+
+def quota_families(quota, top):
+    """Cost admitted per user (the `top` biggest per pool) and users queued, read from KeyDB so every worker agrees."""
+    used = CounterMetricFamily('automo_quota_user_cost', 'Cost units admitted per user', labels=['pool', 'user'])
+    queued = GaugeMetricFamily('automo_quota_queued_users', 'Users waiting for a turn at a short pool', labels=['pool'])
+    for pool in quota.pools:
+        try:
+            users, waiting = quota.usage(pool, top)
+        except Exception:
+            continue
+        for user, cost in users:
+            used.add_metric([pool, user], cost)
+        queued.add_metric([pool], waiting)
+    yield from (used, queued)
+
+def clear_multiprocess_dir():
+    """Drops sample files left by a previous run. Called in the master before forking."""
+    if MULTIPROC_DIR and os.path.isdir(MULTIPROC_DIR):
+        for entry in os.listdir(MULTIPROC_DIR):
+            path = os.path.join(MULTIPROC_DIR, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+def mark_worker_dead(pid):
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+def init_app(app):
+    """Per-route hooks for a Flask app, plus the registry /metrics renders."""
+    from flask import g, request
+
+    @app.before_request
+    def start_timer():
+        g.metrics_route = route_label(request.url_rule)
+        g.metrics_started = request_started(g.metrics_route)
+
+    @app.after_request
+    def record_response(response):
+        g.metrics_status = response.status_code
+        g.metrics_response_bytes = response.content_length
+        return response
+
+    @app.teardown_request
+    def stop_timer(exc):
+        # Runs after the last chunk for stream_with_context responses
+        if 'metrics_started' in g:
+            request_finished(
+                g.metrics_route, request.method, g.get('metrics_status', 500), g.metrics_started,
+                request.content_length, g.get('metrics_response_bytes')
+            )
+
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    registry.register(StateCollector(app))
+    app.metrics_registry = registry
+
+def render(app):
+    """Prometheus text exposition: (body, content type)."""
+    return generate_latest(app.metrics_registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,152 @@
+"""
+On-demand profiling for a running server.
+
+sample_stacks() is a statistical profiler: the calling thread reads every
+thread's current frame with sys._current_frames() at a fixed interval and
+counts identical stacks. It needs no tracing hooks, so the cost to the
+threads being observed is close to zero. Results are collapsed stacks
+("thread;outer;inner count" per line), the input format of flamegraph.pl,
+speedscope and most flamegraph viewers.
+
+The per-request profiler is deterministic (cProfile) and only runs for a
+request that carries an X-Profile header holding an internal_proxy token.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_HEADER = 'X-Profile'
+
+# Leaf frames in these files are threads waiting, not burning CPU
+IDLE_FILES = {'threading.py', 'selectors.py', 'queue.py', 'socket.py', 'ssl.py', 'connection.py', 'wasyncore.py'}
+
+class ProfilerBusy(Exception):
+    """Raised when a sampling session or per-request profile is already running."""
+
+_sampling = threading.Lock()
+_request_profiling = threading.Lock()
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def sample_stacks(seconds, interval=0.01, include_idle=False):
+    """Samples all threads but the caller for `seconds`. Returns (Counter of collapsed stacks, samples taken)."""
+    if not _sampling.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        me = threading.get_ident()
+        names = {}
+        counts = Counter()
+        ticks = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not include_idle and os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                counts[";".join(reversed(stack))] += 1
+            ticks += 1
+            time.sleep(interval)
+        return counts, ticks
+    finally:
+        _sampling.release()
+
+def collapsed(counts):
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+def speedscope(counts, name):
+    """Speedscope's sampled-profile JSON; drop the file on speedscope.app for a flamegraph."""
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, n in counts.items():
+        ids = []
+        for frame in stack.split(";"):
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame})
+            ids.append(index[frame])
+        samples.append(ids)
+        weights.append(n)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled', 'name': name, 'unit': 'none',
+            'startValue': 0, 'endValue': sum(weights),
+            'samples': samples, 'weights': weights
+        }]
+    }
+
+def start_request_profile():
+    """
+    cProfile for the current thread. One at a time: on Python 3.12+ cProfile
+    is backed by sys.monitoring, which allows a single active profiler.
+    """
+    if not _request_profiling.acquire(blocking=False):
+        raise ProfilerBusy()
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except Exception:
+        _request_profiling.release()
+        raise
+    return profile
+
+def stop_request_profile(profile, limit=60):
+    """Stops the profile and returns its top functions by cumulative time, as text."""
+    try:
+        profile.disable()
+    finally:
+        _request_profiling.release()
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+def init_app(app):
+    """X-Profile handling for a Flask app; reports are kept in KeyDB under the request ID."""
+    import uuid
+    from flask import g, request
+    from server.utils.auth import decode_token
+    from server.utils.tracing import current_request_id
+
+    @app.before_request
+    def start_profile():
+        token = request.headers.get(PROFILE_HEADER)
+        if not token:
+            return
+        try:
+            if decode_token(token).get('sub') == 'internal_proxy':
+                g.request_profile = start_request_profile()
+        except Exception:
+            # Bad token or another profile running: serve the request unprofiled
+            pass
+
+    @app.after_request
+    def save_profile(response):
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile_id = current_request_id() or uuid.uuid4().hex
+            report = stop_request_profile(profile)
+            app.cache.setex(f"profile:{profile_id}", app.config['PROFILE_TTL'], report)
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc):
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            stop_request_profile(profile)
@@ -0,0 +1,44 @@
+"""
+Per-user quotas for the routes that cost real upstream work (see FairQuota
+in rate_limit.py). Views check just before calling out, after the cache has
+missed, so cached answers cost nothing. Each route has a cost in
+QUOTA_COSTS and draws on the pool of the upstream it calls.
+"""
+from server.utils.metrics import QUOTA_DECISIONS
+
+# Route -> the upstream pool it draws on
+ROUTE_POOLS = {
+    'predict': 'inference',
+    'inpaint': 'inference',
+    'pipeline': 'inference',
+    'report': 'gemini',
+    'reorder': 'openai'
+}
+
+def _limited(route, decision):
+    allowed, retry_after, reason = decision
+    QUOTA_DECISIONS.labels(route, reason).inc()
+    if allowed:
+        return None
+    retry_after = max(1, retry_after)
+    message = 'Quota exceeded' if reason == 'user' else 'Service busy, queued behind other users'
+    # A (body, status, headers) tuple works as a Flask and a Quart response
+    return {'error': f"{message}, please retry in {retry_after}s", 'reason': reason, 'retry_after': retry_after}, \
+        429, {'Retry-After': str(retry_after)}
+
+def _charge(app, sub, route, units):
+    if app.quota is None or sub in (None, 'internal_proxy'):
+        return None
+    return sub, ROUTE_POOLS[route], app.config['QUOTA_COSTS'][route] * units
+
+def quota_exceeded(route, units=1):
+    """A 429 response if the current user can't spend `units` x the route's cost now, else None."""
+    from flask import current_app, g
+    charge = _charge(current_app, g.get('token_sub'), route, units)
+    return charge and _limited(route, current_app.quota.admit(*charge))
+
+async def aquota_exceeded(route, units=1):
+    """quota_exceeded for the Quart twins."""
+    from quart import current_app, g
+    charge = _charge(current_app, g.get('token_sub'), route, units)
+    return charge and _limited(route, await current_app.quota.aadmit(*charge))
@@ -0,0 +1,198 @@
+import copy
+import math
+import time
+
+# Token bucket refill + take in one round trip, so concurrent workers never
+# double-spend. Returns {allowed, retry_after_seconds}.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+class TokenBucket:
+    """KeyDB-backed token bucket shared by every worker. Fails open if KeyDB is unreachable."""
+
+    def __init__(self, redis_client, prefix, capacity, per_minute):
+        self.prefix = prefix
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self._script = redis_client.register_script(TOKEN_BUCKET_LUA)
+
+    def consume(self, identity, cost=1):
+        """Returns (allowed, retry_after_seconds)."""
+        try:
+            allowed, retry_after = self._script(
+                keys=[f"{self.prefix}:{identity}"],
+                args=[self.rate, self.capacity, time.time(), cost]
+            )
+        except Exception:
+            return True, 0
+        return bool(int(allowed)), math.ceil(float(retry_after))
+
+# Per-user bucket plus a shared per-upstream pool, in one round trip. While
+# the pool is short, users wait in a queue holding one place per user, so
+# turns go round the users however many requests each one sends. A user
+# who stops retrying loses their place at their deadline (retry time plus a
+# grace period). Cost admitted per user is tallied in a ZSET trimmed to the
+# biggest `usage_keep` users. Returns {allowed, retry_after_seconds, reason}.
+FAIR_QUOTA_LUA = """
+local user_rate = tonumber(ARGV[1])
+local user_capacity = tonumber(ARGV[2])
+local pool_rate = tonumber(ARGV[3])
+local pool_capacity = tonumber(ARGV[4])
+local now = tonumber(ARGV[5])
+local cost = tonumber(ARGV[6])
+local user = ARGV[7]
+local grace = tonumber(ARGV[8])
+local usage_keep = tonumber(ARGV[9])
+local usage_ttl = tonumber(ARGV[10])
+
+local function refill(key, rate, capacity)
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * rate)
+end
+
+local function save(key, tokens, rate, capacity)
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+
+local user_tokens = refill(KEYS[1], user_rate, user_capacity)
+if user_tokens < cost then
+    -- Out of their own quota, so not waiting for the pool either
+    redis.call('ZREM', KEYS[3], user)
+    redis.call('ZREM', KEYS[4], user)
+    save(KEYS[1], user_tokens, user_rate, user_capacity)
+    return {0, tostring((cost - user_tokens) / user_rate), 'user'}
+end
+
+for _, gone in ipairs(redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', now)) do
+    redis.call('ZREM', KEYS[3], gone)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[4], '-inf', now)
+
+local pool_tokens = refill(KEYS[2], pool_rate, pool_capacity)
+local head = redis.call('ZRANGE', KEYS[3], 0, 0)[1]
+if pool_tokens >= cost and (head == nil or head == user) then
+    save(KEYS[1], user_tokens - cost, user_rate, user_capacity)
+    save(KEYS[2], pool_tokens - cost, pool_rate, pool_capacity)
+    redis.call('ZREM', KEYS[3], user)
+    redis.call('ZREM', KEYS[4], user)
+    redis.call('ZINCRBY', KEYS[5], cost, user)
+    redis.call('ZREMRANGEBYRANK', KEYS[5], 0, -usage_keep - 1)
+    redis.call('EXPIRE', KEYS[5], usage_ttl)
+    return {1, '0', 'ok'}
+end
+
+redis.call('ZADD', KEYS[3], 'NX', now, user)
+local ahead = redis.call('ZRANK', KEYS[3], user)
+local wait = (math.max(0, cost - pool_tokens) + ahead * cost) / pool_rate
+redis.call('ZADD', KEYS[4], now + wait + grace, user)
+redis.call('EXPIRE', KEYS[3], math.ceil(wait + grace) + 1)
+redis.call('EXPIRE', KEYS[4], math.ceil(wait + grace) + 1)
+save(KEYS[2], pool_tokens, pool_rate, pool_capacity)
+return {0, tostring(wait), 'queued'}
+"""
+
+class FairQuota(TokenBucket):
+    """
+    Cost-weighted per-user quota in front of shared per-upstream pools. The
+    user's own TokenBucket caps what they can spend; while a pool runs short,
+    users queue for it fairly. Fails open if KeyDB is unreachable.
+
+    Per-pool usage keeps the `usage_keep` biggest users, so a user who
+    drops out starts again from zero, and lapses after `usage_ttl` seconds
+    without an admission.
+    """
+
+    def __init__(self, redis_client, prefix, capacity, per_minute, pools, grace=5, usage_keep=1000, usage_ttl=7 * 86400):
+        super().__init__(redis_client, prefix, capacity, per_minute)
+        # pool name -> (capacity, per minute)
+        self.pools = pools
+        self.grace = grace
+        self.usage_keep = usage_keep
+        self.usage_ttl = usage_ttl
+        self._client = redis_client
+        self._fair_script = redis_client.register_script(FAIR_QUOTA_LUA)
+
+    def bind(self, redis_client):
+        """The same quota on another client, e.g. the async one the Quart app opens."""
+        bound = copy.copy(self)
+        bound._client = redis_client
+        bound._script = redis_client.register_script(TOKEN_BUCKET_LUA)
+        bound._fair_script = redis_client.register_script(FAIR_QUOTA_LUA)
+        return bound
+
+    def user_key(self, identity):
+        # Own segment, so no username can name a pool, queue or usage key
+        return f"{self.prefix}:user:{identity}"
+
+    def usage_key(self, pool):
+        return f"{self.prefix}:usage:{pool}"
+
+    def queue_key(self, pool):
+        return f"{self.prefix}:queue:{pool}"
+
+    def _call(self, identity, pool, cost):
+        capacity, per_minute = self.pools[pool]
+        # More than a full bucket is charged a full bucket, so it is slow rather than never allowed
+        cost = min(cost, self.capacity, capacity)
+        return cost, dict(
+            keys=[self.user_key(identity), f"{self.prefix}:pool:{pool}", self.queue_key(pool),
+                  f"{self.prefix}:deadline:{pool}", self.usage_key(pool)],
+            args=[self.rate, self.capacity, per_minute / 60.0, capacity, time.time(), cost, identity, self.grace,
+                  self.usage_keep, self.usage_ttl]
+        )
+
+    @staticmethod
+    def _decision(result):
+        allowed, retry_after, reason = result
+        reason = reason.decode() if isinstance(reason, bytes) else reason
+        return bool(int(allowed)), math.ceil(float(retry_after)), reason
+
+    def admit(self, identity, pool, cost):
+        """Returns (allowed, retry_after_seconds, reason): 'ok', 'user' (own quota) or 'queued' (pool short)."""
+        cost, call = self._call(identity, pool, cost)
+        try:
+            return self._decision(self._fair_script(**call))
+        except Exception:
+            return True, 0, 'error'
+
+    async def aadmit(self, identity, pool, cost):
+        """admit() for a redis.asyncio client (see bind)."""
+        cost, call = self._call(identity, pool, cost)
+        try:
+            return self._decision(await self._fair_script(**call))
+        except Exception:
+            return True, 0, 'error'
+
+    def usage(self, pool, top):
+        """The `top` users by cost admitted from `pool`, as (user, cost) pairs, plus how many are queued."""
+        with self._client.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(self.usage_key(pool), 0, top - 1, withscores=True)
+            pipe.zcard(self.queue_key(pool))
+            users, queued = pipe.execute()
+        return [(user.decode() if isinstance(user, bytes) else user, cost) for user, cost in users], queued
@@ -0,0 +1,121 @@
+import hashlib
+import pickle
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+MODEL_PATH = Path(__file__).resolve().parent.parent / "models" / "auto_reorder_model.pkl"
+FEATURES = ['stock', 'avg_daily_demand', 'lead_time']
+
+_lock = threading.Lock()
+_model = None
+_predictor = None
+_digest = None
+_loaded = False
+
+class CompiledTreePredictor:
+    """
+    Flattens a fitted sklearn decision tree into NumPy arrays and walks every
+    row down the tree one level at a time, so a batch costs max_depth vector
+    passes instead of a DataFrame round trip through sklearn validation.
+    """
+
+    def __init__(self, estimator):
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        nodes = np.arange(tree.node_count, dtype=np.intp)
+
+        # Leaves point back to themselves with an +inf threshold, so rows that
+        # reach a leaf early stay there for the remaining passes.
+        self.feature = np.where(is_leaf, 0, tree.feature).astype(np.intp)
+        self.threshold = np.where(is_leaf, np.inf, tree.threshold)
+        self.left = np.where(is_leaf, nodes, tree.children_left).astype(np.intp)
+        self.right = np.where(is_leaf, nodes, tree.children_right).astype(np.intp)
+        self.depth = tree.max_depth
+
+        values = tree.value[:, 0, :]
+        if hasattr(estimator, 'classes_'):
+            self.leaf_output = np.asarray(estimator.classes_)[values.argmax(axis=1)]
+        else:
+            self.leaf_output = values[:, 0]
+
+    def predict(self, X):
+        """X: C-contiguous float32 matrix with columns ordered as FEATURES."""
+        rows = np.arange(X.shape[0])
+        node = np.zeros(X.shape[0], dtype=np.intp)
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.leaf_output[node]
+
+class EstimatorPredictor:
+    """Fallback for estimators that cannot be compiled, e.g. ensembles."""
+
+    def __init__(self, estimator):
+        self.estimator = estimator
+
+    def predict(self, X):
+        return self.estimator.predict(pd.DataFrame(X, columns=FEATURES))
+
+def load_model():
+    """Unpickles the reorder model on first use. Returns None if the file is missing."""
+    global _model, _predictor, _digest, _loaded
+    if _loaded:
+        return _model
+
+    with _lock:
+        if not _loaded:
+            try:
+                with open(MODEL_PATH, "rb") as f:
+                    data = f.read()
+                _model = pickle.loads(data)
+                _digest = _file_digest(data)
+            except FileNotFoundError:
+                _model = _digest = None
+
+            if _model is None:
+                _predictor = None
+            elif hasattr(_model, 'tree_'):
+                _predictor = CompiledTreePredictor(_model)
+            else:
+                _predictor = EstimatorPredictor(_model)
+            _loaded = True
+    return _model
+
+def _file_digest(data):
+    return hashlib.md5(data).hexdigest()[:12]
+
+def model_digest():
+    """
+    Short hash of the pickle this process loaded, so cached predictions are
+    tied to the model that made them. A new pickle on disk is served (and
+    changes the digest) only after a restart. Before the first prediction
+    it hashes the file that would be loaded, without unpickling it.
+    """
+    if _loaded:
+        return _digest
+    try:
+        with open(MODEL_PATH, "rb") as f:
+            return _file_digest(f.read())
+    except FileNotFoundError:
+        return None
+
+def get_predictor():
+    load_model()
+    return _predictor
+
+def build_features(stock, avg_daily_demand, lead_time):
+    """Packs the model inputs into one contiguous float32 matrix."""
+    X = np.empty((len(stock), len(FEATURES)), dtype=np.float32)
+    X[:, 0] = stock
+    X[:, 1] = avg_daily_demand
+    X[:, 2] = lead_time
+    return X
+
+def warm_up():
+    """Loads and compiles the model, then runs one prediction to touch every code path."""
+    predictor = get_predictor()
+    if predictor is not None:
+        predictor.predict(build_features([0.0], [0.0], [0.0]))
+    return predictor is not None
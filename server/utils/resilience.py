@@ -0,0 +1,167 @@
+import threading
+import time
+from contextlib import contextmanager
+from server.utils.metrics import UPSTREAM_CALLS, UPSTREAM_LATENCY
+from server.utils.tracing import current_timings
+
+class UpstreamUnavailable(Exception):
+    """Raised before calling an upstream whose breaker is open or whose bulkhead is full."""
+
+    def __init__(self, upstream, reason):
+        self.upstream = upstream
+        self.reason = reason
+        super().__init__(f"{upstream} unavailable ({reason})")
+
+class Bulkhead:
+    """Concurrency budget for one upstream. Never blocks: a full bulkhead rejects immediately."""
+
+    def __init__(self, max_concurrent):
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.max_concurrent:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures. While open,
+    calls fail fast until `reset_timeout` has passed, then a single probe is
+    let through (half_open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+class _Call:
+    failed = False
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+
+    def check(self, response):
+        """
+        Counts 5xx responses as failures even when the route passes them through,
+        and folds the upstream's own Server-Timing spans into this request's.
+        """
+        if response.status_code >= 500:
+            self.failed = True
+        timings = current_timings.get()
+        if timings is not None and response.headers.get('Server-Timing'):
+            timings.merge(self.upstream, response.headers['Server-Timing'])
+        return response
+
+class Upstream:
+    def __init__(self, name, max_concurrent, failure_threshold, reset_timeout):
+        self.name = name
+        self.bulkhead = Bulkhead(max_concurrent)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    @contextmanager
+    def guard(self):
+        """
+        Wraps one upstream call. Works the same around blocking and awaited calls:
+            with current_app.upstreams['sarima'].guard() as call:
+                call.check(requests.get(...))
+        """
+        if not self.breaker.allow():
+            UPSTREAM_CALLS.labels(self.name, 'circuit_open').inc()
+            raise UpstreamUnavailable(self.name, 'circuit_open')
+        if not self.bulkhead.try_acquire():
+            # Rejected before calling out, so hand back the probe slot if we held it
+            self.breaker.release_probe()
+            UPSTREAM_CALLS.labels(self.name, 'bulkhead_full').inc()
+            raise UpstreamUnavailable(self.name, 'bulkhead_full')
+
+        call = _Call(self.name)
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield call
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # The client went away (GeneratorExit from a dropped stream, CancelledError
+            # from Quart). Says nothing about the upstream, but must hand back the probe
+            outcome = 'cancelled'
+            self.breaker.release_probe()
+            raise
+        else:
+            if call.failed:
+                outcome = 'http_5xx'
+                self.breaker.record_failure()
+            else:
+                outcome = 'ok'
+                self.breaker.record_success()
+        finally:
+            self.bulkhead.release()
+            elapsed = time.perf_counter() - started
+            UPSTREAM_LATENCY.labels(self.name).observe(elapsed)
+            timings = current_timings.get()
+            if timings is not None:
+                timings.add(f"upstream-{self.name}", elapsed * 1000)
+            UPSTREAM_CALLS.labels(self.name, outcome).inc()
+
+    def snapshot(self):
+        return {
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'in_flight': self.bulkhead.in_flight,
+            'max_concurrent': self.bulkhead.max_concurrent,
+            'rejected': self.bulkhead.rejected
+        }
+
+def build_upstreams(config):
+    """One bulkhead + breaker per external dependency, sized from app config."""
+    threshold = config['BREAKER_FAILURE_THRESHOLD']
+    reset = config['BREAKER_RESET_SECONDS']
+    return {
+        name: Upstream(name, config[f'BULKHEAD_{name.upper()}'], threshold, reset)
+        for name in ('sarima', 'inference', 'gemini', 'openai')
+    }
@@ -0,0 +1,159 @@
+"""
+In-process SARIMA forecasts, as an alternative to the ts-model API.
+
+The fitted model is loaded from a JSON export of its state-space form (see
+export_results below): the system matrices, the predicted state and its
+covariance after the last observation, the training series and, optionally,
+the metrics the API reports. Forecasting from there needs no refitting and no
+statsmodels at runtime:
+
+    mean[h] = g[h] a + d + sum(g[j] c, j < h)
+    var[h]  = g[h] P g[h]' + sum(g[j] RQR' g[j]', j < h) + H,  g[h] = Z T^h
+
+Only the row vectors g[h] need a step-by-step recursion (k^2 per step
+instead of the k^3 covariance update); means and variances for every horizon
+then come out of a few matrix products. This is what statsmodels'
+get_forecast computes, so results match it to rounding.
+
+The path is computed and turned into response rows once, up to
+MAX_FORECAST_STEPS, when the file is loaded: a forecast for any horizon is a
+slice of it. Payloads have the same shape as the API's /forecast, /history
+and /metrics.
+
+Export a fitted statsmodels SARIMAXResults (pickled with results.save()) with
+`python -m server.utils.sarima_engine results.pkl sarima_params.json [metrics.json]`.
+"""
+import hashlib
+import json
+import sys
+from statistics import NormalDist
+import numpy as np
+
+FORMAT_VERSION = 1
+MAX_FORECAST_STEPS = 360
+# The API reports 95% intervals
+CI_Z = NormalDist().inv_cdf(0.975)
+
+SYSTEM_MATRICES = ('design', 'obs_intercept', 'obs_cov', 'transition', 'state_intercept', 'selection', 'state_cov')
+
+class SarimaEngine:
+    """Forecasts, history and metrics from an exported SARIMA model; see module docstring."""
+
+    def __init__(self, params, model_version=None):
+        if params.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported SARIMA export format: {params.get('format')}")
+        self.model_version = model_version
+        self.model_info = {'order': params['order'], 'seasonal_order': params['seasonal_order']}
+        self.start = params['start']
+        self.endog = np.asarray(params['endog'], dtype=float)
+        self._metrics = params.get('metrics')
+
+        m = {name: np.asarray(params[name], dtype=float) for name in SYSTEM_MATRICES}
+        state = np.asarray(params['predicted_state'], dtype=float)
+        state_cov = np.asarray(params['predicted_state_cov'], dtype=float)
+        mean, var = forecast_path(
+            m['design'][0], m['obs_intercept'][0], m['obs_cov'][0, 0], m['transition'],
+            m['state_intercept'], m['selection'] @ m['state_cov'] @ m['selection'].T,
+            state, state_cov, MAX_FORECAST_STEPS
+        )
+        half_width = CI_Z * np.sqrt(var)
+        offset = len(self.endog)
+        self._forecast_rows = [
+            {'month': self.month(offset + i), 'forecast': point, 'lower_ci': lower, 'upper_ci': upper}
+            for i, (point, lower, upper) in enumerate(
+                np.column_stack([mean, mean - half_width, mean + half_width]).tolist()
+            )
+        ]
+        self._history = {
+            'history': [{'month': self.month(i), 'actual': float(v)} for i, v in enumerate(self.endog)],
+            'count': len(self.endog)
+        }
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        return cls(json.loads(raw), model_version=hashlib.md5(raw).hexdigest()[:12])
+
+    def month(self, i):
+        """'YYYY-MM' label of the i-th month from the start of the series."""
+        year, month = (int(part) for part in self.start.split('-')[:2])
+        year, month = divmod(year * 12 + month - 1 + i, 12)
+        return f"{year}-{month + 1:02d}"
+
+    def serves(self, route):
+        return route in ('forecast', 'history') or (route == 'metrics' and self._metrics is not None)
+
+    def forecast(self, steps):
+        """(payload, status) for /forecast?steps=..."""
+        if not 1 <= steps <= MAX_FORECAST_STEPS:
+            return {"error": f"steps must be between 1 and {MAX_FORECAST_STEPS}"}, 400
+        return {'forecast': self._forecast_rows[:steps], 'model_info': self.model_info}, 200
+
+    def get(self, route, **params):
+        """(payload, status) for a ts-model API route."""
+        if route == 'forecast':
+            return self.forecast(int(params.get('steps', 12)))
+        if route == 'history':
+            return self._history, 200
+        return {'metrics': self._metrics}, 200
+
+def forecast_path(design, obs_intercept, obs_cov, transition, state_intercept, rqr, state, state_cov, steps):
+    """Forecast means and variances for horizons 1..steps from the predicted state after the last observation."""
+    g = np.empty((steps, len(state)))
+    g[0] = design
+    for h in range(1, steps):
+        g[h] = g[h - 1] @ transition
+    # Contributions of the state intercept and the state noise build up over the horizon
+    drift = np.concatenate([[0.0], np.cumsum(g @ state_intercept)[:-1]])
+    noise = np.concatenate([[0.0], np.cumsum(np.einsum('ij,jk,ik->i', g, rqr, g))[:-1]])
+    mean = g @ state + obs_intercept + drift
+    var = np.einsum('ij,jk,ik->i', g, state_cov, g) + noise + obs_cov
+    return mean, var
+
+def load_engine(path):
+    """The engine for an export at `path`, or None when no path is configured."""
+    return SarimaEngine.from_file(path) if path else None
+
+def export_results(results, metrics=None):
+    """Export dict for a fitted statsmodels SARIMAXResults; see module docstring."""
+    model = results.model
+    if model.simple_differencing:
+        raise ValueError("Fit with simple_differencing=False so forecasts are in the original units")
+    ssm = model.ssm
+
+    def matrix(name):
+        value = np.asarray(ssm[name])
+        if value.ndim == 3:
+            if value.shape[-1] != 1:
+                raise ValueError(f"Time-varying {name} is not supported")
+            value = value[..., 0]
+        elif name in ('obs_intercept', 'state_intercept') and value.ndim == 2:
+            value = value[:, 0]
+        return value.tolist()
+
+    return {
+        'format': FORMAT_VERSION,
+        'order': list(model.order),
+        'seasonal_order': list(model.seasonal_order),
+        'start': model._index[0].strftime('%Y-%m'),
+        'endog': np.asarray(model.endog).reshape(-1).tolist(),
+        **{name: matrix(name) for name in SYSTEM_MATRICES},
+        'predicted_state': results.predicted_state[:, -1].tolist(),
+        'predicted_state_cov': results.predicted_state_cov[:, :, -1].tolist(),
+        'metrics': metrics
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        sys.exit("usage: python -m server.utils.sarima_engine results.pkl out.json [metrics.json]")
+    from statsmodels.iolib.smpickle import load_pickle
+    metrics = None
+    if len(sys.argv) == 4:
+        with open(sys.argv[3]) as f:
+            metrics = json.load(f)
+        # Accept the API's /metrics response as is
+        metrics = metrics.get('metrics', metrics)
+    with open(sys.argv[2], 'w') as f:
+        json.dump(export_results(load_pickle(sys.argv[1]), metrics), f)
+    print(f"Wrote {sys.argv[2]}")
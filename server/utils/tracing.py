@@ -0,0 +1,136 @@
+"""
+Request IDs and Server-Timing spans, shared by the Flask app and the async twin.
+
+Each request gets an X-Request-ID (the caller's, if it sent a sane one) that
+is forwarded on every upstream call, and a Timings object held in a context
+variable so span("name") can be used anywhere below the view, including
+helpers run through asyncio.to_thread. Spans go back to the client in a
+Server-Timing header; requests slower than SLOW_REQUEST_MS are logged with
+the full breakdown.
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+import requests
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+_DURATION = re.compile(r'dur=([0-9.]+)')
+
+current_timings = ContextVar('current_timings', default=None)
+
+class Timings:
+    """Milliseconds per span name for one request. Repeated spans add up."""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, ms):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    def merge(self, prefix, header):
+        """Folds a downstream hop's Server-Timing header in as <prefix>-<name> spans."""
+        for entry in header.split(','):
+            name, _, params = entry.strip().partition(';')
+            match = _DURATION.search(params)
+            if name and match:
+                self.add(f"{prefix}-{name}", float(match.group(1)))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def header(self):
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.spans.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+@contextmanager
+def span(name):
+    """Times a block into the current request's spans; a no-op outside a request."""
+    timings = current_timings.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add(name, (time.perf_counter() - started) * 1000)
+
+def current_spans():
+    """The current request's spans so far, rounded ms, for responses that report them in the body."""
+    timings = current_timings.get()
+    if timings is None:
+        return {}
+    with timings._lock:
+        return {name: round(ms, 1) for name, ms in timings.spans.items()}
+
+def current_request_id():
+    timings = current_timings.get()
+    return timings.request_id if timings is not None else None
+
+def begin(incoming_id):
+    """Starts tracing the current request, keeping the caller's ID if it looks valid."""
+    request_id = incoming_id if incoming_id and _VALID_ID.match(incoming_id) else uuid.uuid4().hex
+    timings = Timings(request_id)
+    current_timings.set(timings)
+    return timings
+
+def add_headers(response, timings):
+    response.headers[REQUEST_ID_HEADER] = timings.request_id
+    response.headers['Server-Timing'] = timings.header()
+    return response
+
+def log_if_slow(logger, timings, method, path, status, threshold_ms):
+    total = timings.total_ms()
+    if total >= threshold_ms:
+        logger.warning("Slow request %s", json.dumps({
+            'request_id': timings.request_id,
+            'method': method,
+            'path': path,
+            'status': status,
+            'total_ms': round(total, 1),
+            'spans_ms': {name: round(ms, 1) for name, ms in timings.spans.items()}
+        }))
+
+class TracedSession(requests.Session):
+    """requests.Session that forwards the current request ID on every call."""
+
+    def request(self, method, url, headers=None, **kwargs):
+        request_id = current_request_id()
+        if request_id:
+            headers = {**(headers or {}), REQUEST_ID_HEADER: request_id}
+        return super().request(method, url, headers=headers, **kwargs)
+
+async def forward_request_id(request):
+    """httpx request hook, the async counterpart of TracedSession."""
+    request_id = current_request_id()
+    if request_id:
+        request.headers[REQUEST_ID_HEADER] = request_id
+
+def init_app(app):
+    """Request ID, Server-Timing and slow-request logging for a Flask app."""
+    from flask import g, request
+
+    @app.before_request
+    def start_trace():
+        g.timings = begin(request.headers.get(REQUEST_ID_HEADER))
+
+    @app.after_request
+    def timing_headers(response):
+        g.trace_status = response.status_code
+        return add_headers(response, g.timings) if 'timings' in g else response
+
+    @app.teardown_request
+    def end_trace(exc):
+        # Runs after the last chunk for stream_with_context responses
+        if 'timings' in g:
+            log_if_slow(app.logger, g.timings, request.method, request.path,
+                        g.get('trace_status', 500), app.config['SLOW_REQUEST_MS'])
+        current_timings.set(None)
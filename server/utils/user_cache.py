@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+INVALIDATION_CHANNEL = "user-cache:invalidate"
+
+# Detached copy of the columns token_required callers read, so cached entries
+# never hold on to a SQLAlchemy session
+CachedUser = namedtuple('CachedUser', ['id', 'username', 'name', 'email'])
+
+class TTLCache:
+    """Thread-safe LRU dict where every entry also carries an absolute expiry time."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class UserCache:
+    """
+    Per-process cache of user rows keyed on the JWT `sub`, plus a memo of
+    decoded tokens. Invalidations are published on KeyDB so every worker drops
+    its copy, not just the one that served /update-user or /delete-user.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, token_maxsize=4096):
+        self.users = TTLCache(maxsize, ttl)
+        self.tokens = TTLCache(token_maxsize, ttl)
+        self._redis = None
+        self._listener = None
+
+    def get_user(self, sub):
+        return self.users.get(sub)
+
+    def put_user(self, user):
+        snapshot = CachedUser(user.id, user.username, user.name, user.email)
+        self.users.set(user.username, snapshot)
+        return snapshot
+
+    def get_token(self, token):
+        return self.tokens.get(token)
+
+    def put_token(self, token, payload):
+        # Decoded payload is valid exactly as long as the token itself
+        self.tokens.set(token, payload, expires_at=payload.get('exp'))
+
+    def invalidate(self, sub):
+        self.users.pop(sub)
+        if self._redis is None:
+            return
+        try:
+            self._redis.publish(INVALIDATION_CHANNEL, sub)
+        except Exception:
+            # KeyDB down: other workers fall back to TTL expiry
+            pass
+
+    def start_listener(self, redis_client):
+        """Subscribes to invalidations from other workers on a daemon thread."""
+        self._redis = redis_client
+        if self._listener and self._listener.is_alive():
+            return
+        self._listener = threading.Thread(target=self._listen, name="user-cache-invalidation", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self.users.pop(message['data'])
+            except Exception:
+                # Anything we missed while disconnected may be stale, drop it all
+                self.users.clear()
+                time.sleep(5)
@@ -0,0 +1,129 @@
+"""
+Cache warm-up for the ts-model routes.
+
+After a deploy or a flushed KeyDB the first users would otherwise pay for the
+cold path (for the AI report, a full Gemini generation). A daemon thread runs
+a round at startup and then every WARMUP_INTERVAL seconds, +/- WARMUP_JITTER.
+A round is cheap when everything is warm: it reads each entry's TTL and only
+refreshes those that are missing or have less than WARMUP_REFRESH_AHEAD
+seconds left, so the report is regenerated about once a day, not once a round.
+
+Rounds are serialised across processes with a KeyDB lock, and progress is
+kept in KeyDB so /health shows it whichever worker answers.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+
+# url is the view's path: refresh() runs in a request context for it, so
+# generate_cache_key(*key_args) gives the same key the view reads
+WarmupTask = namedtuple('WarmupTask', ['name', 'url', 'key_args', 'refresh'])
+
+STATUS_KEY = "warmup:status"
+LOCK_KEY = "warmup:lock"
+LOCK_TTL = 300
+# Come back sooner after a failed task, e.g. an upstream still loading its model
+RETRY_SECONDS = 15
+
+class Warmer:
+    """Keeps `tasks` fresh in the cache from a background thread; see module docstring."""
+
+    def __init__(self, app, tasks, interval=60, refresh_ahead=600, jitter=0.2, enabled=True):
+        self.app = app
+        self.tasks = tasks
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.jitter = jitter
+        self.enabled = enabled
+        self._status = {'state': 'pending' if enabled else 'disabled'}
+        self._thread = None
+
+    def start(self):
+        """Starts the scheduler. Call once per serving process, after any fork."""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._loop, name="cache-warmup", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        # Workers forked together should not all reach for the lock at once
+        delay = random.uniform(0, 2)
+        while True:
+            time.sleep(delay)
+            try:
+                ok = self.run_once()
+            except Exception:
+                self.app.logger.exception("Cache warm-up round failed")
+                ok = False
+            delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            if not ok:
+                delay = min(delay, RETRY_SECONDS)
+
+    def run_once(self):
+        """One round. Returns False if a task failed; skipped rounds (lock held elsewhere) count as ok."""
+        cache = self.app.cache
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        if not cache.set(LOCK_KEY, owner, nx=True, ex=LOCK_TTL):
+            return True
+
+        status = {
+            'state': 'running',
+            'started_at': time.time(),
+            'completed': 0,
+            'total': len(self.tasks),
+            'tasks': {task.name: {'state': 'pending'} for task in self.tasks}
+        }
+        failed = False
+        try:
+            self._publish(status)
+            for task in self.tasks:
+                result = self._run_task(task)
+                failed = failed or result['state'] == 'error'
+                status['tasks'][task.name] = result
+                status['completed'] += 1
+                self._publish(status)
+        finally:
+            status['state'] = 'partial' if failed else 'done'
+            status['finished_at'] = time.time()
+            self._publish(status)
+            if cache.get(LOCK_KEY) == owner:
+                cache.delete(LOCK_KEY)
+        return not failed
+
+    def _run_task(self, task):
+        started = time.perf_counter()
+        with self.app.test_request_context(task.url):
+            # -2: missing, -1: no expiry
+            remaining = self.app.cache.ttl(self.app.generate_cache_key(*task.key_args))
+            if remaining == -1 or remaining > self.refresh_ahead:
+                return {'state': 'fresh', 'expires_in': remaining}
+            try:
+                task.refresh()
+                result = {'state': 'refreshed'}
+            except Exception as e:
+                self.app.logger.warning("Cache warm-up of %s failed: %s", task.name, e)
+                result = {'state': 'error', 'error': str(e)}
+        result['ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def _publish(self, status):
+        self._status = json.loads(json.dumps(status))
+        try:
+            self.app.cache.set(STATUS_KEY, json.dumps(status))
+        except Exception:
+            pass
+
+    def status(self):
+        """Latest round's progress, from whichever process ran it."""
+        if not self.enabled:
+            return self._status
+        try:
+            shared = self.app.cache.get(STATUS_KEY)
+            if shared:
+                return json.loads(shared)
+        except Exception:
+            pass
+        return self._status
@@ -99,12 +99,22 @@ def run_cache_benchmark(api_session, cache_conn, endpoint, cache_key, label):
     print(f"\nCACHE REPORT: {label} | Miss: {duration_miss:.4f}s | Hit: {duration_hit:.4f}s")
     assert duration_hit < 0.01 or duration_hit < (duration_miss / 2)
 
+def namespace_prefix(namespace):
+    """Leading segment of the server's cache keys for a namespace, e.g. 'sarima@<model>.<gen>'."""
+    version = requests.get(f"{BASE_URL}/health/cache").json()["namespaces"][namespace]
+    return f"{namespace}@{version}"
+
 # --- 1. Security & Auth Tests ---
 
 def test_unauthorized_access_rejected():
     resp = requests.get(f"{BASE_URL}/ts-model/forecast")
     assert resp.status_code == 401
 
+def test_report_stream_requires_token():
+    # Quotas are charged to the token's user, so the report can't be anonymous
+    resp = requests.get(f"{BASE_URL}/ts-model/report-stream", params={"refresh": "true"})
+    assert resp.status_code == 401
+
 def test_user_profile_update_success(api_session):
     payload = {
         "currentUsername": TEST_USER["fullName"],
@@ -150,10 +160,74 @@ def test_forecast_caching_performance(api_session, cache_conn, steps):
     run_cache_benchmark(
         api_session, cache_conn,
         endpoint=f"/ts-model/forecast?steps={steps}",
-        cache_key=f"view:/ts-model/forecast:{steps}",
+        cache_key=f"{namespace_prefix('sarima')}:forecast:/ts-model/forecast:{steps}",
         label=f"FORECAST {steps}M"
     )
 
+def test_cached_json_conditional_get_and_compression(api_session):
+    url = f"{BASE_URL}/ts-model/history"
+    first = api_session.get(url, headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert "Accept-Encoding" in first.headers["Vary"]
+    if len(first.content) >= 1024:
+        assert first.headers["Content-Encoding"] == "gzip"
+
+    plain = api_session.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.json() == first.json()
+    # Each encoding has its own strong ETag, on top of the identity one
+    if "Content-Encoding" in first.headers:
+        assert etag == plain.headers["ETag"][:-1] + '-gzip"'
+
+    revalidated = api_session.get(url, headers={"If-None-Match": etag, "Accept-Encoding": "gzip"})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+    # Any encoding's ETag validates the entry
+    assert api_session.get(url, headers={"If-None-Match": plain.headers["ETag"]}).status_code == 304
+
+def test_series_range_and_downsampling(api_session):
+    full = api_session.get(f"{BASE_URL}/ts-model/history").json()["history"]
+    resp = api_session.get(f"{BASE_URL}/ts-model/history", params={"start": "2020-01", "end": "2023-12", "max_points": 20})
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["count"] == len(data["history"]) == 20
+    assert data["downsampled_from"] == 48
+    assert data["history"][0]["month"] == "2020-01" and data["history"][-1]["month"] == "2023-12"
+    assert all(row in full for row in data["history"])
+    # Served from the variant's own cache entry
+    again = api_session.get(f"{BASE_URL}/ts-model/history", params={"start": "2020-01", "end": "2023-12", "max_points": 20})
+    assert again.headers["ETag"] == resp.headers["ETag"]
+
+    forecast = api_session.get(f"{BASE_URL}/ts-model/forecast", params={"steps": 48}).json()["forecast"]
+    sampled = api_session.get(f"{BASE_URL}/ts-model/forecast", params={"steps": 48, "max_points": 10}).json()["forecast"]
+    assert len(sampled) == 10
+    assert sampled[0] == forecast[0] and sampled[-1] == forecast[-1]
+
+    assert api_session.get(f"{BASE_URL}/ts-model/history", params={"max_points": 1}).status_code == 400
+    assert api_session.get(f"{BASE_URL}/ts-model/history", params={"start": "2020"}).status_code == 400
+
+def test_dashboard_bundle(api_session, cache_conn):
+    url = f"{BASE_URL}/ts-model/dashboard"
+    cache_conn.delete(f"{namespace_prefix('sarima')}:forecast:/ts-model/forecast:48")
+    resp = api_session.get(url, params={"steps": "12,48"})
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert set(data) == {"history", "metrics", "forecasts", "errors", "stale"}
+    assert set(data["forecasts"]) == {"12", "48"}
+    assert len(data["forecasts"]["48"]["forecast"]) == 48
+    assert data["history"] == api_session.get(f"{BASE_URL}/ts-model/history").json()
+    assert data["forecasts"]["12"] == api_session.get(f"{BASE_URL}/ts-model/forecast", params={"steps": 12}).json()
+    assert not data["errors"]
+
+    revalidated = api_session.get(url, params={"steps": "12,48"}, headers={"If-None-Match": resp.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+    assert api_session.get(url, params={"steps": "abc"}).status_code == 400
+
 # --- 4. AI Inference Tests ---
 
 def test_predict_image_success(api_session, dummy_image):
@@ -175,7 +249,130 @@ def test_inpaint_success(api_session, dummy_image):
     assert resp.status_code == 200
     assert "image" in resp.json()
 
+def test_pipeline_fills_both_caches(api_session, dummy_image):
+    image = dummy_image.getvalue()
+    mask = io.BytesIO()
+    Image.new('RGB', (100, 100), color='white').save(mask, 'jpeg')
+    files = lambda: {'image': ('base.jpg', image, 'image/jpeg'), 'mask': ('mask.jpg', mask.getvalue(), 'image/jpeg')}
+
+    resp = api_session.post(f"{BASE_URL}/obj-det/pipeline", files=files(), timeout=150)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["prediction"]["result"]
+    assert "cache" in data["timings_ms"]
+    if data["inpaint"] is None:
+        assert data["inpaint_skipped"] or data["inpaint_error"]
+    else:
+        assert "image" in data["inpaint"]
+
+    # The prediction went into /predictImage's cache
+    predicted = api_session.post(f"{BASE_URL}/obj-det/predictImage", files={'file': ('base.jpg', image, 'image/jpeg')})
+    assert predicted.json() == data["prediction"]
+
+    again = api_session.post(f"{BASE_URL}/obj-det/pipeline", files=files(), timeout=150).json()
+    if data["inpaint"] is not None:
+        assert again["cached"] == ["prediction", "inpaint"]
+        assert again["inpaint"] == data["inpaint"]
+    elif data["inpaint_skipped"]:
+        # A skipped inpaint is cached too, so the repeat never reaches inference
+        assert again["cached"] == ["prediction"]
+        assert again["inpaint_skipped"] == data["inpaint_skipped"]
+
 def test_root_health_is_alive():
     resp = requests.get(f"{BASE_URL}/health")
     assert resp.status_code == 200
     assert resp.json()["status"] == "alive"
+
+def test_health_reports_warmup_progress():
+    warmup = requests.get(f"{BASE_URL}/health").json()["warmup"]
+    assert warmup["state"] in ("disabled", "pending", "running", "done", "partial")
+    if warmup["state"] not in ("disabled", "pending"):
+        assert "forecast:12" in warmup["tasks"]
+        assert warmup["completed"] <= warmup["total"]
+
+def test_cache_namespace_invalidation(api_session, cache_conn):
+    api_session.get(f"{BASE_URL}/ts-model/forecast", params={"steps": 12})
+    before = requests.get(f"{BASE_URL}/health/cache").json()["namespaces"]
+    forecast_keys = cache_conn.keys(f"{namespace_prefix('sarima')}:forecast:*")
+    assert forecast_keys
+
+    assert api_session.post(f"{BASE_URL}/cache/invalidate/sarima").status_code == 403
+    resp = requests.post(f"{BASE_URL}/cache/invalidate/sarima", headers={"Authorization": f"Bearer {internal_proxy_token()}"})
+    assert resp.status_code == 200
+
+    after = resp.json()["versions"]
+    assert after["sarima"] != before["sarima"]
+    assert after["inference"] == before["inference"]
+    assert not any(cache_conn.exists(k) for k in forecast_keys)
+
+# --- 5. Reorder Scenarios ---
+
+def test_reorder_scenarios_grid(api_session):
+    csv = io.BytesIO(b"SupersedeNo,Description,Qty,total_units_sold\nBP1001,Brake Pad Front,5,40\nBP1002,Brake Pad Rear,50,20\n")
+    files = {'file': ('inventory.csv', csv, 'text/csv')}
+    grid = {'safety_stock': '5,10', 'target_days': '30,60', 'lead_time': '7,14,21'}
+    resp = api_session.post(f"{BASE_URL}/order-model/scenarios", files=files, data=grid)
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert len(data["scenarios"]["total_order_cost"]) == 12
+    assert len(data["reorder_qty"]) == 12
+    assert all(len(row) == 2 for row in data["reorder_qty"])
+
+    for bad in ({'lead_time': 'nan'}, {'target_days': 'inf'}, {'safety_stock': '-5'}, {'ordering_cost': '-1'}):
+        csv.seek(0)
+        resp = api_session.post(f"{BASE_URL}/order-model/scenarios", files={'file': ('inventory.csv', csv, 'text/csv')}, data=bad)
+        assert resp.status_code == 400
+
+# --- 6. Metrics ---
+
+def test_metrics_exposes_route_and_cache_series(api_session):
+    api_session.get(f"{BASE_URL}/ts-model/forecast", params={"steps": 12})
+    api_session.get(f"{BASE_URL}/ts-model/forecast", params={"steps": 12})
+
+    resp = requests.get(f"{BASE_URL}/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["Content-Type"].startswith("text/plain")
+
+    body = resp.text
+    assert 'automo_http_request_duration_seconds_bucket{' in body
+    assert 'route="/ts-model/forecast"' in body
+    assert 'automo_cache_lookups_total{prefix="forecast:/ts-model/forecast",result="hit"}' in body
+    assert 'automo_upstream_breaker_open{upstream="sarima"}' in body
+    assert 'automo_quota_queued_users{pool="inference"}' in body
+
+def test_request_id_and_server_timing(api_session):
+    resp = api_session.get(f"{BASE_URL}/ts-model/forecast", params={"steps": 12}, headers={"X-Request-ID": "itest-trace-1"})
+    assert resp.status_code == 200
+    assert resp.headers["X-Request-ID"] == "itest-trace-1"
+
+    spans = [entry.split(";")[0].strip() for entry in resp.headers["Server-Timing"].split(",")]
+    assert "auth" in spans and "cache" in spans and spans[-1] == "total"
+
+# --- 7. Profiling ---
+
+def internal_proxy_token():
+    return jwt.encode({
+        'sub': 'internal_proxy',
+        'iat': datetime.datetime.now(datetime.timezone.utc),
+        'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+    }, SECRET_KEY, algorithm='HS256')
+
+def test_sampling_profiler_is_admin_only(api_session):
+    resp = api_session.get(f"{BASE_URL}/debug/profile", params={"seconds": 0.5})
+    assert resp.status_code == 403
+
+    resp = requests.get(f"{BASE_URL}/debug/profile", params={"seconds": 0.5},
+                        headers={"Authorization": f"Bearer {internal_proxy_token()}"})
+    assert resp.status_code == 200
+    assert int(resp.headers["X-Profile-Samples"]) > 0
+
+def test_request_profile_header(api_session):
+    token = internal_proxy_token()
+    resp = api_session.get(f"{BASE_URL}/ts-model/forecast", params={"steps": 12}, headers={"X-Profile": token})
+    assert resp.status_code == 200
+    profile_id = resp.headers["X-Profile-Id"]
+
+    report = requests.get(f"{BASE_URL}/debug/profile/{profile_id}", headers={"Authorization": f"Bearer {token}"})
+    assert report.status_code == 200
+    assert "get_forecast" in report.text
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from server.utils.downsample import MAX_POINTS, lttb_indices, month_range, select_series, series_window
+
+# --- Fixtures ---
+
+def reference_lttb(y, n_out):
+    """Textbook LTTB, one point at a time, to check the vectorised version against."""
+    n = len(y)
+    every = (n - 2) / (n_out - 2)
+    keep, a = [0], 0
+    for i in range(n_out - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)
+        if i == n_out - 3:
+            cx, cy = n - 1, y[-1]
+        else:
+            cx = sum(range(next_lo, next_hi)) / (next_hi - next_lo)
+            cy = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        areas = [abs((a - cx) * (y[j] - y[a]) - (a - j) * (cy - y[a])) for j in range(lo, hi)]
+        a = lo + areas.index(max(areas))
+        keep.append(a)
+    return keep + [n - 1]
+
+def monthly_rows(n, start_year=2016):
+    rng = np.random.default_rng(1)
+    values = 3000 + rng.normal(0, 100, n).cumsum()
+    return [
+        {'month': f"{start_year + i // 12}-{i % 12 + 1:02d}", 'actual': float(v)}
+        for i, v in enumerate(values)
+    ]
+
+# --- LTTB ---
+
+@pytest.mark.parametrize("n, n_out", [(113, 40), (1000, 100), (1000, 999), (5000, 3)])
+def test_lttb_matches_reference(n, n_out):
+    y = np.random.default_rng(n).normal(0, 1, n).cumsum()
+    assert lttb_indices(y, n_out).tolist() == reference_lttb(y.tolist(), n_out)
+
+def test_lttb_keeps_ends_and_extremes():
+    y = np.sin(np.linspace(0, 4 * np.pi, 2000))
+    y[1234] = 50.0
+    keep = lttb_indices(y, 60)
+    assert len(keep) == 60 and keep[0] == 0 and keep[-1] == 1999
+    assert np.all(np.diff(keep) > 0)
+    assert 1234 in keep
+
+def test_lttb_short_series_untouched():
+    assert lttb_indices([1.0, 2.0, 3.0], 10).tolist() == [0, 1, 2]
+
+# --- Ranges and payloads ---
+
+def test_month_range_is_inclusive():
+    rows = monthly_rows(113)
+    window = month_range(rows, "2020-01", "2020-12")
+    assert [r['month'] for r in window] == [f"2020-{m:02d}" for m in range(1, 13)]
+    assert month_range(rows, end="2016-03") == rows[:3]
+    assert month_range(rows, start="2030-01") == []
+
+def test_select_series_history():
+    payload = {'history': monthly_rows(600), 'count': 600}
+    selected = select_series(payload, 'history', 'actual', "2020-01", None, 50)
+    assert selected['count'] == len(selected['history']) == 50
+    assert selected['downsampled_from'] == 600 - 48
+    assert selected['history'][0]['month'] == "2020-01"
+    assert selected['history'][-1] == payload['history'][-1]
+    assert payload['count'] == 600
+
+def test_select_series_keeps_forecast_rows_whole():
+    rows = [{'month': r['month'], 'forecast': r['actual'], 'lower_ci': 0.0, 'upper_ci': 1.0} for r in monthly_rows(48)]
+    selected = select_series({'forecast': rows, 'model_info': {}}, 'forecast', 'forecast', max_points=10)
+    assert len(selected['forecast']) == 10
+    assert all(row in rows for row in selected['forecast'])
+    assert 'count' not in selected and selected['model_info'] == {}
+
+# --- Query parameters ---
+
+def test_series_window_parsing():
+    assert series_window({}) is None
+    assert series_window({'start': '2020-01', 'max_points': '200'}) == ('2020-01', None, 200)
+
+@pytest.mark.parametrize("args", [
+    {'start': '2020-13'}, {'end': '2020'}, {'start': '2021-01', 'end': '2020-01'},
+    {'max_points': 'abc'}, {'max_points': '2'}, {'max_points': str(MAX_POINTS + 1)}
+])
+def test_series_window_rejects(args):
+    with pytest.raises(ValueError):
+        series_window(args)
@@ -0,0 +1,112 @@
+import os
+import uuid
+import pytest
+import redis
+from server.utils.rate_limit import FairQuota
+
+KEYDB_URL = os.getenv("KEYDB_URL", "redis://cache-db:6379/0")
+
+# --- Fixtures ---
+
+@pytest.fixture
+def client():
+    client = redis.Redis.from_url(KEYDB_URL, decode_responses=True, socket_connect_timeout=2)
+    try:
+        client.ping()
+    except redis.RedisError:
+        pytest.skip(f"KeyDB not reachable at {KEYDB_URL}")
+    prefix = f"test_quota_{uuid.uuid4().hex}"
+    yield client, prefix
+    keys = client.keys(f"{prefix}:*")
+    if keys:
+        client.delete(*keys)
+
+def make_quota(client, prefix, capacity=100, pool_capacity=100):
+    # Refill rates low enough that nothing refills while a test runs
+    return FairQuota(client, prefix, capacity, 0.001, {'inference': (pool_capacity, 0.001)}, grace=30)
+
+def refill_pool(client, prefix, tokens):
+    client.hset(f"{prefix}:pool:inference", 'tokens', tokens)
+
+# --- Per-user quota ---
+
+def test_cost_is_charged_per_user(client):
+    quota = make_quota(*client, capacity=10)
+    assert quota.admit("alice", "inference", 4) == (True, 0, 'ok')
+    assert quota.admit("alice", "inference", 4)[0]
+    allowed, retry_after, reason = quota.admit("alice", "inference", 4)
+    assert not allowed and reason == 'user' and retry_after > 0
+    # Another user's bucket is untouched
+    assert quota.admit("bob", "inference", 4)[0]
+
+def test_cost_above_capacity_takes_a_full_bucket(client):
+    quota = make_quota(*client, capacity=10)
+    assert quota.admit("alice", "inference", 1000)[0]
+    assert quota.admit("alice", "inference", 1)[2] == 'user'
+
+@pytest.mark.parametrize("name", ["usage:inference", "queue:inference", "deadline:inference", "pool:inference"])
+def test_usernames_cannot_reach_pool_keys(client, name):
+    c, prefix = client
+    quota = make_quota(c, prefix, capacity=10, pool_capacity=20)
+    assert quota.admit(name, "inference", 10)[2] == 'ok'
+    assert quota.admit("alice", "inference", 10)[2] == 'ok'
+    # The pool is empty, so Bob's wait fills the queue and deadline keys
+    assert quota.admit("bob", "inference", 10)[2] == 'queued'
+    # Limited on their own bucket rather than failing open
+    assert quota.admit(name, "inference", 10)[2] == 'user'
+    assert dict(quota.usage("inference", 10)[0]) == {name: 10.0, "alice": 10.0}
+
+# --- Fair queuing ---
+
+def test_short_pool_is_shared_in_turn(client):
+    c, prefix = client
+    quota = make_quota(c, prefix, pool_capacity=20)
+    assert quota.admit("alice", "inference", 20)[0]
+
+    # Alice keeps retrying but holds one place; Bob queues behind her
+    for _ in range(5):
+        allowed, _, reason = quota.admit("alice", "inference", 10)
+        assert not allowed and reason == 'queued'
+    bob_queued = quota.admit("bob", "inference", 10)
+    assert bob_queued[2] == 'queued'
+    assert c.zrange(quota.queue_key("inference"), 0, -1) == ["alice", "bob"]
+    assert bob_queued[1] > quota.admit("alice", "inference", 10)[1]
+
+    # When the pool refills Bob must wait for Alice's turn, then gets his
+    refill_pool(c, prefix, 20)
+    assert quota.admit("bob", "inference", 10)[2] == 'queued'
+    assert quota.admit("alice", "inference", 10)[0]
+    assert quota.admit("bob", "inference", 10)[0]
+    assert c.zcard(quota.queue_key("inference")) == 0
+
+def test_user_out_of_quota_gives_up_their_place(client):
+    c, prefix = client
+    quota = make_quota(c, prefix, capacity=15, pool_capacity=10)
+    assert quota.admit("alice", "inference", 10)[0]
+    assert quota.admit("bob", "inference", 10)[2] == 'queued'
+    assert quota.admit("alice", "inference", 10)[2] == 'user'
+    refill_pool(c, prefix, 10)
+    assert quota.admit("bob", "inference", 10)[0]
+
+# --- Metrics and failure ---
+
+def test_usage_reports_admitted_cost(client):
+    quota = make_quota(*client)
+    quota.admit("alice", "inference", 7)
+    quota.admit("alice", "inference", 3)
+    quota.admit("bob", "inference", 4)
+    users, queued = quota.usage("inference", 10)
+    assert users == [("alice", 10.0), ("bob", 4.0)]
+    assert queued == 0
+
+def test_usage_keeps_the_biggest_users(client):
+    c, prefix = client
+    quota = FairQuota(c, prefix, 100, 0.001, {'inference': (100, 0.001)}, usage_keep=2)
+    for user, cost in (("alice", 7), ("bob", 4), ("carol", 1)):
+        quota.admit(user, "inference", cost)
+    assert quota.usage("inference", 10)[0] == [("alice", 7.0), ("bob", 4.0)]
+    assert 0 < c.ttl(quota.usage_key("inference")) <= quota.usage_ttl
+
+def test_fails_open_without_keydb():
+    quota = make_quota(redis.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.5), "test_quota")
+    assert quota.admit("alice", "inference", 1) == (True, 0, 'error')
@@ -0,0 +1,69 @@
+import pickle
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from server.utils.reorder_model import (
+    MODEL_PATH, FEATURES, CompiledTreePredictor, get_predictor, build_features
+)
+
+BENCH_ROWS = 1_000_000
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def estimator():
+    with open(MODEL_PATH, "rb") as f:
+        return pickle.load(f)
+
+def random_inventory(n, seed=42):
+    rng = np.random.default_rng(seed)
+    stock = rng.integers(0, 200, n).astype(float)
+    avg_daily_demand = rng.integers(0, 120, n) / 30
+    lead_time = rng.choice([7, 14, 21, 30], n).astype(float)
+    return stock, avg_daily_demand, lead_time
+
+# --- 1. Parity ---
+
+def test_compiled_predictor_is_used(estimator):
+    assert isinstance(get_predictor(), CompiledTreePredictor) == hasattr(estimator, 'tree_')
+
+def test_predictor_parity_with_pickled_estimator(estimator):
+    stock, demand, lead = random_inventory(50_000)
+    expected = estimator.predict(pd.DataFrame({'stock': stock, 'avg_daily_demand': demand, 'lead_time': lead}))
+    actual = get_predictor().predict(build_features(stock, demand, lead))
+    np.testing.assert_array_equal(actual, expected)
+
+def test_predictor_parity_on_split_thresholds(estimator):
+    # Rows sitting exactly on (and just around) every split threshold
+    tree = estimator.tree_
+    rows = []
+    for node in np.flatnonzero(tree.children_left != -1):
+        for t in (tree.threshold[node] - 1e-3, tree.threshold[node], tree.threshold[node] + 1e-3):
+            row = [0.0] * len(FEATURES)
+            row[tree.feature[node]] = t
+            rows.append(row)
+    X = np.asarray(rows, dtype=np.float32)
+
+    expected = estimator.predict(pd.DataFrame(X, columns=FEATURES))
+    np.testing.assert_array_equal(get_predictor().predict(X), expected)
+
+# --- 2. Throughput Benchmarking ---
+
+def test_predictor_throughput_1m_rows(estimator):
+    stock, demand, lead = random_inventory(BENCH_ROWS)
+    df = pd.DataFrame({'stock': stock, 'avg_daily_demand': demand, 'lead_time': lead})
+    predictor = get_predictor()
+
+    t1 = time.perf_counter()
+    expected = estimator.predict(df[FEATURES])
+    duration_pickled = time.perf_counter() - t1
+
+    t2 = time.perf_counter()
+    actual = predictor.predict(build_features(stock, demand, lead))
+    duration_compiled = time.perf_counter() - t2
+
+    np.testing.assert_array_equal(actual, expected)
+    print(f"\nREORDER MODEL REPORT: {BENCH_ROWS} rows | "
+          f"Pickled: {BENCH_ROWS / duration_pickled:,.0f} rows/s | "
+          f"Compiled: {BENCH_ROWS / duration_compiled:,.0f} rows/s")
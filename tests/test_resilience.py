@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from server.utils.resilience import Upstream, UpstreamUnavailable
+
+# --- Fixtures ---
+
+@pytest.fixture
+def half_open():
+    """An upstream whose breaker has tripped and is ready to let one probe through."""
+    upstream = Upstream("gemini", max_concurrent=4, failure_threshold=1, reset_timeout=0)
+    upstream.breaker.record_failure()
+    assert upstream.breaker.state == 'open'
+    return upstream
+
+def stream(upstream, chunks):
+    """Yields from inside guard(), like the report-stream views."""
+    with upstream.guard():
+        for chunk in chunks:
+            yield chunk
+
+# --- Probe hand-back ---
+
+def test_dropped_stream_hands_back_the_probe(half_open):
+    chunks = stream(half_open, ["a", "b"])
+    assert next(chunks) == "a"
+    # Holding the probe: nobody else gets through
+    with pytest.raises(UpstreamUnavailable):
+        with half_open.guard():
+            pass
+
+    # The client disconnects mid-stream
+    chunks.close()
+    assert half_open.bulkhead.in_flight == 0
+    with half_open.guard():
+        pass
+    assert half_open.breaker.state == 'closed'
+
+def test_cancelled_call_hands_back_the_probe(half_open):
+    async def call():
+        with half_open.guard():
+            await asyncio.sleep(10)
+
+    async def cancel():
+        task = asyncio.ensure_future(call())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert half_open.breaker.state == 'half_open'
+    assert half_open.breaker.allow()
+
+def test_failed_probe_reopens(half_open):
+    with pytest.raises(RuntimeError):
+        with half_open.guard():
+            raise RuntimeError("upstream down")
+    assert half_open.breaker.state == 'open'
@@ -0,0 +1,148 @@
+import datetime
+import json
+import os
+import time
+import jwt
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+from benchmarks.fakes import HISTORY, fake_sarima_export
+from server.utils.sarima_engine import MAX_FORECAST_STEPS, SarimaEngine
+
+MODEL_API_URL = os.getenv("MODEL_API_URL", "http://ts-model-api:5000")
+SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
+BENCH_REQUESTS = 50
+
+# --- Fixtures ---
+
+def synthetic_series(n=113):
+    rng = np.random.default_rng(0)
+    t = np.arange(n)
+    values = 4000 + 5 * t + 400 * np.sin(2 * np.pi * t / 12) + rng.normal(0, 45, n).cumsum()
+    return pd.Series(values, index=pd.period_range("2016-01", periods=n, freq="M"))
+
+@pytest.fixture(scope="module", params=[
+    ((1, 1, 1), (1, 1, 1, 12), None),
+    ((2, 0, 1), (0, 1, 1, 12), "c"),
+    ((0, 1, 1), (0, 0, 0, 0), None)
+], ids=["seasonal", "trend", "non-seasonal"])
+def fitted(request):
+    sarimax = pytest.importorskip("statsmodels.tsa.statespace.sarimax")
+    from server.utils.sarima_engine import export_results
+    order, seasonal_order, trend = request.param
+    results = sarimax.SARIMAX(synthetic_series(), order=order, seasonal_order=seasonal_order, trend=trend).fit(disp=False)
+    # Round trip through JSON, as the export file would
+    engine = SarimaEngine(json.loads(json.dumps(export_results(results, {"rmse": 1.0}))))
+    return results, engine
+
+# --- Parity with statsmodels ---
+
+def test_forecast_matches_statsmodels(fitted):
+    results, engine = fitted
+    payload, status = engine.forecast(48)
+    expected = results.get_forecast(48)
+    ci = expected.conf_int()
+    assert status == 200
+    assert np.allclose([r["forecast"] for r in payload["forecast"]], expected.predicted_mean, rtol=1e-9)
+    assert np.allclose([r["lower_ci"] for r in payload["forecast"]], ci.iloc[:, 0], rtol=1e-9)
+    assert np.allclose([r["upper_ci"] for r in payload["forecast"]], ci.iloc[:, 1], rtol=1e-9)
+    assert [r["month"] for r in payload["forecast"]] == [str(p) for p in expected.predicted_mean.index]
+
+def test_history_matches_training_series(fitted):
+    _, engine = fitted
+    payload, _ = engine.get("history")
+    series = synthetic_series()
+    assert payload["count"] == len(series)
+    assert payload["history"][0] == {"month": "2016-01", "actual": series.iloc[0]}
+    assert payload["history"][-1]["month"] == str(series.index[-1])
+
+# --- Payloads, without statsmodels ---
+
+@pytest.fixture(scope="module")
+def stand_in():
+    return SarimaEngine(fake_sarima_export(metrics={"rmse": 412.7}))
+
+def test_forecast_payload_shape(stand_in):
+    payload, status = stand_in.get("forecast", steps="12")
+    assert status == 200
+    assert payload["model_info"] == {"order": [1, 0, 0], "seasonal_order": [0, 1, 0, 12]}
+    assert len(payload["forecast"]) == 12
+    assert set(payload["forecast"][0]) == {"month", "forecast", "lower_ci", "upper_ci"}
+    # 113 months from 2016-01 end in 2025-05
+    assert payload["forecast"][0]["month"] == "2025-06"
+    assert payload["forecast"][7]["month"] == "2026-01"
+
+def test_forecast_is_recursion_of_the_model(stand_in):
+    y = list(HISTORY)
+    for _ in range(24):
+        y.append(0.5 * y[-1] + y[-12] - 0.5 * y[-13])
+    payload, _ = stand_in.forecast(24)
+    assert np.allclose([r["forecast"] for r in payload["forecast"]], y[-24:])
+    widths = [r["upper_ci"] - r["lower_ci"] for r in payload["forecast"]]
+    assert all(a <= b for a, b in zip(widths, widths[1:]))
+
+def test_shorter_horizons_are_prefixes(stand_in):
+    long, _ = stand_in.forecast(48)
+    short, _ = stand_in.forecast(12)
+    assert short["forecast"] == long["forecast"][:12]
+
+@pytest.mark.parametrize("steps", [0, MAX_FORECAST_STEPS + 1])
+def test_forecast_steps_out_of_range(stand_in, steps):
+    payload, status = stand_in.forecast(steps)
+    assert status == 400
+    assert "error" in payload
+
+def test_metrics_only_served_when_exported(stand_in):
+    assert stand_in.get("metrics") == ({"metrics": {"rmse": 412.7}}, 200)
+    assert not SarimaEngine(fake_sarima_export(metrics=None)).serves("metrics")
+
+def test_model_version_follows_file(tmp_path):
+    path = tmp_path / "sarima_params.json"
+    path.write_text(json.dumps(fake_sarima_export(metrics=None)))
+    first = SarimaEngine.from_file(path).model_version
+    path.write_text(json.dumps(fake_sarima_export(ar=0.6, metrics=None)))
+    assert SarimaEngine.from_file(path).model_version != first
+
+# --- Against the ts-model API ---
+
+@pytest.fixture(scope="module")
+def model_api():
+    token = jwt.encode({
+        "sub": "internal_proxy",
+        "iat": datetime.datetime.now(datetime.timezone.utc),
+        "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+    }, SECRET_KEY, algorithm="HS256")
+    session = requests.Session()
+    session.headers.update({"Authorization": f"Bearer {token}"})
+    try:
+        session.get(f"{MODEL_API_URL}/health", timeout=2).raise_for_status()
+    except requests.RequestException:
+        pytest.skip(f"ts-model API not reachable at {MODEL_API_URL}")
+    return session
+
+def test_payload_shape_matches_api(model_api, stand_in):
+    api = model_api.get(f"{MODEL_API_URL}/forecast", params={"steps": 12}, timeout=15).json()
+    local, _ = stand_in.forecast(12)
+    assert set(local) <= set(api)
+    assert len(local["forecast"]) == len(api["forecast"])
+    assert set(local["forecast"][0]) == set(api["forecast"][0])
+
+    api_history = model_api.get(f"{MODEL_API_URL}/history", timeout=10).json()
+    assert set(stand_in.get("history")[0]) == set(api_history)
+    assert set(stand_in.get("history")[0]["history"][0]) == set(api_history["history"][0])
+
+def test_forecast_latency_vs_api(model_api, stand_in):
+    t1 = time.perf_counter()
+    for i in range(BENCH_REQUESTS):
+        model_api.get(f"{MODEL_API_URL}/forecast", params={"steps": 12 + i % 37}, timeout=15).raise_for_status()
+    duration_api = (time.perf_counter() - t1) / BENCH_REQUESTS
+
+    t2 = time.perf_counter()
+    for i in range(BENCH_REQUESTS):
+        json.dumps(stand_in.forecast(12 + i % 37)[0])
+    duration_local = (time.perf_counter() - t2) / BENCH_REQUESTS
+
+    print(f"\nSARIMA ENGINE REPORT: {BENCH_REQUESTS} forecasts | "
+          f"API: {duration_api * 1000:.2f} ms | Embedded: {duration_local * 1000:.3f} ms")
+    assert duration_local < duration_api
@@ -0,0 +1,112 @@
+import pytest
+import requests
+import jwt
+import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+BASE_URL = os.getenv("BASE_URL", "http://automo_web_app:8080")
+SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
+
+BENCH_USERS = int(os.getenv("BENCH_USERS", 32))
+BENCH_CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", 8))
+
+def make_token(sub):
+    return jwt.encode({
+        'sub': sub,
+        'iat': datetime.datetime.now(datetime.timezone.utc),
+        'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+    }, SECRET_KEY, algorithm='HS256')
+
+def bench_user(i):
+    return {
+        "username": f"bench_user_{i}",
+        "email": f"bench_user_{i}@test.com",
+        "password": "password123",
+        "name": f"Bench User {i}"
+    }
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def admin_headers():
+    return {"Authorization": f"Bearer {make_token('internal_proxy')}"}
+
+@pytest.fixture(scope="module")
+def provisioned_users(admin_headers):
+    users = [bench_user(i) for i in range(BENCH_USERS)]
+    for user in users:
+        requests.delete(f"{BASE_URL}/delete-user", json={"username": user["name"]}, headers=admin_headers)
+
+    resp = requests.post(f"{BASE_URL}/bulk-register", json={"users": users}, headers=admin_headers, timeout=120)
+    assert resp.status_code == 201
+    assert resp.json()["created"] == BENCH_USERS
+
+    yield users
+
+    for user in users:
+        requests.delete(f"{BASE_URL}/delete-user", json={"username": user["name"]}, headers=admin_headers)
+
+# --- Utility: Concurrency Benchmarking ---
+
+def run_concurrent(label, calls):
+    """Runs (method, url, kwargs) calls at BENCH_CONCURRENCY and prints a latency report."""
+    def timed(call):
+        method, url, kwargs = call
+        t = time.perf_counter()
+        r = requests.request(method, url, timeout=60, **kwargs)
+        return r.status_code, time.perf_counter() - t
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=BENCH_CONCURRENCY) as pool:
+        results = list(pool.map(timed, calls))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(d for _, d in results)
+    statuses = [s for s, _ in results]
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"\nUSER STORE REPORT: {label} | {len(calls)} reqs @ {BENCH_CONCURRENCY} | "
+          f"{len(calls) / wall:.1f} req/s | p50: {p50:.4f}s | p95: {p95:.4f}s | "
+          f"statuses: {dict((s, statuses.count(s)) for s in set(statuses))}")
+    return statuses
+
+# --- 1. Bulk Provisioning ---
+
+def test_bulk_register_rejects_non_proxy(provisioned_users):
+    headers = {"Authorization": f"Bearer {make_token(provisioned_users[0]['username'])}"}
+    resp = requests.post(f"{BASE_URL}/bulk-register", json={"users": [bench_user(BENCH_USERS)]}, headers=headers)
+    assert resp.status_code == 403
+
+def test_bulk_register_skips_existing(provisioned_users, admin_headers):
+    resp = requests.post(f"{BASE_URL}/bulk-register", json={"users": provisioned_users[:2]}, headers=admin_headers)
+    assert resp.status_code == 201
+    assert resp.json()["created"] == 0
+    assert len(resp.json()["skipped"]) == 2
+
+# --- 2. Concurrency Benchmarking ---
+
+def test_concurrent_login(provisioned_users):
+    calls = [("POST", f"{BASE_URL}/login", {"json": {"username": u["username"], "password": u["password"]}})
+             for u in provisioned_users]
+    statuses = run_concurrent("LOGIN", calls)
+    # Throttling (429) and hash-pool admission control (503) are expected under load; errors are not
+    assert set(statuses) <= {200, 429, 503}
+
+def test_concurrent_update(provisioned_users):
+    calls = [("PUT", f"{BASE_URL}/update-user", {
+        "json": {"currentUsername": u["name"], "email": u["email"]},
+        "headers": {"Authorization": f"Bearer {make_token(u['username'])}"}
+    }) for u in provisioned_users]
+    statuses = run_concurrent("UPDATE", calls)
+    assert set(statuses) == {200}
+
+def test_concurrent_delete(provisioned_users):
+    calls = [("DELETE", f"{BASE_URL}/delete-user", {
+        "json": {"username": u["name"]},
+        "headers": {"Authorization": f"Bearer {make_token(u['username'])}"}
+    }) for u in provisioned_users]
+    statuses = run_concurrent("DELETE", calls)
+    assert set(statuses) == {200}